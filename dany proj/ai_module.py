@@ -1,6 +1,13 @@
 import numpy as np
 import os
 import pickle
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from policies import DifficultyPolicy, EloPolicy
+from numpy_mlp import NumpyMLP, WEIGHTS_SUFFIX
 
 try:
     import tensorflow as tf
@@ -9,56 +16,437 @@ except ImportError:
     print("TensorFlow not available. Using fallback prediction mechanism.")
     TF_AVAILABLE = False
 
-class DifficultyPredictor:
-    def __init__(self, model_path=None):
-        """Initialize the difficulty predictor."""
+class PredictionCache:
+    """
+    Memo of predictions keyed by quantized, normalized inputs.
+    
+    Entries live in a bounded LRU dictionary, or in a dense NumPy grid
+    covering the whole [0, 1]^3 input space when dense=True.
+    """
+    
+    def __init__(self, resolution=0.01, maxsize=4096, dense=False):
+        """Initialize an empty cache with the given grid resolution."""
+        if not 0 < resolution <= 1:
+            raise ValueError("resolution must be in (0, 1]")
+        self.resolution = resolution
+        self.steps = int(round(1 / resolution))
+        self.maxsize = maxsize
+        self.dense = dense
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.clear()
+    
+    def key(self, accuracy, norm_reaction_time, norm_attempts):
+        """Quantize normalized inputs (each clipped to [0, 1]) to grid indices."""
+        return tuple(int(round(min(max(value, 0.0), 1.0) * self.steps))
+                     for value in (accuracy, norm_reaction_time, norm_attempts))
+    
+    def point(self, key):
+        """Return the normalized inputs at the grid point of a key."""
+        return tuple(index / self.steps for index in key)
+    
+    def get(self, key):
+        """Return the cached prediction for key, or None on a miss."""
+        with self._lock:
+            if self.dense:
+                value = self._table[key]
+                value = None if np.isnan(value) else float(value)
+            else:
+                value = self._entries.get(key)
+                if value is not None:
+                    self._entries.move_to_end(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+    
+    def put(self, key, value):
+        """Store a prediction, evicting the least recently used entry if full."""
+        with self._lock:
+            if self.dense:
+                self._table[key] = value
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        """Drop all cached predictions (hit and miss counts are kept)."""
+        with self._lock:
+            self._entries = OrderedDict()
+            self._table = (np.full((self.steps + 1,) * 3, np.nan, dtype=np.float32)
+                           if self.dense else None)
+    
+    def info(self):
+        """Return hit-rate statistics of the cache."""
+        with self._lock:
+            total = self.hits + self.misses
+            if self.dense:
+                size = int(np.count_nonzero(~np.isnan(self._table)))
+            else:
+                size = len(self._entries)
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'size': size,
+                'maxsize': self._table.size if self.dense else self.maxsize,
+                'resolution': self.resolution,
+                'dense': self.dense
+            }
+
+class CircuitBreaker:
+    """
+    Latency budget for model calls, with a circuit breaker.
+    
+    Calls run on a pool of worker threads and are waited for at most budget
+    seconds; a call that misses the budget (or raises) is counted as a
+    failure and the caller gets None, so it can answer with something
+    cheaper. A late call that hasn't started yet is cancelled; one already
+    running can't be interrupted and finishes in the background. Size the
+    pool to the number of threads that predict at once (the server's
+    threads), so calls don't spend their budget queued behind each other.
+    
+    After failure_threshold consecutive failures the circuit opens: calls
+    return None at once, without touching the model. Every reset_timeout
+    seconds the circuit is half-opened and a single call is let through to
+    probe the model; if it meets the budget the circuit closes again,
+    otherwise it stays open for another reset_timeout.
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, budget=0.05, failure_threshold=3, reset_timeout=5.0, workers=8):
+        """
+        Initialize a closed circuit.
+        
+        Args:
+            budget (float): Seconds a call may take
+            failure_threshold (int): Consecutive failures that open the circuit
+            reset_timeout (float): Seconds the circuit stays open before a probe
+            workers (int): Worker threads running the calls
+        """
+        if budget <= 0:
+            raise ValueError("budget must be positive")
+        self.budget = budget
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.workers = max(1, workers)
+        self.state = self.CLOSED
+        self.calls = 0
+        self.misses = 0
+        self.errors = 0
+        self.rejected = 0
+        self.opened = 0
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+    
+    def call(self, function, *args):
+        """
+        Run function(*args) within the budget.
+        
+        Returns:
+            The function's result, or None if it missed the budget, raised,
+            or the circuit is open
+        """
+        with self._lock:
+            if not self._allow():
+                self.rejected += 1
+                return None
+            self.calls += 1
+            executor = self._get_executor()
+        
+        future = executor.submit(function, *args)
+        try:
+            result = future.result(timeout=self.budget)
+        except FutureTimeoutError:
+            # Don't let calls that are already late pile up behind the slow ones
+            future.cancel()
+            self._record_failure(missed=True)
+            return None
+        except Exception as e:
+            print(f"Error in model prediction: {e}")
+            self._record_failure(missed=False)
+            return None
+        self._record_success()
+        return result
+    
+    def reset(self):
+        """Close the circuit and forget the consecutive failures."""
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+    
+    def info(self):
+        """Return the state of the circuit and the call counters."""
+        with self._lock:
+            return {
+                'state': self.state,
+                'budget_ms': self.budget * 1000,
+                'calls': self.calls,
+                'misses': self.misses,
+                'errors': self.errors,
+                'rejected': self.rejected,
+                'opened': self.opened,
+                'consecutive_failures': self._failures
+            }
+    
+    def _allow(self):
+        """Decide whether a call may reach the model (called with the lock held)."""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN and not self._probing:
+            # Only one probe at a time; everyone else keeps getting the fallback
+            self._probing = True
+            return True
+        return False
+    
+    def _record_success(self):
+        """Close the circuit after a call that met the budget."""
+        with self._lock:
+            self._failures = 0
+            self._probing = False
+            self.state = self.CLOSED
+    
+    def _record_failure(self, missed):
+        """Count a failed call and open the circuit if it failed too often."""
+        with self._lock:
+            if missed:
+                self.misses += 1
+            else:
+                self.errors += 1
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.opened += 1
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+    
+    def _get_executor(self):
+        """Return this process's worker thread pool (a forked child can't use its parent's)."""
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='model-call')
+            self._pid = os.getpid()
+        return self._executor
+
+def simulated_training_data(n_samples=1000, seed=42):
+    """
+    Generate the synthetic training data of the difficulty network.
+    
+    Args:
+        n_samples (int): Number of samples
+        seed (int): Seed of the global NumPy generator (for reproducibility)
+        
+    Returns:
+        tuple: (X, Y) with X of shape (n_samples, 3) and Y of shape (n_samples, 1)
+    """
+    np.random.seed(seed)
+    
+    # Simulated player performance metrics
+    # Format: [accuracy, reaction_time, attempts]
+    X = np.random.rand(n_samples, 3)
+    X[:, 1] = X[:, 1] * 20  # Scale reaction time to 0-20 seconds
+    X[:, 2] = np.floor(X[:, 2] * 3) + 1  # 1-3 attempts
+    
+    # Difficulty should:
+    # - Increase when accuracy is high, reaction time is low, attempts are low
+    # - Decrease when accuracy is low, reaction time is high, attempts are high
+    # This is a synthetic formula to generate reasonable difficulty levels
+    Y = (0.7 * X[:, 0] - 0.2 * (X[:, 1] / 20) - 0.1 * (X[:, 2] / 3))
+    # Clip to 0-1 range and reshape
+    return X, np.clip(Y, 0.1, 0.9).reshape(-1, 1)
+
+def rule_difficulty(accuracy, reaction_time, attempts):
+    """Rule-based difficulty adjustment, used when no network can answer."""
+    return min(max(
+        accuracy * 1.2 - (reaction_time / 20) * 0.3 - (attempts / 3) * 0.1,
+        0.1), 0.9)
+
+# Ways DifficultyPredictor can run the network ('rules' uses the fallback rule only)
+BACKENDS = ['tensorflow', 'numpy', 'rules']
+
+class DifficultyPredictor(DifficultyPolicy):
+    def __init__(self, model_path=None, backend=None, model=None):
+        """
+        Initialize the difficulty predictor.
+        
+        Args:
+            model_path (str): Saved model (TensorFlow SavedModel, .weights.npz
+                network weights or pickled fallback model) to load instead
+                of training a new network
+            backend (str): One of BACKENDS. Defaults to the PREDICTOR_BACKEND
+                environment variable, else TensorFlow if installed, else
+                NumPy for .weights.npz files and the fallback rule otherwise
+            model: Already trained network (NumpyMLP or Keras model) to use as is
+        """
+        self.cache = None  # Optional PredictionCache, see enable_cache()
+        self.breaker = None  # Optional CircuitBreaker, see enable_deadline()
+        self._fallback_model = None
         self.model = None
         self.tf_available = TF_AVAILABLE
         
-        if self.tf_available:
-            if model_path and os.path.exists(model_path):
-                self.model = tf.keras.models.load_model(model_path)
+        if model is not None:
+            self.backend = 'numpy' if isinstance(model, NumpyMLP) else 'tensorflow'
+            self.model = model
+            self.window = getattr(model, 'window', None) or self.window
+            return
+        
+        backend = backend or os.environ.get('PREDICTOR_BACKEND')
+        if not backend:
+            if self.tf_available:
+                backend = 'tensorflow'
+            elif model_path and model_path.endswith(WEIGHTS_SUFFIX):
+                backend = 'numpy'
             else:
-                self.model = self.create_model()
-                self.train_on_simulated_data()
-        else:
+                backend = 'rules'
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown predictor backend: {backend}")
+        if backend == 'tensorflow' and not self.tf_available:
+            print("TensorFlow not available. Training the network with NumPy instead.")
+            backend = 'numpy'
+        self.backend = backend
+        
+        if backend == 'rules':
             # Fallback for systems without TensorFlow
             self.fallback_model = self.load_fallback_model(model_path)
+            return
+        
+        if model_path and model_path.endswith(WEIGHTS_SUFFIX) and os.path.exists(model_path):
+            # Network weights in the Keras layout, written by either backend
+            network = NumpyMLP.load_weights(model_path)
+            # Average the metrics over the window the network was chosen for
+            self.window = network.window or self.window
+            if backend == 'numpy':
+                self.model = network
+            else:
+                self.model = self.create_model(network.layer_sizes[1:-1])
+                self.model.set_weights(network.get_weights())
+        elif backend == 'tensorflow' and model_path and os.path.exists(model_path):
+            self.model = tf.keras.models.load_model(model_path)
+        else:
+            self.model = self.create_model()
+            self.train_on_simulated_data()
+    
+    @property
+    def model(self):
+        """The TensorFlow model (None when using the fallback)."""
+        return self._model
+    
+    @model.setter
+    def model(self, value):
+        # Cached predictions belong to the previous model
+        self._model = value
+        self.clear_cache()
+    
+    @property
+    def fallback_model(self):
+        """The rule-based (or pickled) model used without TensorFlow."""
+        return self._fallback_model
+    
+    @fallback_model.setter
+    def fallback_model(self, value):
+        self._fallback_model = value
+        self.clear_cache()
+    
+    def enable_cache(self, resolution=0.01, maxsize=4096, dense=False):
+        """
+        Memoize predictions over inputs quantized to the given resolution.
+        
+        Inputs are normalized to [0, 1] and rounded to the nearest multiple of
+        resolution, and the model is evaluated at that grid point, so a cached
+        prediction can differ from the exact one by the model's change over
+        half a grid step.
+        
+        Args:
+            resolution (float): Grid step of the normalized inputs
+            maxsize (int): Maximum number of LRU entries (ignored if dense)
+            dense (bool): Use a preallocated grid instead of an LRU dictionary
+            
+        Returns:
+            PredictionCache: The new cache
+        """
+        self.cache = PredictionCache(resolution, maxsize, dense)
+        return self.cache
+    
+    def disable_cache(self):
+        """Stop memoizing predictions."""
+        self.cache = None
+    
+    def clear_cache(self):
+        """Drop all memoized predictions (called whenever the model changes)."""
+        if self.cache is not None:
+            self.cache.clear()
     
-    def create_model(self):
-        """Create and compile the neural network model."""
+    def cache_info(self):
+        """Return the cache statistics, or None if caching is disabled."""
+        return self.cache.info() if self.cache is not None else None
+    
+    def enable_deadline(self, budget_ms=50, failure_threshold=3, reset_timeout=5.0, workers=8):
+        """
+        Bound the time predict_difficulty waits for the network.
+        
+        When the network misses the budget (or fails), the prediction comes
+        from the rule-based fallback_model instead, and repeated misses open
+        a circuit breaker that skips the network until a periodic probe
+        meets the budget again (see CircuitBreaker). Fallback answers are
+        not memoized in the prediction cache.
+        
+        Args:
+            budget_ms (float): Milliseconds a network prediction may take
+            failure_threshold (int): Consecutive misses that open the circuit
+            reset_timeout (float): Seconds between probes while the circuit is open
+            workers (int): Threads running network predictions, at least the
+                number of threads that predict at once
+            
+        Returns:
+            CircuitBreaker: The new breaker
+        """
+        if self.fallback_model is None:
+            self.fallback_model = self.load_fallback_model()
+        self.breaker = CircuitBreaker(budget_ms / 1000, failure_threshold, reset_timeout, workers)
+        return self.breaker
+    
+    def disable_deadline(self):
+        """Wait for the network however long it takes."""
+        self.breaker = None
+    
+    def deadline_info(self):
+        """Return the circuit breaker statistics, or None without a deadline."""
+        return self.breaker.info() if self.breaker is not None else None
+    
+    def create_model(self, hidden_units=(16, 8)):
+        """Create and compile the neural network model (ReLU hidden layers, sigmoid output)."""
+        if self.backend == 'numpy':
+            return NumpyMLP((3, *hidden_units, 1), seed=42)
         if not self.tf_available:
             return None
             
-        model = tf.keras.Sequential([
-            tf.keras.layers.Dense(16, activation='relu', input_shape=(3,)),
-            tf.keras.layers.Dense(8, activation='relu'),
-            tf.keras.layers.Dense(1, activation='sigmoid')
-        ])
+        layers = [tf.keras.layers.Dense(hidden_units[0], activation='relu', input_shape=(3,))]
+        layers += [tf.keras.layers.Dense(units, activation='relu') for units in hidden_units[1:]]
+        layers.append(tf.keras.layers.Dense(1, activation='sigmoid'))
+        model = tf.keras.Sequential(layers)
         model.compile(optimizer='adam', loss='mse', metrics=['mae'])
         return model
     
     def train_on_simulated_data(self, n_samples=1000):
         """Train the model on simulated data."""
-        if not self.tf_available or self.model is None:
+        if not self._uses_network():
             return False
             
-        # Generate synthetic training data
-        np.random.seed(42)  # For reproducibility
-        
-        # Simulated player performance metrics
-        # Format: [accuracy, reaction_time, attempts]
-        X = np.random.rand(n_samples, 3)
-        X[:, 1] = X[:, 1] * 20  # Scale reaction time to 0-20 seconds
-        X[:, 2] = np.floor(X[:, 2] * 3) + 1  # 1-3 attempts
-        
-        # Difficulty should:
-        # - Increase when accuracy is high, reaction time is low, attempts are low
-        # - Decrease when accuracy is low, reaction time is high, attempts are high
-        # This is a synthetic formula to generate reasonable difficulty levels
-        Y = (0.7 * X[:, 0] - 0.2 * (X[:, 1] / 20) - 0.1 * (X[:, 2] / 3))
-        # Clip to 0-1 range and reshape
-        Y = np.clip(Y, 0.1, 0.9).reshape(-1, 1)
+        X, Y = simulated_training_data(n_samples)
         
         # Train model
         self.model.fit(X, Y, epochs=50, batch_size=32, verbose=0)
@@ -72,9 +460,13 @@ class DifficultyPredictor:
                 return pickle.load(f)
         
         # Otherwise, return a simple function for rule-based difficulty adjustment
-        return lambda accuracy, reaction_time, attempts: min(max(
-            accuracy * 1.2 - (reaction_time / 20) * 0.3 - (attempts / 3) * 0.1,
-            0.1), 0.9)
+        return rule_difficulty
+    
+    def prediction_key(self, accuracy, reaction_time, attempts):
+        """Return the prediction cache cell of the metrics (the metrics themselves without a cache)."""
+        if self.cache is None:
+            return super().prediction_key(accuracy, reaction_time, attempts)
+        return self.cache.key(accuracy, min(reaction_time, 20) / 20, min(attempts, 3) / 3)
     
     def predict_difficulty(self, accuracy, reaction_time, attempts):
         """Predict the next difficulty level based on performance metrics."""
@@ -82,22 +474,136 @@ class DifficultyPredictor:
         norm_reaction_time = min(reaction_time, 20) / 20  # 0-20 seconds scaled to 0-1
         norm_attempts = min(attempts, 3) / 3  # 1-3 attempts scaled to 0-1
         
+        cache = self.cache
+        if cache is None:
+            return self._predict_normalized(accuracy, norm_reaction_time, norm_attempts)[0]
+        
+        # Evaluate the model at the grid point so every input of a cell gets the same answer
+        key = cache.key(accuracy, norm_reaction_time, norm_attempts)
+        difficulty = cache.get(key)
+        if difficulty is None:
+            difficulty, from_model = self._predict_normalized(*cache.point(key))
+            if from_model:
+                cache.put(key, difficulty)
+        return difficulty
+    
+    def _predict_normalized(self, accuracy, norm_reaction_time, norm_attempts):
+        """
+        Evaluate the model on already normalized inputs.
+        
+        Returns:
+            tuple: The difficulty, and False if it came from the fallback
+                rule because the network missed its deadline
+        """
         input_data = np.array([[accuracy, norm_reaction_time, norm_attempts]])
         
-        if self.tf_available and self.model is not None:
-            prediction = self.model.predict(input_data, verbose=0)
-            difficulty = float(prediction[0][0])
+        difficulty = None
+        if self._uses_network():
+            breaker = self.breaker
+            if breaker is None:
+                difficulty = self._predict_network(input_data)
+            else:
+                difficulty = breaker.call(self._predict_network, input_data)
+            from_model = difficulty is not None
         else:
+            from_model = True  # The rule is the model
+        if difficulty is None:
             difficulty = self.fallback_model(accuracy, norm_reaction_time, norm_attempts)
         
         # Ensure the difficulty stays in range [0.1, 0.9]
-        return min(max(difficulty, 0.1), 0.9)
+        return min(max(difficulty, 0.1), 0.9), from_model
+    
+    def _predict_network(self, input_data):
+        """Evaluate the network on one row of normalized inputs."""
+        return float(self.model.predict(input_data, verbose=0)[0][0])
+    
+    def predict_normalized_batch(self, inputs):
+        """
+        Evaluate the model on many normalized inputs at once.
+        
+        Args:
+            inputs (array): Array of shape (n, 3) with accuracy, normalized
+                reaction time and normalized attempts in [0, 1]
+                
+        Returns:
+            np.ndarray: Predicted difficulties of shape (n,), clipped to [0.1, 0.9]
+        """
+        inputs = np.asarray(inputs, dtype=np.float64).reshape(-1, 3)
+        
+        if self._uses_network():
+            predictions = self.model.predict(inputs, verbose=0).reshape(-1)
+        else:
+            predictions = np.array([self.fallback_model(*row) for row in inputs], dtype=np.float64)
+        
+        return np.clip(predictions, 0.1, 0.9)
+    
+    def predict_normalized_cached(self, inputs):
+        """
+        Evaluate many normalized inputs through the prediction cache.
+        
+        Every row is quantized to its grid point, as predict_difficulty does,
+        so each row gets exactly the difficulty predict_difficulty returns for
+        it. Grid points already cached are looked up (one hit or miss per
+        distinct point); the missing ones are evaluated in a single
+        predict_normalized_batch call and stored. Without a cache this is
+        predict_normalized_batch.
+        
+        Args:
+            inputs (array): Array of shape (n, 3), as for predict_normalized_batch
+                
+        Returns:
+            np.ndarray: Predicted difficulties of shape (n,), clipped to [0.1, 0.9]
+        """
+        cache = self.cache
+        if cache is None:
+            return self.predict_normalized_batch(inputs)
+        
+        inputs = np.asarray(inputs, dtype=np.float64).reshape(-1, 3)
+        # np.rint rounds halves to even, like the round() in PredictionCache.key
+        keys = np.rint(np.clip(inputs, 0.0, 1.0) * cache.steps).astype(np.int64)
+        unique_keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+        values = np.empty(len(unique_keys), dtype=np.float64)
+        missing = []
+        for i, key in enumerate(map(tuple, unique_keys.tolist())):
+            value = cache.get(key)
+            if value is None:
+                missing.append(i)
+            else:
+                values[i] = value
+        if missing:
+            values[missing] = self.predict_normalized_batch(unique_keys[missing] / cache.steps)
+            for i in missing:
+                cache.put(tuple(unique_keys[i].tolist()), float(values[i]))
+        return values[inverse.reshape(-1)]
+    
+    def _uses_network(self):
+        """Check whether predictions come from the network rather than the fallback rule."""
+        if self.model is None:
+            return False
+        return self.tf_available or isinstance(self.model, NumpyMLP)
+    
+    def save_weights(self, path='models/difficulty_predictor' + WEIGHTS_SUFFIX):
+        """
+        Save the network weights in the Keras layout, loadable by both backends.
+        
+        Returns:
+            str: The path written, or None without a network
+        """
+        if not self._uses_network():
+            return None
+        kernels = self.model.get_weights()[::2]
+        weights = NumpyMLP([kernels[0].shape[0]] + [kernel.shape[1] for kernel in kernels])
+        weights.set_weights(self.model.get_weights())
+        return weights.save_weights(path, self.window)
     
     def save_model(self, path='models/difficulty_predictor'):
         """Save the model to disk."""
         if not os.path.exists('models'):
             os.makedirs('models')
             
+        if isinstance(self.model, NumpyMLP):
+            self.model.save_weights(path + WEIGHTS_SUFFIX, self.window)
+            return True
         if self.tf_available and self.model is not None:
             self.model.save(path)
             return True
@@ -107,6 +613,32 @@ class DifficultyPredictor:
             return True
         return False
 
-def get_predictor(model_path=None):
-    """Factory function to get a DifficultyPredictor instance."""
-    return DifficultyPredictor(model_path) 
\ No newline at end of file
+# Difficulty policies selectable by name in get_predictor
+POLICIES = ['nn', 'elo']
+
+def get_predictor(model_path=None, policy=None):
+    """
+    Factory function to get a difficulty policy.
+    
+    The default 'nn' policy is a DifficultyPredictor; a model_path ending in
+    .npz loads a precompiled DifficultyTable instead, which needs neither
+    TensorFlow nor the model weights (files ending in .weights.npz hold
+    network weights and load into a DifficultyPredictor). The 'elo' policy
+    is an online EloPolicy (see policies.py), which ignores model_path.
+    
+    Args:
+        model_path (str): Optional path to a saved predictor model
+        policy (str): One of POLICIES (defaults to 'nn')
+        
+    Returns:
+        DifficultyPolicy: The predictor
+    """
+    policy = policy or 'nn'
+    if policy == 'elo':
+        return EloPolicy()
+    if policy != 'nn':
+        raise ValueError(f"Unknown difficulty policy: {policy}")
+    if model_path and model_path.endswith('.npz') and not model_path.endswith(WEIGHTS_SUFFIX):
+        from difficulty_table import DifficultyTable
+        return DifficultyTable.load(model_path)
+    return DifficultyPredictor(model_path)
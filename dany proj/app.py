@@ -1,25 +1,442 @@
 #!/usr/bin/env python3
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
+from flask import Flask, Response, current_app, render_template, request, redirect, url_for, session, flash, jsonify
 import os
+import threading
 import time
 import json
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-from game_logic import TriviaGame
+from game_logic import TriviaGame, get_question_bank, convert_difficulty_value_to_label, public_question
 from data_handler import DataHandler
 from ai_module import get_predictor
 from utils import create_difficulty_label, generate_ascii_progress_bar
+from rendering import init_rendering, precompile_templates, render_static_page
+from leaderboard import Leaderboard, DIFFICULTY_LEVELS
+from player_store import PlayerStore, warm_start_metrics
+from shadow import ShadowEvaluator, parse_shadow_models
+from inference_service import RemotePredictor
+from rooms import RoomRegistry, format_event
 
 # Create Flask app
 app = Flask(__name__)
 app.secret_key = os.urandom(24)  # Secret key for session management
 app.config['SESSION_TYPE'] = 'filesystem'
+app.config['PREFETCH_QUESTIONS'] = True  # Prepare the next question while the player answers
+app.config['LEADERBOARD_DB'] = os.environ.get('LEADERBOARD_DB', 'data/leaderboard.db')
+app.config['PLAYER_DB'] = os.environ.get('PLAYER_DB', 'data/players.db')
+app.config['DIFFICULTY_POLICY'] = os.environ.get('DIFFICULTY_POLICY', 'nn')  # 'nn' or 'elo'
+app.config['SHADOW_MODELS'] = os.environ.get('SHADOW_MODELS', '')  # Candidates evaluated in shadow mode
+app.config['INFERENCE_WORKERS'] = int(os.environ.get('INFERENCE_WORKERS', 0))  # 0 predicts in-process
+app.config['INFERENCE_THREADS'] = int(os.environ.get('INFERENCE_THREADS', 1))  # TF/BLAS threads per worker
+app.config['WEB_THREADS'] = int(os.environ.get('WEB_THREADS', 8))  # Request threads per process (see serve.py)
+# Room event streams per process; each holds a request thread, so serve.py adds this many threads
+app.config['ROOM_STREAMS'] = int(os.environ.get('ROOM_STREAMS', 100))
+init_rendering(app)
 
 # Global variables to store game state
 games = {}  # Dictionary to store game instances by session ID
 data_handlers = {}  # Dictionary to store data handlers by session ID
 ai_predictors = {}  # Dictionary to store AI predictors by session ID
+prefetches = {}  # Pending next-question prefetches by session ID
+
+# Background threads that prepare next questions off the request path
+PREFETCH_WORKERS = 4
+prefetch_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix='prefetch')
+# Answers whose next difficulty came from the prefetch, and answers predicted again (see /api/prefetch)
+prefetch_counts = {'hits': 0, 'misses': 0}
+prefetch_counts_lock = threading.Lock()
+
+# Predictor shared by all sessions once preload_resources() has run
+shared_predictor = None
+
+# Candidate predictors compared with the live one off the request path (None when disabled)
+shadow_evaluator = None
+
+# Leaderboard of finished games, opened on first use by get_leaderboard()
+leaderboard = None
+
+def get_leaderboard():
+    """Return the process-wide leaderboard, opening its database on first use."""
+    global leaderboard
+    if leaderboard is None:
+        leaderboard = Leaderboard(app.config['LEADERBOARD_DB'])
+    return leaderboard
+
+# Profiles of returning players, opened on first use by get_player_store()
+player_store = None
+
+def get_player_store():
+    """Return the process-wide player profile store, opening its database on first use."""
+    global player_store
+    if player_store is None:
+        player_store = PlayerStore(app.config['PLAYER_DB'])
+    return player_store
+
+# Multiplayer rooms, created on first use by get_rooms()
+rooms = None
+# Free room event stream slots, created on first use by get_room_stream_slots()
+room_stream_slots = None
+
+def get_rooms():
+    """Return the process-wide room registry, sharing the predictor with single-player games."""
+    global rooms
+    if rooms is None:
+        rooms = RoomRegistry(shared_predictor or get_predictor(policy=app.config['DIFFICULTY_POLICY']))
+    return rooms
+
+def get_room_stream_slots():
+    """Return the semaphore that caps this process's open room event streams at ROOM_STREAMS."""
+    global room_stream_slots
+    if room_stream_slots is None:
+        room_stream_slots = threading.BoundedSemaphore(max(app.config['ROOM_STREAMS'], 0))
+    return room_stream_slots
+
+def preload_resources(model_path=None):
+    """
+    Load the question bank, templates and difficulty predictor once per process.
+    
+    WSGI servers call this (through create_app) before forking workers so the
+    expensive model setup is paid once and shared copy-on-write.
+    
+    Args:
+        model_path (str): Optional path to a saved predictor model
+        
+    Returns:
+        DifficultyPredictor: The shared predictor instance
+    """
+    global shared_predictor, shadow_evaluator
+    
+    # Ensure directories exist
+    os.makedirs('data', exist_ok=True)
+    os.makedirs('models', exist_ok=True)
+    
+    get_question_bank()
+    precompile_templates(app)
+    # Answer with the rule-based fallback when the network is slow ("0" waits however long it takes)
+    deadline_ms = float(os.environ.get('PREDICTION_DEADLINE_MS', 100))
+    if app.config['INFERENCE_WORKERS'] > 0 and app.config['DIFFICULTY_POLICY'] == 'nn':
+        # Run the model in separate processes, started in each web worker (see start_inference_service)
+        shared_predictor = RemotePredictor(model_path, workers=app.config['INFERENCE_WORKERS'],
+                                           threads=app.config['INFERENCE_THREADS'],
+                                           timeout=deadline_ms / 1000 if deadline_ms > 0 else None)
+    else:
+        shared_predictor = get_predictor(model_path, app.config['DIFFICULTY_POLICY'])
+    
+    # Memoize predictions over quantized inputs ("0" disables the cache)
+    cache_resolution = float(os.environ.get('PREDICTION_CACHE_RESOLUTION', 0.01))
+    if cache_resolution > 0 and hasattr(shared_predictor, 'enable_cache'):
+        shared_predictor.enable_cache(resolution=cache_resolution)
+    
+    if deadline_ms > 0 and hasattr(shared_predictor, 'enable_deadline'):
+        # Every request and prefetch thread may be predicting at once
+        shared_predictor.enable_deadline(budget_ms=deadline_ms,
+                                         workers=app.config['WEB_THREADS'] + PREFETCH_WORKERS)
+    
+    shadow_models = parse_shadow_models(app.config['SHADOW_MODELS'])
+    if shadow_models and shadow_evaluator is None:
+        shadow_evaluator = ShadowEvaluator({name: get_predictor(path) for name, path in shadow_models.items()})
+    return shared_predictor
+
+def start_inference_service(wait=True):
+    """
+    Start this process's inference worker processes now instead of on the first prediction.
+    
+    The service can't be shared across a fork, so servers that fork workers
+    call this in every worker after the fork (see serve.py).
+    
+    Args:
+        wait (bool): Whether to wait until the workers have loaded the model
+            (predictions use the rule-based fallback until then)
+    """
+    if isinstance(shared_predictor, RemotePredictor):
+        shared_predictor.start(wait)
+
+def create_app(preload=True, model_path=None, threads=None, room_streams=None):
+    """
+    Application factory for production WSGI servers (see serve.py).
+    
+    Args:
+        preload (bool): Whether to load the question bank and predictor now
+        model_path (str): Optional path to a saved predictor model
+        threads (int): Request threads per process (defaults to WEB_THREADS)
+        room_streams (int): Room event streams per process (defaults to ROOM_STREAMS)
+        
+    Returns:
+        Flask: The configured Flask application
+    """
+    if threads:
+        app.config['WEB_THREADS'] = threads
+    if room_streams is not None:
+        app.config['ROOM_STREAMS'] = room_streams
+    if preload:
+        preload_resources(model_path or os.environ.get('MODEL_PATH'))
+    return app
+
+def flush_pending_logs():
+    """
+    Save the performance data of every unfinished game to CSV.
+    
+    Called on graceful shutdown so in-progress games are not lost. Buffered
+    leaderboard entries are written to the database as well.
+    
+    Returns:
+        list: Paths of the CSV files that were written
+    """
+    saved = []
+    for session_id, data_handler in list(data_handlers.items()):
+        if len(data_handler.rows) == 0:
+            continue
+        try:
+            saved.append(data_handler.save_to_csv())
+        except Exception as e:
+            print(f"Error saving CSV for session {session_id}: {e}")
+    if leaderboard is not None:
+        try:
+            leaderboard.flush()
+        except Exception as e:
+            print(f"Error saving leaderboard: {e}")
+    return saved
+
+def _schedule_prefetch(session_id, question):
+    """Start preparing the next question for both outcomes of the current one."""
+    game = games[session_id]
+    data_handler = data_handlers[session_id]
+    ai_predictor = ai_predictors[session_id]
+    
+    def predict_next(correct):
+        # Online policies know the next difficulty from the answer alone
+        difficulty = ai_predictor.preview_answer(question.get('id'), question['difficulty'], correct)
+        if difficulty is not None:
+            return difficulty
+        
+        # The reaction time isn't known yet, so assume the player's recent average
+        _, expected_reaction_time, _ = data_handler.get_average_metrics()
+        avg_accuracy, avg_reaction_time, avg_attempts = data_handler.get_average_metrics_with(
+            1.0 if correct else 0.0, expected_reaction_time, 1)
+        return ai_predictor.predict_difficulty(avg_accuracy, avg_reaction_time, avg_attempts)
+    
+    prefetches[session_id] = prefetch_executor.submit(game.prefetch_next_questions, predict_next)
+
+def _finish_prefetch(session_id):
+    """Wait for a pending prefetch of the session, so the game isn't used concurrently."""
+    future = prefetches.pop(session_id, None)
+    if future is None:
+        return
+    try:
+        future.result()
+    except Exception as e:
+        print(f"Error prefetching next question: {e}")
+
+def _cleanup_session(session_id):
+    """Release the game resources held for a session."""
+    _finish_prefetch(session_id)
+    if session_id in games:
+        del games[session_id]
+    if session_id in data_handlers:
+        del data_handlers[session_id]
+    if session_id in ai_predictors:
+        del ai_predictors[session_id]
+
+def _start_game(player_name):
+    """
+    Create the game objects for a new player and reset the session state.
+    
+    Args:
+        player_name (str): Name entered by the player
+        
+    Returns:
+        str: The new session ID
+    """
+    session['player_name'] = player_name
+    session['session_id'] = os.urandom(8).hex()
+    session_id = session['session_id']
+    
+    # Returning players continue from their last difficulty and recent form
+    try:
+        profile = get_player_store().get(player_name)
+    except Exception as e:
+        print(f"Error loading player profile: {e}")
+        profile = None
+    
+    game = TriviaGame(player_name, profile['last_difficulty'] if profile else 0.5)
+    if profile:
+        # Don't repeat questions the player saw in earlier games
+        game.set_asked_questions(profile['seen_questions'])
+    games[session_id] = game
+    predictor = shared_predictor or get_predictor(policy=app.config['DIFFICULTY_POLICY'])
+    # Average the metrics over the window the predictor was chosen for
+    data_handlers[session_id] = DataHandler(player_name, warm_start_metrics(profile), predictor.window)
+    ai_predictors[session_id] = predictor.for_player(game.get_current_difficulty())
+    
+    # Initialize game state
+    session['round_number'] = 0
+    session['max_rounds'] = 10
+    session['score'] = 0
+    session['start_time'] = time.time()
+    
+    # The game instance keeps the seen questions; the session cookie never carries them
+    session.pop('asked_questions', None)
+    session['questions_asked'] = 0
+    session.pop('current_question', None)
+    session.pop('feedback', None)
+    
+    return session_id
+
+def _get_session_game():
+    """
+    Look up the game objects of the current session.
+    
+    Returns:
+        tuple: (game, data_handler, ai_predictor), or None if there is no active game
+    """
+    session_id = session.get('session_id')
+    if 'player_name' not in session or session_id not in games:
+        return None
+    return games[session_id], data_handlers[session_id], ai_predictors[session_id]
+
+def _submit_answer(game, data_handler, ai_predictor, user_answer, question_id):
+    """
+    Score an answer to the current question and adapt the difficulty.
+    
+    Args:
+        game (TriviaGame): The player's game
+        data_handler (DataHandler): The player's performance log
+        ai_predictor (DifficultyPolicy): The player's policy for the next difficulty
+        user_answer (str): The selected option (1-4 or a-d)
+        question_id (int): ID of the question being answered
+        
+    Returns:
+        dict: JSON serializable feedback, or None if question_id is not the current question
+    """
+    reaction_time = time.time() - session.get('question_time', time.time())
+    
+    # Get the current question from session
+    current_question = session.get('current_question', None)
+    
+    if not current_question or question_id != current_question.get('id', -2):
+        return None
+    
+    # The reaction time a prefetch assumed for this answer (nothing is logged in between)
+    _, assumed_reaction_time, _ = data_handler.get_average_metrics()
+    
+    # Evaluate answer
+    correct, points = game.evaluate_answer(current_question, user_answer, reaction_time)
+    game.record_answer(current_question, correct)
+    # The metrics a prefetch predicted this outcome from (see _schedule_prefetch)
+    prefetch_metrics = data_handler.get_average_metrics_with(1.0 if correct else 0.0, assumed_reaction_time, 1)
+    
+    # Update game state
+    round_result = {
+        "correct": correct,
+        "points": points,
+        "reaction_time": reaction_time,
+        "attempts": 1,  # Simplified for web version
+        "accuracy": 1.0 if correct else 0.0,
+        "difficulty": current_question['difficulty']
+    }
+    
+    # Update score in both game instance and session
+    game.update_score(points)
+    session['score'] = game.get_score()
+    
+    # Get current game difficulty
+    current_difficulty = game.get_current_difficulty()
+    
+    # Log performance data
+    data_handler.log_performance(
+        session['round_number'],
+        current_difficulty,
+        round_result["accuracy"],
+        round_result["reaction_time"],
+        round_result["attempts"],
+        current_question.get('id')
+    )
+    
+    # Online policies learn from every answer and return the next difficulty
+    rated_difficulty = ai_predictor.record_answer(
+        current_question.get('id'), current_question['difficulty'], correct)
+    
+    live_metrics = None  # Metrics the live difficulty was predicted from (None for online policies)
+    new_difficulty = rated_difficulty
+    if new_difficulty is None:
+        real_metrics = data_handler.get_average_metrics()
+        # The prefetch assumed the player's average reaction time; its prediction still holds
+        # when the real metrics fall in the same prediction cache cell as the assumed ones
+        prefetch_hit = (correct in game.prefetched and
+                        ai_predictor.prediction_key(*real_metrics) == ai_predictor.prediction_key(*prefetch_metrics))
+        with prefetch_counts_lock:
+            prefetch_counts['hits' if prefetch_hit else 'misses'] += 1
+        
+        if not prefetch_hit:
+            # Use AI to predict new difficulty from the real metrics
+            live_metrics = real_metrics
+            new_difficulty = ai_predictor.predict_difficulty(*real_metrics)
+    
+    # Use the question prepared ahead of time for this outcome if it was prepared for this difficulty
+    prefetched_difficulty = game.take_prefetched(correct, new_difficulty)
+    if new_difficulty is None:
+        new_difficulty = prefetched_difficulty
+        live_metrics = prefetch_metrics
+    
+    if shadow_evaluator is not None and live_metrics is not None:
+        # Candidates get the exact metrics the live difficulty came from, so only the models differ
+        # (online policies don't predict from metrics). Only queues the sample; the candidates
+        # run on the evaluator's thread
+        shadow_evaluator.submit(*live_metrics, new_difficulty)
+    
+    # Adjust game difficulty
+    game.adjust_difficulty(new_difficulty)
+    
+    # The question has been answered, so it can't be submitted twice
+    session.pop('current_question', None)
+    
+    # Increment round number
+    session['round_number'] += 1
+    
+    # Feedback must stay JSON serializable since it is stored in the session
+    return {
+        'correct': correct,
+        'points': points,
+        'old_difficulty': create_difficulty_label(current_difficulty),
+        'new_difficulty': create_difficulty_label(new_difficulty),
+        'difficulty_change': "increase" if new_difficulty > current_difficulty else "decrease",
+        'progress_bar': generate_ascii_progress_bar(new_difficulty, 1.0)
+    }
+
+def _issue_question(game):
+    """
+    Generate the next question and remember it (and its start time) in the session.
+    
+    Args:
+        game (TriviaGame): The player's game
+        
+    Returns:
+        dict: The question, including its correct answer
+    """
+    # Generate question with unique ID to prevent duplicate submissions
+    question = game.generate_question()
+    
+    # Ensure the question has an ID
+    if 'id' not in question:
+        question['id'] = int(time.time())  # Use timestamp as unique ID
+    
+    # Store question and start time in session
+    session['current_question'] = question
+    session['question_time'] = time.time()
+    
+    session['questions_asked'] = session.get('questions_asked', 0) + 1
+    
+    # Prepare the following question while the player thinks about this one
+    if current_app.config.get('PREFETCH_QUESTIONS'):
+        _schedule_prefetch(session['session_id'], question)
+    
+    return question
+
+def _is_game_over():
+    """Check whether the player has played all rounds of the current game."""
+    return session['round_number'] >= session['max_rounds']
 
 @app.route('/', methods=['GET', 'POST'])
 def index():
@@ -31,27 +448,12 @@ def index():
             return redirect(url_for('index'))
 
         # Initialize game components
-        session['player_name'] = player_name
-        session['session_id'] = os.urandom(8).hex()
-        session_id = session['session_id']
-        
-        games[session_id] = TriviaGame(player_name)
-        data_handlers[session_id] = DataHandler(player_name)
-        ai_predictors[session_id] = get_predictor()
-        
-        # Initialize game state
-        session['round_number'] = 0
-        session['max_rounds'] = 10
-        session['score'] = 0
-        session['start_time'] = time.time()
-        
-        # Initialize asked_questions as a list (for JSON serialization)
-        # Explicitly converting to list for JSON serialization
-        session['asked_questions'] = []
+        _start_game(player_name)
         
         return redirect(url_for('game'))
     
-    return render_template('index.html')
+    # The home page is the same for everyone, so serve it from cache with an ETag
+    return render_static_page('index.html', request)
 
 @app.route('/game', methods=['GET', 'POST'])
 def game():
@@ -60,92 +462,27 @@ def game():
         flash('Please enter your name to start the game.', 'error')
         return redirect(url_for('index'))
     
-    session_id = session['session_id']
-    
-    if session_id not in games:
+    active_game = _get_session_game()
+    if active_game is None:
         flash('Your game session expired. Please start a new game.', 'error')
         return redirect(url_for('index'))
     
-    game = games[session_id]
-    data_handler = data_handlers[session_id]
-    ai_predictor = ai_predictors[session_id]
-    
-    # Update asked_questions in the game instance from session
-    # Explicitly converting from list to set for the game logic
-    if 'asked_questions' in session:
-        game.set_asked_questions(session['asked_questions'])
+    game, data_handler, ai_predictor = active_game
+    _finish_prefetch(session['session_id'])
     
     # Process answer if POST request
     if request.method == 'POST':
         user_answer = request.form.get('answer', '').strip()
-        reaction_time = time.time() - session.get('question_time', time.time())
         question_id = int(request.form.get('question_id', -1))
         
-        # Get the current question from session
-        current_question = session.get('current_question', None)
+        feedback = _submit_answer(game, data_handler, ai_predictor, user_answer, question_id)
         
-        if current_question and question_id == current_question.get('id', -2):
-            # Evaluate answer
-            correct, points = game.evaluate_answer(current_question, user_answer, reaction_time)
-            
-            # Update game state
-            round_result = {
-                "correct": correct,
-                "points": points,
-                "reaction_time": reaction_time,
-                "attempts": 1,  # Simplified for web version
-                "accuracy": 1.0 if correct else 0.0,
-                "difficulty": current_question['difficulty']
-            }
-            
-            # Update score in both game instance and session
-            game.update_score(points)
-            session['score'] = game.get_score()
-            
-            # Get current game difficulty
-            current_difficulty = game.get_current_difficulty()
-            
-            # Log performance data
-            data_handler.log_performance(
-                session['round_number'],
-                current_difficulty,
-                round_result["accuracy"],
-                round_result["reaction_time"],
-                round_result["attempts"]
-            )
-            
-            # Get performance metrics
-            avg_accuracy, avg_reaction_time, avg_attempts = data_handler.get_average_metrics()
-            
-            # Use AI to predict new difficulty
-            new_difficulty = ai_predictor.predict_difficulty(
-                avg_accuracy, 
-                avg_reaction_time,
-                avg_attempts
-            )
-            
-            # Adjust game difficulty
-            game.adjust_difficulty(new_difficulty)
-            
-            # Store feedback in session (ensure all values are JSON serializable)
-            session['feedback'] = {
-                'correct': correct,
-                'points': points,
-                'old_difficulty': create_difficulty_label(current_difficulty),
-                'new_difficulty': create_difficulty_label(new_difficulty),
-                'difficulty_change': "increase" if new_difficulty > current_difficulty else "decrease",
-                'progress_bar': generate_ascii_progress_bar(new_difficulty, 1.0)
-            }
-            
-            # Update asked_questions in session from game instance
-            # Explicitly converting from set to list for JSON serialization
-            session['asked_questions'] = game.get_asked_questions()
-            
-            # Increment round number
-            session['round_number'] += 1
+        if feedback is not None:
+            # Store feedback in session for the next page
+            session['feedback'] = feedback
             
             # Check if game is over
-            if session['round_number'] >= session['max_rounds']:
+            if _is_game_over():
                 return redirect(url_for('results'))
             
             # Redirect to avoid form resubmission
@@ -158,20 +495,7 @@ def game():
     if current_round > session['max_rounds']:
         return redirect(url_for('results'))
     
-    # Generate question with unique ID to prevent duplicate submissions
-    question = game.generate_question()
-    
-    # Ensure the question has an ID
-    if 'id' not in question:
-        question['id'] = int(time.time())  # Use timestamp as unique ID
-    
-    # Store question and start time in session
-    session['current_question'] = question
-    session['question_time'] = time.time()
-    
-    # Update asked_questions in session
-    # Explicitly converting from set to list for JSON serialization
-    session['asked_questions'] = game.get_asked_questions()
+    question = _issue_question(game)
     
     # Get feedback from previous round
     feedback = session.pop('feedback', None)
@@ -229,25 +553,34 @@ def results():
         csv_saved = False
         csv_path = None
     
+    # Add the game to the leaderboard
+    try:
+        get_leaderboard().record_game(player_name, score,
+                                      convert_difficulty_value_to_label(game.get_current_difficulty()))
+    except Exception as e:
+        print(f"Error recording leaderboard entry: {e}")
+    
+    # Remember where the player left off for their next game
+    try:
+        get_player_store().record_game(player_name, data_handler.rows, game.get_current_difficulty(), score,
+                                       game.asked_questions.serialize())
+    except Exception as e:
+        print(f"Error saving player profile: {e}")
+    
     # Calculate total time played
     total_time = time.time() - session.get('start_time', time.time())
     total_time_str = f"{int(total_time // 60)} minutes and {int(total_time % 60)} seconds"
     
     # Get statistics on question difficulty distribution
     question_stats = {
-        'total_questions': len(session.get('asked_questions', [])),
+        'total_questions': session.get('questions_asked', 0),
         'easy_questions': 0,
         'medium_questions': 0,
         'hard_questions': 0
     }
     
     # Clean up game resources
-    if session_id in games:
-        del games[session_id]
-    if session_id in data_handlers:
-        del data_handlers[session_id]
-    if session_id in ai_predictors:
-        del ai_predictors[session_id]
+    _cleanup_session(session_id)
     
     return render_template(
         'results.html',
@@ -269,40 +602,315 @@ def restart():
     session_id = session.get('session_id')
     
     # Clean up game resources
-    if session_id in games:
-        del games[session_id]
-    if session_id in data_handlers:
-        del data_handlers[session_id]
-    if session_id in ai_predictors:
-        del ai_predictors[session_id]
+    _cleanup_session(session_id)
     
     # Clear session
     session.clear()
     
     return redirect(url_for('index'))
 
+@app.route('/leaderboard')
+def leaderboard_page():
+    """Leaderboard page with the best games overall, today and per difficulty."""
+    board = get_leaderboard()
+    return render_template(
+        'leaderboard.html',
+        global_top=board.top('global'),
+        daily_top=board.top('daily'),
+        difficulty_tops={level: board.top('difficulty', level) for level in DIFFICULTY_LEVELS}
+    )
+
+@app.route('/api/leaderboard')
+def api_leaderboard():
+    """API endpoint to get the top games of a leaderboard."""
+    scope = request.args.get('scope', 'global')
+    key = request.args.get('day') if scope == 'daily' else request.args.get('difficulty')
+    try:
+        n = int(request.args.get('n', 10))
+        if not 1 <= n <= 100:
+            raise ValueError("n must be between 1 and 100")
+        entries = get_leaderboard().top(scope, key, n)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({'scope': scope, 'key': key, 'entries': entries})
+
+@app.route('/api/shadow')
+def api_shadow():
+    """API endpoint to get the divergence of the shadow predictors from the live one."""
+    if shadow_evaluator is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, **shadow_evaluator.stats()})
+
+@app.route('/api/prefetch')
+def api_prefetch():
+    """API endpoint to get how often the prefetched difficulty was used without predicting again."""
+    with prefetch_counts_lock:
+        hits, misses = prefetch_counts['hits'], prefetch_counts['misses']
+    return jsonify({
+        'enabled': app.config['PREFETCH_QUESTIONS'],
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / (hits + misses) if hits + misses else 0.0
+    })
+
 @app.route('/api/question-stats')
 def question_stats():
     """API endpoint to get question statistics."""
     if 'session_id' not in session:
         return jsonify({'error': 'No active session'}), 400
         
-    questions_asked = len(session.get('asked_questions', []))
+    questions_asked = session.get('questions_asked', 0)
     
     return jsonify({
         'questions_asked': questions_asked,
         'max_questions': session.get('max_rounds', 10)
     })
 
-if __name__ == '__main__':
-    # Ensure directories exist
-    os.makedirs('data', exist_ok=True)
-    os.makedirs('models', exist_ok=True)
+def _game_state(game):
+    """Build the JSON game state returned by the API endpoints."""
+    return {
+        'player_name': session['player_name'],
+        'score': game.get_score(),
+        'round_number': session['round_number'],
+        'max_rounds': session['max_rounds'],
+        'difficulty': create_difficulty_label(game.get_current_difficulty())
+    }
+
+@app.route('/api/start', methods=['POST'])
+def api_start():
+    """API endpoint to start a new game and get its first question."""
+    data = request.get_json(silent=True) or {}
+    player_name = str(data.get('player_name', '')).strip()
+    if not player_name:
+        return jsonify({'error': 'player_name is required'}), 400
+    
+    session_id = _start_game(player_name)
+    game = games[session_id]
     
-    # Determine the port from the environment, default to 5000
-    port = int(os.environ.get('PORT', 5000))
+    session['round_number'] = 1
+    question = _issue_question(game)
     
-    # Setup pyngrok for a persistent public URL using a reserved subdomain
+    return jsonify({
+        'state': _game_state(game),
+        'question': public_question(question)
+    })
+
+@app.route('/api/question')
+def api_question():
+    """API endpoint to get the question currently waiting for an answer."""
+    active_game = _get_session_game()
+    if active_game is None:
+        return jsonify({'error': 'No active game'}), 400
+    
+    game = active_game[0]
+    _finish_prefetch(session['session_id'])
+    current_question = session.get('current_question')
+    if current_question is None:
+        if _is_game_over():
+            return jsonify({'state': _game_state(game), 'question': None, 'game_over': True})
+        current_question = _issue_question(game)
+    
+    return jsonify({
+        'state': _game_state(game),
+        'question': public_question(current_question),
+        'game_over': False
+    })
+
+@app.route('/api/answer', methods=['POST'])
+def api_answer():
+    """
+    API endpoint to answer the current question.
+    
+    Returns the feedback for the answer together with the next question,
+    so each round needs a single request.
+    """
+    active_game = _get_session_game()
+    if active_game is None:
+        return jsonify({'error': 'No active game'}), 400
+    
+    game, data_handler, ai_predictor = active_game
+    _finish_prefetch(session['session_id'])
+    data = request.get_json(silent=True) or {}
+    try:
+        question_id = int(data.get('question_id', -1))
+    except (TypeError, ValueError):
+        question_id = -1
+    user_answer = str(data.get('answer', '')).strip()
+    
+    feedback = _submit_answer(game, data_handler, ai_predictor, user_answer, question_id)
+    if feedback is None:
+        return jsonify({'error': 'question_id does not match the current question'}), 409
+    feedback['difficulty_change'] = feedback['difficulty_change'] == "increase"
+    
+    game_over = _is_game_over()
+    next_question = None if game_over else public_question(_issue_question(game))
+    
+    return jsonify({
+        'feedback': feedback,
+        'state': _game_state(game),
+        'question': next_question,
+        'game_over': game_over,
+        'results_url': url_for('results') if game_over else None
+    })
+
+def _get_room(room_id):
+    """Return a room, or None (after which the caller answers 404)."""
+    return get_rooms().get(room_id)
+
+@app.route('/api/rooms', methods=['POST'])
+def api_create_room():
+    """API endpoint to create a multiplayer room; the host token is needed to start rounds."""
+    data = request.get_json(silent=True) or {}
+    try:
+        rounds = int(data.get('rounds', 10))
+        answer_seconds = float(data.get('answer_seconds', 15))
+        if not 1 <= rounds <= 50 or not 1 <= answer_seconds <= 120:
+            raise ValueError("rounds must be 1-50 and answer_seconds 1-120")
+        room = get_rooms().create(rounds=rounds, answer_seconds=answer_seconds)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'room_id': room.room_id,
+        'host_token': room.host_token,
+        'events_url': url_for('api_room_events', room_id=room.room_id)
+    })
+
+@app.route('/api/rooms/<room_id>')
+def api_room(room_id):
+    """API endpoint to get the full state of a room."""
+    room = _get_room(room_id)
+    if room is None:
+        return jsonify({'error': 'No such room'}), 404
+    return jsonify(room.snapshot())
+
+@app.route('/api/rooms/<room_id>/join', methods=['POST'])
+def api_join_room(room_id):
+    """API endpoint to join a room; answers are sent with the returned player_id."""
+    room = _get_room(room_id)
+    if room is None:
+        return jsonify({'error': 'No such room'}), 404
+    data = request.get_json(silent=True) or {}
+    player_name = str(data.get('player_name', '')).strip()
+    if not player_name:
+        return jsonify({'error': 'player_name is required'}), 400
+    try:
+        player_id = room.join(player_name)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 409
+    
+    return jsonify({
+        'player_id': player_id,
+        'events_url': url_for('api_room_events', room_id=room_id)
+    })
+
+@app.route('/api/rooms/<room_id>/next', methods=['POST'])
+def api_next_room_question(room_id):
+    """API endpoint for the host to close the current round and issue the next question."""
+    room = _get_room(room_id)
+    if room is None:
+        return jsonify({'error': 'No such room'}), 404
+    data = request.get_json(silent=True) or {}
+    if data.get('host_token') != room.host_token:
+        return jsonify({'error': 'Only the host can start rounds'}), 403
+    
+    question = room.start_round()
+    return jsonify({
+        'round_number': room.round_number,
+        'question': public_question(question) if question else None,
+        'game_over': question is None
+    })
+
+@app.route('/api/rooms/<room_id>/answer', methods=['POST'])
+def api_room_answer(room_id):
+    """API endpoint to answer the room's current question; results arrive as events."""
+    room = _get_room(room_id)
+    if room is None:
+        return jsonify({'error': 'No such room'}), 404
+    data = request.get_json(silent=True) or {}
+    try:
+        question_id = int(data.get('question_id', -1))
+    except (TypeError, ValueError):
+        question_id = -1
+    try:
+        accepted = room.submit(str(data.get('player_id', '')), question_id, str(data.get('answer', '')).strip())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 409
+    
+    return jsonify({'accepted': accepted})
+
+@app.route('/api/rooms/<room_id>/events')
+def api_room_events(room_id):
+    """
+    Server-Sent Events stream of a room.
+    
+    The stream starts with a 'snapshot' event holding the full room state,
+    followed by the 'question' and 'results' events of every round.
+    Reconnecting clients send Last-Event-ID and only get what they missed.
+    
+    A stream holds its request thread until it ends, so a process serves at
+    most ROOM_STREAMS of them (serve.py adds that many threads); further
+    streams are refused with 503 instead of starving the other routes.
+    """
+    room = _get_room(room_id)
+    if room is None:
+        return jsonify({'error': 'No such room'}), 404
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID', ''))
+    except ValueError:
+        last_event_id = None
+    
+    slots = get_room_stream_slots()
+    if not slots.acquire(blocking=False):
+        response = jsonify({'error': 'Too many open event streams, try again later'})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+    response = Response(_room_stream(room, last_event_id), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # WSGI servers close every response, even when the client left before the first event
+    response.call_on_close(slots.release)
+    return response
+
+def _room_stream(room, last_event_id=None, keepalive=15):
+    """
+    Yield the events of a room to one subscriber.
+    
+    Args:
+        room (Room): The room
+        last_event_id (int): Last event the client already has (None sends a snapshot first)
+        keepalive (float): Seconds between comments that keep idle connections open
+    """
+    after = last_event_id
+    while True:
+        if after is None:
+            # New clients, and clients too far behind for the event log, start from the full state
+            snapshot = room.snapshot()
+            after = snapshot['last_event_id']
+            yield format_event('snapshot', snapshot, after)
+        
+        messages = room.events.read(after, timeout=keepalive)
+        if messages is None:
+            after = None
+        elif messages:
+            for _, message in messages:
+                yield message
+            after = messages[-1][0]
+        elif room.events.closed:
+            return
+        else:
+            yield b': keep-alive\n\n'
+
+def start_ngrok_tunnel(port):
+    """
+    Open a pyngrok tunnel to the given port, using a reserved subdomain if configured.
+    
+    Args:
+        port (int): Local port the web server listens on
+        
+    Returns:
+        str: The public URL, or None if no tunnel could be created
+    """
     try:
         from pyngrok import ngrok
         authtoken = os.environ.get('NGROK_AUTHTOKEN')
@@ -313,6 +921,7 @@ if __name__ == '__main__':
             public_url = ngrok.connect(port, subdomain=subdomain)
             print(" * Persistent Public URL:", public_url)
             print(" * Share this URL with others to let them access your trivia game!")
+            return public_url
         else:
             print(" * NGROK_AUTHTOKEN and NGROK_SUBDOMAIN not set.")
             print(" * To get a persistent URL, sign up for ngrok, reserve a subdomain,")
@@ -323,16 +932,30 @@ if __name__ == '__main__':
                 temp_url = ngrok.connect(port)
                 print(" * Temporary Public URL:", temp_url)
                 print(" * Note: This URL will change each time you restart the app.")
+                return temp_url
             except Exception as e:
                 print(f" * Error creating temporary URL: {e}")
     except ImportError:
         print("pyngrok is not installed. Please run 'pip install pyngrok' and try again.")
     except Exception as e:
         print(f"Error setting up ngrok: {e}")
+    return None
+
+if __name__ == '__main__':
+    # Development server only; use serve.py for production deployments
+    # Ensure directories exist
+    os.makedirs('data', exist_ok=True)
+    os.makedirs('models', exist_ok=True)
+    
+    # Determine the port from the environment, default to 5000
+    port = int(os.environ.get('PORT', 5000))
+    
+    # Setup pyngrok for a persistent public URL using a reserved subdomain
+    start_ngrok_tunnel(port)
     
     # Run the Flask app, binding to 0.0.0.0 so it's accessible externally
     try:
         app.run(host='0.0.0.0', port=port, debug=True)
     except OSError as e:
         print(f"Error: {e}")
-        print("Port", port, "is in use. Please set a different port with the PORT environment variable.") 
\ No newline at end of file
+        print("Port", port, "is in use. Please set a different port with the PORT environment variable.")
\ No newline at end of file
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# Adaptive Trivia Quiz Game - Item Response Calibration of Question Difficulty
+"""
+Calibrate question difficulties from logged answers with a Rasch (1PL IRT) model.
+
+Every logged answer of player p to question q is modelled as
+
+    P(correct) = sigmoid(ability[p] - difficulty[q])
+
+and both parameter vectors are fitted by maximum a posteriori estimation
+(standard normal priors keep players and questions with all-correct or
+all-wrong answers finite). Each iteration takes one Newton step on every
+ability and then on every difficulty; the gradients and curvatures are
+sums over answers, computed with np.bincount over chunks of the responses
+in parallel worker processes.
+
+The fitted difficulties are mapped to the game's 0.1-0.9 scale and written
+back into the question bank as `calibrated_difficulty` (and the matching
+label), which the game then uses in place of the hand-assigned labels.
+
+Usage:
+    python calibration.py --data-dir data --bank question_bank.json
+    python calibration.py --output question_bank.calibrated.json --min-responses 50
+"""
+import argparse
+import glob
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from game_logic import convert_difficulty_value_to_label
+
+def read_responses(data_dir='data', pattern='*.csv', chunksize=100000):
+    """
+    Read every logged answer that records its question ID.
+
+    Logs are read in chunks, so only the three needed columns of the whole
+    archive are held in memory. Rows from logs written before question IDs
+    were recorded are skipped.
+
+    Args:
+        data_dir (str): Directory holding the performance logs
+        pattern (str): Glob pattern of the files to read
+        chunksize (int): Rows read from a file at a time
+
+    Returns:
+        tuple: (player_index, question_ids, correct, player_names) where the
+            first three are aligned arrays with one entry per answer
+    """
+    player_codes = {}
+    players, questions, correct = [], [], []
+    for filepath in sorted(glob.glob(os.path.join(data_dir, pattern))):
+        default_player = os.path.basename(filepath).split('_performance_')[0]
+        try:
+            chunks = pd.read_csv(filepath, chunksize=chunksize,
+                                 usecols=lambda column: column in ('player', 'accuracy', 'question_id'))
+            for chunk in chunks:
+                if 'question_id' not in chunk:
+                    break
+                chunk = chunk.dropna(subset=['question_id', 'accuracy'])
+                if 'player' in chunk:
+                    local_codes, names = pd.factorize(chunk['player'].astype(str))
+                else:
+                    local_codes, names = np.zeros(len(chunk), dtype=np.int64), [default_player]
+                # Map this chunk's player names to codes shared by all files
+                codes = np.array([player_codes.setdefault(name, len(player_codes)) for name in names],
+                                 dtype=np.int64)
+                players.append(codes[local_codes])
+                questions.append(chunk['question_id'].to_numpy(dtype=np.int64))
+                correct.append(chunk['accuracy'].to_numpy(dtype=np.float64) >= 0.5)
+        except (pd.errors.EmptyDataError, ValueError) as e:
+            print(f"Skipping {filepath}: {e}")
+
+    if not players:
+        return (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64),
+                np.zeros(0, dtype=bool), [])
+    names = sorted(player_codes, key=player_codes.get)
+    return np.concatenate(players), np.concatenate(questions), np.concatenate(correct), names
+
+# Response chunks held by each worker process, set by _init_worker
+_worker_chunks = []
+
+def _init_worker(chunks):
+    """Keep this worker's share of the responses for all iterations."""
+    _worker_chunks[:] = chunks
+
+def chunk_statistics(ability, difficulty, side, chunks=None):
+    """
+    Sum the log-likelihood gradient and curvature of one side over chunks of responses.
+
+    Args:
+        ability (np.ndarray): Current player abilities
+        difficulty (np.ndarray): Current question difficulties (logits)
+        side (str): 'ability' or 'difficulty', the parameters to differentiate
+        chunks (list): (player_index, question_index, correct) array triples;
+            defaults to the worker's chunks
+
+    Returns:
+        tuple: (gradient, curvature, log_likelihood)
+    """
+    chunks = _worker_chunks if chunks is None else chunks
+    size = len(ability) if side == 'ability' else len(difficulty)
+    gradient = np.zeros(size)
+    curvature = np.zeros(size)
+    log_likelihood = 0.0
+
+    for player_index, question_index, correct in chunks:
+        logits = ability[player_index] - difficulty[question_index]
+        p = 1 / (1 + np.exp(-logits))
+        index, sign = (player_index, 1) if side == 'ability' else (question_index, -1)
+        gradient += sign * np.bincount(index, correct - p, size)
+        curvature += np.bincount(index, p * (1 - p), size)
+        # log(sigmoid(x)) for correct answers, log(sigmoid(-x)) otherwise
+        log_likelihood -= np.logaddexp(0, np.where(correct, -logits, logits)).sum()
+
+    return gradient, curvature, log_likelihood
+
+def fit_rasch(player_index, question_index, correct, n_players, n_questions,
+              workers=1, chunk_size=1000000, max_iter=100, tol=1e-4, prior_precision=1.0):
+    """
+    Fit player abilities and question difficulties by MAP estimation.
+
+    Each iteration takes a Newton step on every ability, then on every
+    difficulty, each over one pass through the responses.
+
+    Args:
+        player_index (np.ndarray): Player of each answer (0..n_players-1)
+        question_index (np.ndarray): Question of each answer (0..n_questions-1)
+        correct (np.ndarray): Whether each answer was correct
+        n_players (int): Number of players
+        n_questions (int): Number of questions
+        workers (int): Worker processes (1 computes in-process, None uses all cores)
+        chunk_size (int): Answers per chunk
+        max_iter (int): Maximum iterations
+        tol (float): Stop once no parameter moves more than this
+        prior_precision (float): Precision of the normal priors on both parameters
+
+    Returns:
+        dict: ability, difficulty (logits), log_likelihood, iterations and converged
+    """
+    correct = np.asarray(correct, dtype=np.float64)
+    chunks = [(player_index[start:start + chunk_size], question_index[start:start + chunk_size],
+               correct[start:start + chunk_size])
+              for start in range(0, len(correct), chunk_size)]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(chunks)))
+
+    parameters = {'ability': np.zeros(n_players), 'difficulty': np.zeros(n_questions)}
+    result = {'iterations': 0, 'converged': False, 'log_likelihood': 0.0}
+
+    pools = []
+    if workers > 1:
+        # Each worker receives its share of the chunks once and keeps it for every iteration
+        pools = [ProcessPoolExecutor(max_workers=1, initializer=_init_worker, initargs=(chunks[i::workers],))
+                 for i in range(workers)]
+
+    def statistics(side):
+        """Sum the statistics of one side over all chunks, in the workers if there are any."""
+        if not pools:
+            return chunk_statistics(parameters['ability'], parameters['difficulty'], side, chunks)
+        futures = [pool.submit(chunk_statistics, parameters['ability'], parameters['difficulty'], side)
+                   for pool in pools]
+        parts = [future.result() for future in futures]
+        return tuple(sum(part[i] for part in parts) for i in range(3))
+
+    try:
+        for iteration in range(1, max_iter + 1):
+            largest_step = 0.0
+            for side in ('ability', 'difficulty'):
+                gradient, curvature, log_likelihood = statistics(side)
+                values = parameters[side]
+                # Newton step including the normal prior (capped to keep early steps stable)
+                step = np.clip((gradient - prior_precision * values) / (curvature + prior_precision), -1, 1)
+                values += step
+                largest_step = max(largest_step, np.abs(step).max(initial=0.0))
+            
+            # The likelihood only depends on ability - difficulty, so a shift of both is pinned
+            # down by the priors alone and Newton steps crawl along it; solve for it directly
+            ability, difficulty = parameters['ability'], parameters['difficulty']
+            shift = -(ability.sum() + difficulty.sum()) / max(n_players + n_questions, 1)
+            ability += shift
+            difficulty += shift
+
+            result.update(iterations=iteration, log_likelihood=float(log_likelihood))
+            if largest_step < tol:
+                result['converged'] = True
+                break
+    finally:
+        for pool in pools:
+            pool.shutdown()
+
+    result.update(parameters)
+    return result
+
+def logit_to_difficulty(logits):
+    """Map fitted difficulties (logits) to the game's 0.1-0.9 difficulty scale."""
+    return 0.1 + 0.8 / (1 + np.exp(-np.asarray(logits, dtype=np.float64)))
+
+def calibrate_bank(questions, question_ids, difficulty_logits, counts, min_responses=20):
+    """
+    Write calibrated difficulties into the questions of a bank.
+
+    Args:
+        questions (list): Question dictionaries as stored in the bank file
+        question_ids (np.ndarray): Question ID of each fitted difficulty
+        difficulty_logits (np.ndarray): Fitted difficulties
+        counts (np.ndarray): Number of answers behind each fitted difficulty
+        min_responses (int): Answers needed before a question is calibrated
+
+    Returns:
+        int: Number of calibrated questions
+    """
+    fitted = {int(question_id): (float(value), int(count))
+              for question_id, value, count in zip(question_ids, logit_to_difficulty(difficulty_logits), counts)}
+    calibrated = 0
+    for question in questions:
+        value, count = fitted.get(question.get('id'), (None, 0))
+        if value is None or count < min_responses:
+            continue
+        question['calibrated_difficulty'] = round(value, 3)
+        question['difficulty'] = convert_difficulty_value_to_label(value)
+        calibrated += 1
+    return calibrated
+
+def save_question_bank(questions, file_path):
+    """Write a question bank in the same one-question-per-line layout as question_bank.json."""
+    lines = [json.dumps(question, ensure_ascii=False) for question in questions]
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write("[\n    " + ",\n    ".join(lines) + "\n]")
+    return file_path
+
+def run_calibration(data_dir='data', bank_path='question_bank.json', output_path=None,
+                    min_responses=20, workers=None, chunk_size=1000000, pattern='*.csv'):
+    """
+    Fit the model on all logged answers and write the calibrated bank.
+
+    Args:
+        data_dir (str): Directory holding the performance logs
+        bank_path (str): Question bank to calibrate
+        output_path (str): Where to write the calibrated bank (defaults to bank_path)
+        min_responses (int): Answers needed before a question is calibrated
+        workers (int): Worker processes
+        chunk_size (int): Answers per chunk
+        pattern (str): Glob pattern of the logs to read
+
+    Returns:
+        dict: Summary of the fit
+    """
+    player_index, raw_question_ids, correct, player_names = read_responses(data_dir, pattern)
+    question_ids, question_index, counts = np.unique(raw_question_ids, return_inverse=True, return_counts=True)
+
+    fit = fit_rasch(player_index, question_index, correct, len(player_names), len(question_ids),
+                    workers=workers, chunk_size=chunk_size)
+
+    with open(bank_path, 'r', encoding='utf-8') as f:
+        questions = json.load(f)
+    calibrated = calibrate_bank(questions, question_ids, fit['difficulty'], counts, min_responses)
+    output_path = output_path or bank_path
+    if calibrated:
+        save_question_bank(questions, output_path)
+
+    return {
+        'responses': len(correct),
+        'players': len(player_names),
+        'questions': len(question_ids),
+        'calibrated': calibrated,
+        'iterations': fit['iterations'],
+        'converged': fit['converged'],
+        'log_likelihood': fit['log_likelihood'],
+        'output': output_path if calibrated else None
+    }
+
+def main(argv=None):
+    """Calibrate the question bank from the command line."""
+    parser = argparse.ArgumentParser(description="Calibrate question difficulties from logged answers")
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--pattern', default='*.csv')
+    parser.add_argument('--bank', default='question_bank.json')
+    parser.add_argument('--output', default=None, help="Calibrated bank path (default: overwrite --bank)")
+    parser.add_argument('--min-responses', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=1000000)
+    args = parser.parse_args(argv)
+
+    summary = run_calibration(args.data_dir, args.bank, args.output, args.min_responses,
+                              args.workers, args.chunk_size, args.pattern)
+    print(f"Fitted {summary['questions']} questions and {summary['players']} players "
+          f"from {summary['responses']} answers in {summary['iterations']} iterations"
+          f"{'' if summary['converged'] else ' (not converged)'}")
+    if summary['output']:
+        print(f"Calibrated {summary['calibrated']} questions, written to {summary['output']}")
+    else:
+        print(f"No question has {args.min_responses} answers yet; the bank was not changed")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -3,43 +3,86 @@ import os
 from datetime import datetime
 
 class DataHandler:
-    def __init__(self, player_name):
-        """Initialize the data handler with a player name."""
+    def __init__(self, player_name, baseline_metrics=None, window=3):
+        """
+        Initialize the data handler with a player name.
+        
+        Args:
+            player_name (str): Name of the player
+            baseline_metrics (tuple): (accuracy, reaction_time, attempts) reported
+                before any round is logged, e.g. from the player's profile; a
+                given baseline also fills the window until it has enough rounds
+            window (int): Rounds averaged by default, the predictor's window
+        """
         self.player_name = player_name
-        self.columns = ['round', 'difficulty', 'accuracy', 'reaction_time', 'attempts', 'timestamp']
-        self.performance_data = pd.DataFrame(columns=self.columns)
+        self.window = window
+        self.baseline_metrics = tuple(baseline_metrics) if baseline_metrics else (0.5, 10.0, 1.0)
+        self.warm_start = bool(baseline_metrics)  # Whether the baseline comes from the player's history
+        self.columns = ['round', 'difficulty', 'accuracy', 'reaction_time', 'attempts', 'timestamp', 'question_id']
+        self.rows = []  # Logged rounds, oldest first
+        self._frame = None  # DataFrame built from rows on demand
+        
+    @property
+    def performance_data(self):
+        """All logged rounds as a DataFrame (rebuilt only after new rounds are logged)."""
+        if self._frame is None or len(self._frame) != len(self.rows):
+            self._frame = pd.DataFrame(self.rows, columns=self.columns)
+        return self._frame
         
-    def log_performance(self, round_num, difficulty, accuracy, reaction_time, attempts):
-        """Log the performance data for a round."""
+    def log_performance(self, round_num, difficulty, accuracy, reaction_time, attempts, question_id=None):
+        """Log the performance data for a round (question_id identifies the question answered)."""
         new_data = {
             'round': round_num,
             'difficulty': difficulty,
             'accuracy': accuracy,
             'reaction_time': reaction_time,
             'attempts': attempts,
-            'timestamp': datetime.now()
+            'timestamp': datetime.now(),
+            'question_id': question_id
         }
         
-        self.performance_data = pd.concat([self.performance_data, 
-                                          pd.DataFrame([new_data], 
-                                                      columns=self.columns)], 
-                                          ignore_index=True)
+        # Appending to a list keeps logging O(1); the DataFrame is built lazily
+        self.rows.append(new_data)
         return new_data
     
     def get_recent_data(self, n_rounds=3):
         """Get performance data from the most recent n rounds."""
         return self.performance_data.tail(n_rounds)
     
-    def get_average_metrics(self, n_rounds=3):
-        """Calculate average metrics from the most recent n rounds."""
-        recent_data = self.get_recent_data(n_rounds)
-        if len(recent_data) == 0:
-            return 0.5, 10.0, 1.0  # Default values if no data
+    def _recent_rows(self, n_rounds):
+        """Return the most recent n logged rows as dictionaries."""
+        return self.rows[-n_rounds:] if n_rounds > 0 else []
+    
+    def get_average_metrics(self, n_rounds=None):
+        """Calculate average metrics from the most recent n rounds (defaults to the window)."""
+        n_rounds = n_rounds or self.window
+        return self._average(self._recent_rows(n_rounds), n_rounds)
+    
+    def get_average_metrics_with(self, accuracy, reaction_time, attempts, n_rounds=None):
+        """Calculate the average metrics as they would be after logging one more round."""
+        n_rounds = n_rounds or self.window
+        return self._average(self._recent_rows(n_rounds - 1), n_rounds, (accuracy, reaction_time, attempts))
+    
+    def _average(self, recent_rows, n_rounds, extra=None):
+        """
+        Average logged rows, plus an extra (accuracy, reaction_time, attempts) round if given.
+        
+        A returning player's baseline stands in for the rounds of the window
+        not played yet, so their stored form fades out over the first rounds
+        instead of being dropped after the first answer.
+        """
+        count = len(recent_rows) + (extra is not None)
+        if count == 0:
+            return self.baseline_metrics  # Default values if no data
         
-        avg_accuracy = recent_data['accuracy'].mean()
-        avg_reaction_time = recent_data['reaction_time'].mean()
-        avg_attempts = recent_data['attempts'].mean()
+        totals = [sum(row[column] for row in recent_rows) for column in ('accuracy', 'reaction_time', 'attempts')]
+        if extra is not None:
+            totals = [total + value for total, value in zip(totals, extra)]
+        if self.warm_start and count < n_rounds:
+            totals = [total + (n_rounds - count) * value for total, value in zip(totals, self.baseline_metrics)]
+            count = n_rounds
         
+        avg_accuracy, avg_reaction_time, avg_attempts = (total / count for total in totals)
         return avg_accuracy, avg_reaction_time, avg_attempts
     
     def save_to_csv(self, filename=None):
@@ -54,6 +97,33 @@ class DataHandler:
         self.performance_data.to_csv(filepath, index=False)
         return filepath
     
+    @staticmethod
+    def save_combined_csv(data_handlers, filename=None):
+        """
+        Save the performance data of several players to a single CSV file.
+        
+        Args:
+            data_handlers (list): DataHandler instances to save
+            filename (str): Name of the file in the data directory
+            
+        Returns:
+            str: Path of the written file
+        """
+        if filename is None:
+            filename = f"batch_performance_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        
+        rows = [dict(row, player=handler.player_name)
+                for handler in data_handlers for row in handler.rows]
+        columns = ['player'] + (data_handlers[0].columns if data_handlers else [])
+        combined = pd.DataFrame(rows, columns=columns)
+        
+        # Create a data directory if it doesn't exist
+        os.makedirs('data', exist_ok=True)
+        filepath = os.path.join('data', filename)
+        
+        combined.to_csv(filepath, index=False)
+        return filepath
+    
     def get_game_summary(self):
         """Generate a summary of the game performance."""
         if len(self.performance_data) == 0:
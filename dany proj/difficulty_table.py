@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# Adaptive Trivia Quiz Game - Precompiled Difficulty Lookup Table
+"""
+Compile a DifficultyPredictor into a small NumPy lookup table.
+
+The table holds the model's predictions on a regular grid over the
+normalized inputs (accuracy, reaction time / 20, attempts / 3), each in
+[0, 1]. At runtime predictions are answered by trilinear interpolation, so
+serving nodes only need NumPy and the .npz file.
+
+Usage:
+    python difficulty_table.py --model-path models/difficulty_predictor \
+        --output models/difficulty_table.npz --error-bound 0.01
+"""
+import argparse
+
+import numpy as np
+
+from policies import DifficultyPolicy
+
+class DifficultyTable(DifficultyPolicy):
+    def __init__(self, table, max_error=None, window=3):
+        """
+        Initialize the table.
+
+        Args:
+            table (array): Predictions of shape (n, n, n) on an evenly spaced
+                grid over [0, 1] for each normalized input
+            max_error (float): Largest interpolation error measured at build time
+            window (int): Rounds averaged into the metrics, as for the compiled predictor
+        """
+        self.table = np.asarray(table, dtype=np.float32)
+        if self.table.ndim != 3 or min(self.table.shape) < 2:
+            raise ValueError("table must be a 3-D grid with at least 2 points per axis")
+        self.max_error = max_error
+        self.window = window
+        self._max_index = np.array(self.table.shape) - 1
+
+    @classmethod
+    def load(cls, path):
+        """Load a table saved with save()."""
+        with np.load(path) as data:
+            max_error = float(data['max_error']) if 'max_error' in data else np.nan
+            window = int(data['window']) if 'window' in data else cls.window
+            return cls(data['table'], None if np.isnan(max_error) else max_error, window)
+
+    def save(self, path):
+        """Save the table as a compressed .npz file."""
+        np.savez_compressed(path, table=self.table, window=self.window,
+                            max_error=np.nan if self.max_error is None else self.max_error)
+        return path
+
+    def predict_normalized(self, accuracy, norm_reaction_time, norm_attempts):
+        """
+        Interpolate predictions for normalized inputs.
+
+        Accepts scalars or NumPy arrays of matching shape; inputs are clipped to [0, 1].
+
+        Returns:
+            np.ndarray: Interpolated difficulties with the shape of the inputs
+        """
+        coords = np.stack(np.broadcast_arrays(
+            np.asarray(accuracy, dtype=np.float64),
+            np.asarray(norm_reaction_time, dtype=np.float64),
+            np.asarray(norm_attempts, dtype=np.float64)), axis=-1)
+        position = np.clip(coords, 0.0, 1.0) * self._max_index
+
+        # Lower corner of the surrounding cell and the offset inside it
+        lower = np.minimum(np.floor(position).astype(np.intp), self._max_index - 1)
+        frac = position - lower
+        i, j, k = lower[..., 0], lower[..., 1], lower[..., 2]
+        fx, fy, fz = frac[..., 0], frac[..., 1], frac[..., 2]
+
+        t = self.table
+        c00 = t[i, j, k] * (1 - fx) + t[i + 1, j, k] * fx
+        c10 = t[i, j + 1, k] * (1 - fx) + t[i + 1, j + 1, k] * fx
+        c01 = t[i, j, k + 1] * (1 - fx) + t[i + 1, j, k + 1] * fx
+        c11 = t[i, j + 1, k + 1] * (1 - fx) + t[i + 1, j + 1, k + 1] * fx
+        c0 = c00 * (1 - fy) + c10 * fy
+        c1 = c01 * (1 - fy) + c11 * fy
+        return c0 * (1 - fz) + c1 * fz
+
+    def predict_normalized_batch(self, inputs):
+        """Interpolate predictions for an (n, 3) array of normalized inputs."""
+        inputs = np.asarray(inputs, dtype=np.float64).reshape(-1, 3)
+        return np.clip(self.predict_normalized(inputs[:, 0], inputs[:, 1], inputs[:, 2]), 0.1, 0.9)
+
+    def predict_difficulty(self, accuracy, reaction_time, attempts):
+        """Predict the next difficulty level, same interface as DifficultyPredictor."""
+        # Normalize inputs to expected ranges
+        norm_reaction_time = min(reaction_time, 20) / 20  # 0-20 seconds scaled to 0-1
+        norm_attempts = min(attempts, 3) / 3  # 1-3 attempts scaled to 0-1
+
+        difficulty = float(self.predict_normalized(accuracy, norm_reaction_time, norm_attempts))
+
+        # Ensure the difficulty stays in range [0.1, 0.9]
+        return min(max(difficulty, 0.1), 0.9)
+
+def _grid(points):
+    """Return every point of an evenly spaced (points^3) grid over [0, 1]^3."""
+    return _mesh(np.linspace(0.0, 1.0, points))
+
+def _cell_centers(points):
+    """Return the centers of all cells of a (points^3) grid over [0, 1]^3."""
+    return _mesh((np.arange(points - 1) + 0.5) / (points - 1))
+
+def _mesh(axis):
+    """Return all combinations of the axis values as an (n^3, 3) array."""
+    return np.stack(np.meshgrid(axis, axis, axis, indexing='ij'), axis=-1).reshape(-1, 3)
+
+def measure_error(table, predictor, n_samples=2000, seed=0):
+    """
+    Measure the largest difference between the table and the exact model.
+
+    Samples random points plus all cell centers (where interpolation is least
+    accurate), capped at n_samples points in total.
+
+    Returns:
+        float: Maximum absolute error over the sampled points
+    """
+    rng = np.random.default_rng(seed)
+    centers = _cell_centers(table.table.shape[0])
+    if len(centers) > n_samples // 2:
+        centers = centers[rng.choice(len(centers), n_samples // 2, replace=False)]
+    samples = np.vstack([centers, rng.random((n_samples - len(centers), 3))])
+
+    exact = predictor.predict_normalized_batch(samples)
+    approx = table.predict_normalized_batch(samples)
+    return float(np.max(np.abs(exact - approx)))
+
+def build_difficulty_table(predictor, error_bound=0.01, initial_points=9, max_points=129):
+    """
+    Evaluate a predictor over a grid, refining it until the error bound is met.
+
+    The grid starts with initial_points per axis and is refined (halving the
+    step) until the measured interpolation error is within error_bound.
+
+    Args:
+        predictor (DifficultyPredictor): Model to compile
+        error_bound (float): Largest acceptable difference from the exact model
+        initial_points (int): Grid points per axis of the first attempt
+        max_points (int): Largest number of grid points per axis to try
+
+    Returns:
+        DifficultyTable: The compiled table
+
+    Raises:
+        ValueError: If the error bound can't be met with max_points per axis
+    """
+    points = max(2, initial_points)
+    while True:
+        values = predictor.predict_normalized_batch(_grid(points)).reshape(points, points, points)
+        table = DifficultyTable(values, window=predictor.window)
+        table.max_error = measure_error(table, predictor)
+        if table.max_error <= error_bound:
+            return table
+        next_points = (points - 1) * 2 + 1
+        if next_points > max_points:
+            raise ValueError(f"Error {table.max_error:.4f} exceeds bound {error_bound} "
+                             f"with {points} points per axis")
+        points = next_points
+
+def main(argv=None):
+    """Build a difficulty table from a saved (or freshly trained) predictor."""
+    parser = argparse.ArgumentParser(description="Compile the difficulty predictor into a lookup table")
+    parser.add_argument('--model-path', default=None, help="Saved predictor model (default: train a new one)")
+    parser.add_argument('--output', default='models/difficulty_table.npz')
+    parser.add_argument('--error-bound', type=float, default=0.01)
+    parser.add_argument('--max-points', type=int, default=129)
+    args = parser.parse_args(argv)
+
+    from ai_module import get_predictor
+    predictor = get_predictor(args.model_path)
+    table = build_difficulty_table(predictor, args.error_bound, max_points=args.max_points)
+    table.save(args.output)
+    print(f"Saved {table.table.shape[0]}^3 table to {args.output} "
+          f"(max error {table.max_error:.4f})")
+
+if __name__ == "__main__":
+    main()
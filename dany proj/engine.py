@@ -0,0 +1,209 @@
+# Adaptive Trivia Quiz Game - Vectorized Multi-Player Engine
+"""
+Struct-of-arrays version of the adaptive difficulty loop for many players.
+
+MultiPlayerEngine keeps the score, difficulty, round counter and recent
+performance window of N players in NumPy arrays. One call scores a round
+for everyone, updates the metrics and predicts the next difficulties in a
+single batch, giving the same results as stepping a TriviaGame, DataHandler
+and DifficultyPredictor per player.
+"""
+import numpy as np
+
+def parse_answer(answer):
+    """
+    Convert one answer string to a zero-based option index, like TriviaGame.evaluate_answer.
+
+    Args:
+        answer (str): Answer such as "2" or "b" (None counts as no answer)
+
+    Returns:
+        int: Option index, -1 if the answer can't be parsed
+    """
+    if not answer or not isinstance(answer, str):
+        return -1
+    if answer.isdigit():
+        try:
+            return int(answer) - 1
+        except ValueError:
+            # Digits such as '²' pass isdigit() but int() rejects them
+            return -1
+    if answer.lower() in ['a', 'b', 'c', 'd']:
+        return ord(answer.lower()) - ord('a')
+    return -1
+
+def parse_answers(user_answers):
+    """
+    Convert answer strings to zero-based option indices, like TriviaGame.evaluate_answer.
+
+    Args:
+        user_answers (list): Answers such as "2" or "b" (None counts as no answer)
+
+    Returns:
+        np.ndarray: Option indices, -1 for answers that can't be parsed
+    """
+    return np.array([parse_answer(answer) for answer in user_answers], dtype=np.int64)
+
+def evaluate_answers(choices, correct_answers, difficulties, reaction_times, valid=None):
+    """
+    Score a batch of answers with the same rules as TriviaGame.evaluate_answer.
+
+    Args:
+        choices (array): Zero-based option chosen by each player (-1 if invalid)
+        correct_answers (array): Zero-based index of each correct option
+        difficulties (array): Numeric difficulty of each question
+        reaction_times (array): Seconds each player took to answer
+        valid (array): Optional mask of answers that were parsed successfully
+
+    Returns:
+        tuple: (correct, points) arrays
+    """
+    choices = np.asarray(choices)
+    correct = choices == np.asarray(correct_answers)
+    if valid is not None:
+        correct &= np.asarray(valid, dtype=bool)
+    else:
+        correct &= choices >= 0
+
+    difficulties = np.asarray(difficulties, dtype=np.float64)
+    reaction_times = np.asarray(reaction_times, dtype=np.float64)
+
+    # Base points for correct answer (higher difficulty = more points)
+    base_points = 100 + np.floor(difficulties * 100).astype(np.int64)
+    # Time bonus: up to 50% for fast answers
+    time_factor = np.maximum(0, 1 - (reaction_times / 20))
+    time_bonus = np.floor(base_points * time_factor * 0.5).astype(np.int64)
+
+    points = np.where(correct, base_points + time_bonus, 0)
+    return correct, points
+
+class MultiPlayerEngine:
+    def __init__(self, n_players, window=3, initial_difficulty=0.5):
+        """
+        Initialize the state of n_players games.
+
+        Args:
+            n_players (int): Number of players
+            window (int): Rounds averaged for the metrics (as in DataHandler.get_average_metrics)
+            initial_difficulty (float or array): Starting difficulty of each player
+        """
+        self.n_players = n_players
+        self.window = window
+        self.score = np.zeros(n_players, dtype=np.int64)
+        self.round_number = np.zeros(n_players, dtype=np.int64)
+        self.difficulty = np.empty(n_players, dtype=np.float64)
+        self.difficulty[:] = initial_difficulty
+
+        # Last `window` rounds per player, oldest first; empty slots come first and hold 0
+        self.recent_accuracy = np.zeros((n_players, window), dtype=np.float64)
+        self.recent_reaction_time = np.zeros((n_players, window), dtype=np.float64)
+        self.recent_attempts = np.zeros((n_players, window), dtype=np.float64)
+        self.recent_count = np.zeros(n_players, dtype=np.int64)
+
+    def evaluate_answers(self, choices, correct_answers, difficulties, reaction_times, valid=None):
+        """Score a round of answers for all players (see evaluate_answers)."""
+        return evaluate_answers(choices, correct_answers, difficulties, reaction_times, valid)
+
+    def update_scores(self, points, active=None):
+        """Add points to the players' scores."""
+        self.score += np.where(self._mask(active), points, 0)
+        return self.score
+
+    def record_rounds(self, accuracy, reaction_time, attempts, active=None):
+        """
+        Log one round of metrics for the active players.
+
+        Args:
+            accuracy (array): 1.0 for correct answers, 0.0 otherwise
+            reaction_time (array): Reaction times in seconds
+            attempts (array): Attempts per question
+            active (array): Optional mask of players that played this round
+        """
+        mask = self._mask(active)
+        for recent, values in ((self.recent_accuracy, accuracy),
+                               (self.recent_reaction_time, reaction_time),
+                               (self.recent_attempts, attempts)):
+            shifted = np.empty_like(recent)
+            shifted[:, :-1] = recent[:, 1:]
+            shifted[:, -1] = values
+            recent[mask] = shifted[mask]
+        self.recent_count[mask] = np.minimum(self.recent_count[mask] + 1, self.window)
+        self.round_number[mask] += 1
+
+    def average_metrics(self):
+        """
+        Calculate the average metrics of the recent rounds of every player.
+
+        Returns:
+            tuple: (accuracy, reaction_time, attempts) arrays, with the same
+                defaults as DataHandler for players without data
+        """
+        count = np.maximum(self.recent_count, 1)
+        averages = []
+        for recent, default in ((self.recent_accuracy, 0.5),
+                                (self.recent_reaction_time, 10.0),
+                                (self.recent_attempts, 1.0)):
+            # Add the columns oldest first, the same order DataHandler sums in
+            total = np.zeros(self.n_players, dtype=np.float64)
+            for column in range(self.window):
+                total = total + recent[:, column]
+            averages.append(np.where(self.recent_count > 0, total / count, default))
+        return tuple(averages)
+
+    def predict(self, predictor):
+        """
+        Predict the next difficulty of every player in one batch.
+
+        Goes through the predictor's prediction cache when it has one
+        (predict_normalized_cached), so players get the same quantized
+        difficulties as from predict_difficulty and share its cache.
+
+        Args:
+            predictor: DifficultyPredictor or DifficultyTable (anything with
+                predict_normalized_batch)
+
+        Returns:
+            np.ndarray: Predicted difficulties in [0.1, 0.9]
+        """
+        accuracy, reaction_time, attempts = self.average_metrics()
+        inputs = np.column_stack([
+            accuracy,
+            np.minimum(reaction_time, 20) / 20,  # 0-20 seconds scaled to 0-1
+            np.minimum(attempts, 3) / 3  # 1-3 attempts scaled to 0-1
+        ])
+        predict_batch = getattr(predictor, 'predict_normalized_cached', predictor.predict_normalized_batch)
+        return np.clip(predict_batch(inputs), 0.1, 0.9)
+
+    def step(self, predictor, choices, correct_answers, difficulties, reaction_times,
+             attempts=None, active=None):
+        """
+        Play one round for all players: score, log metrics and adapt the difficulty.
+
+        Args:
+            predictor: Model used to predict the next difficulties
+            choices (array): Zero-based option chosen by each player (-1 if invalid)
+            correct_answers (array): Zero-based index of each correct option
+            difficulties (array): Numeric difficulty of each player's question
+            reaction_times (array): Seconds each player took to answer
+            attempts (array): Attempts per question (defaults to 1)
+            active (array): Optional mask of players that played this round
+
+        Returns:
+            tuple: (correct, points, new_difficulty) arrays
+        """
+        mask = self._mask(active)
+        if attempts is None:
+            attempts = np.ones(self.n_players)
+        correct, points = self.evaluate_answers(choices, correct_answers, difficulties, reaction_times)
+        self.update_scores(points, mask)
+        self.record_rounds(correct.astype(np.float64), reaction_times, attempts, mask)
+
+        new_difficulty = self.predict(predictor)
+        self.difficulty[mask] = new_difficulty[mask]
+        return correct, points, self.difficulty.copy()
+
+    def _mask(self, active):
+        """Return a boolean mask of active players (all players if active is None)."""
+        if active is None:
+            return np.ones(self.n_players, dtype=bool)
+        return np.asarray(active, dtype=bool)
@@ -2,7 +2,9 @@ import random
 import time
 import json
 import os
-from utils import start_timer, get_elapsed_time, print_header, print_feedback, input_with_timeout, clear_screen
+from utils import (start_timer, get_elapsed_time, print_header, print_feedback, input_with_timeout, clear_screen,
+                   create_difficulty_label)
+from question_index import QuestionBitset, get_question_index
 
 # Question bank with difficulty levels (0.1: easiest, 0.9: hardest)
 QUESTION_BANK = [
@@ -164,39 +166,39 @@ def load_question_bank(file_path='question_bank.json'):
         # Return a minimal set of questions as fallback
         return _get_default_questions()
 
+# Question banks already loaded in this process, keyed by file path
+_question_bank_cache = {}
+
+def get_question_bank(file_path='question_bank.json'):
+    """
+    Return the question bank for file_path, loading it only once per process.
+    
+    The returned list is shared between games, so callers must not modify
+    the question dictionaries in place.
+    
+    Args:
+        file_path (str): Path to the JSON file containing questions
+        
+    Returns:
+        list: List of question dictionaries
+    """
+    if file_path not in _question_bank_cache:
+        _question_bank_cache[file_path] = load_question_bank(file_path)
+    return _question_bank_cache[file_path]
+
 def _get_default_questions():
     """
-    Return a minimal set of default questions as fallback if loading from JSON fails.
+    Return the built-in QUESTION_BANK as fallback if loading from JSON fails.
+    
+    Its questions have numeric difficulties, so question selection can
+    follow the predicted difficulty more closely than with the labels of
+    question_bank.json.
     
     Returns:
         list: List of default question dictionaries
     """
-    return [
-        {
-            "id": 1,
-            "text": "What is the capital of France?",
-            "question": "What is the capital of France?",
-            "options": ["Paris", "London", "Berlin", "Madrid"],
-            "answer": 0,
-            "difficulty": "easy"
-        },
-        {
-            "id": 2,
-            "text": "Which scientist developed the theory of relativity?",
-            "question": "Which scientist developed the theory of relativity?",
-            "options": ["Isaac Newton", "Albert Einstein", "Niels Bohr", "Stephen Hawking"],
-            "answer": 1,
-            "difficulty": "medium"
-        },
-        {
-            "id": 3,
-            "text": "What is the chemical formula for sulfuric acid?",
-            "question": "What is the chemical formula for sulfuric acid?",
-            "options": ["H2SO3", "H2SO4", "HSO4", "H2S2O7"],
-            "answer": 1,
-            "difficulty": "hard"
-        }
-    ]
+    return [dict(question, id=question_id, text=question['question'])
+            for question_id, question in enumerate(QUESTION_BANK, 1)]
 
 def convert_difficulty_value_to_label(difficulty_value):
     """
@@ -232,6 +234,15 @@ def convert_difficulty_label_to_value(difficulty_label):
     else:  # hard
         return 0.9
 
+def public_question(question):
+    """Return the fields of a question that can be sent to a client (no answer)."""
+    return {
+        'id': question['id'],
+        'question': question.get('question') or question.get('text'),
+        'options': question['options'],
+        'difficulty': create_difficulty_label(question['difficulty'])
+    }
+
 def select_question(desired_difficulty, asked_questions, question_bank):
     """
     Select a question based on the desired difficulty that hasn't been asked yet.
@@ -299,28 +310,61 @@ def select_question(desired_difficulty, asked_questions, question_bank):
         return emergency_question, True
 
 class TriviaGame:
-    def __init__(self, player_name):
-        """Initialize the trivia game."""
+    def __init__(self, player_name, initial_difficulty=0.5):
+        """
+        Initialize the trivia game.
+        
+        Args:
+            player_name (str): Name of the player
+            initial_difficulty (float): Starting difficulty (medium by default; returning
+                players start where their last game ended)
+        """
         self.player_name = player_name
         self.score = 0
         self.round_number = 0
-        self.current_difficulty = 0.5  # Start at medium difficulty
-        self.question_bank = load_question_bank()
-        self.asked_questions = set()
+        self.current_difficulty = min(max(initial_difficulty, 0.1), 0.9)
+        self.question_bank = get_question_bank()
+        self.question_index = get_question_index(self.question_bank)
+        self.asked_questions = QuestionBitset()  # IDs of questions the player has seen
+        self.prefetched = {}  # Speculative next questions, keyed by whether the answer is correct
+        self.staged_question = None  # Prefetched question to hand out next
         
     def generate_question(self, difficulty=None):
         """Generate a question based on the current difficulty level."""
+        # Any earlier speculation was made for the previous question
+        self.prefetched = {}
+        
         if difficulty is None:
+            if self.staged_question is not None:
+                question, self.staged_question = self.staged_question, None
+                return question
             difficulty = self.current_difficulty
-        
-        # Convert numeric difficulty to label
-        difficulty_label = convert_difficulty_value_to_label(difficulty)
+        self.staged_question = None
         
         # Select question
-        question, _ = select_question(difficulty_label, self.asked_questions, self.question_bank)
+        question = self._select_question(difficulty, self.asked_questions)
+        
+        return self._prepare_question(question)
+    
+    def _select_question(self, difficulty, asked_questions):
+        """Pick the unseen question nearest to a numeric difficulty through the bank's index."""
+        question, _ = self.question_index.select_nearest(difficulty, asked_questions)
+        if question is None:
+            # Banks without integer IDs can't be indexed; fall back to label matching
+            difficulty_label = convert_difficulty_value_to_label(difficulty)
+            question, _ = select_question(difficulty_label, asked_questions, self.question_bank)
+        return question
+    
+    def _prepare_question(self, question):
+        """Copy a question from the bank into the format expected by the interfaces."""
+        # Work on a copy so the shared question bank keeps its original labels
+        question = dict(question)
         
         # Convert to the format expected by the web interface
-        if 'difficulty' in question and isinstance(question['difficulty'], str):
+        if 'calibrated_difficulty' in question:
+            # Difficulty fitted from logged answers (see calibration.py)
+            question['difficulty'] = question['calibrated_difficulty']
+        elif 'difficulty' in question and isinstance(question['difficulty'], str):
             # Convert string difficulty to numeric value for consistency
             question['difficulty'] = convert_difficulty_label_to_value(question['difficulty'])
         
@@ -331,6 +375,55 @@ class TriviaGame:
             question['text'] = question['question']
             
         return question
+    
+    def prefetch_next_questions(self, predict_next):
+        """
+        Prepare the next question for both possible outcomes of the current one.
+        
+        This runs while the player is still answering, so that submitting the
+        answer only has to pick one of the prepared questions.
+        
+        Args:
+            predict_next (callable): Takes whether the answer is correct and
+                returns the difficulty to use next
+                
+        Returns:
+            dict: Prepared (difficulty, question, asked_questions) keyed by outcome
+        """
+        prefetched = {}
+        for correct in (True, False):
+            difficulty = predict_next(correct)
+            # Select against a copy so nothing is marked as asked until it is used
+            asked_questions = self.asked_questions.copy()
+            question = self._select_question(difficulty, asked_questions)
+            prefetched[correct] = (difficulty, self._prepare_question(question), asked_questions)
+        self.prefetched = prefetched
+        return prefetched
+    
+    def take_prefetched(self, correct, difficulty=None):
+        """
+        Use the question prepared for the given outcome, if there is one.
+        
+        The prepared question becomes the next one returned by generate_question.
+        
+        Args:
+            correct (bool): Whether the current question was answered correctly
+            difficulty (float): Difficulty actually chosen for the next question;
+                a question prepared for another difficulty is discarded
+            
+        Returns:
+            float: The predicted difficulty for the next question, or None if
+                nothing (usable) was prefetched
+        """
+        prepared = self.prefetched.get(correct)
+        self.prefetched = {}
+        if prepared is None or (difficulty is not None and prepared[0] != difficulty):
+            return None
+        
+        difficulty, question, asked_questions = prepared
+        self.asked_questions = asked_questions
+        self.staged_question = question
+        return difficulty
         
     def display_question(self, question_data):
         """Display a question and its options to the player."""
@@ -373,6 +466,11 @@ class TriviaGame:
         except (ValueError, IndexError):
             return False, 0
     
+    def record_answer(self, question_data, correct):
+        """Feed an answer back into the question's draw weight in the shared index."""
+        if 'id' in question_data:
+            self.question_index.record_answer(question_data['id'], correct)
+    
     def update_score(self, points):
         """Update the player's score."""
         self.score += points
@@ -406,38 +504,70 @@ class TriviaGame:
         # If timeout or no answer
         if user_answer is None or user_answer.strip() == "":
             print_feedback("Time's up! No answer provided.", False)
-            return {
-                "correct": False,
-                "points": 0,
-                "reaction_time": reaction_time,
-                "attempts": 1,
-                "accuracy": 0.0,
-                "difficulty": question_data['difficulty']
-            }
-        
-        # Evaluate answer
-        attempts = 1
-        correct, points = self.evaluate_answer(question_data, user_answer, reaction_time)
+            return self._round_result(question_data, None, reaction_time)
+        
+        round_data = self._round_result(question_data, user_answer, reaction_time)
         
         # Provide feedback
-        if correct:
-            print_feedback(f"Correct! You earned {points} points.", True)
-            self.update_score(points)
+        if round_data["correct"]:
+            print_feedback(f"Correct! You earned {round_data['points']} points.", True)
         else:
             print_feedback("Incorrect answer.", False)
         
         time.sleep(1.5)  # Brief pause to read feedback
         
-        # Return performance data for this round
+        return round_data
+    
+    def _round_result(self, question_data, user_answer, reaction_time):
+        """
+        Score an answer, feed it back into the question index and describe the round.
+        
+        Shared by run_round and play_scripted_round, so both update the score
+        and the question weights the same way.
+        
+        Args:
+            question_data (dict): The question that was asked
+            user_answer (str): The answer given, or None if there was none
+            reaction_time (float): Seconds the answer took
+            
+        Returns:
+            dict: Performance data for this round
+        """
+        if user_answer is None:
+            correct, points = False, 0
+        else:
+            correct, points = self.evaluate_answer(question_data, user_answer, reaction_time)
+            self.record_answer(question_data, correct)
+            self.update_score(points)
+        
         return {
             "correct": correct,
             "points": points,
             "reaction_time": reaction_time,
-            "attempts": attempts,
+            "attempts": 1,
             "accuracy": 1.0 if correct else 0.0,
-            "difficulty": question_data['difficulty']
+            "difficulty": question_data['difficulty'],
+            "question_id": question_data.get('id')
         }
     
+    def play_scripted_round(self, user_answer, reaction_time):
+        """
+        Play a round with a given answer, without any display, input or pauses.
+        
+        Args:
+            user_answer (str): The answer to give (1-4 or a-d; None or "" for no answer)
+            reaction_time (float): Seconds the answer is considered to have taken
+            
+        Returns:
+            dict: Performance data for this round, like run_round
+        """
+        self.round_number += 1
+        question_data = self.generate_question()
+        
+        if user_answer is not None:
+            user_answer = user_answer.strip() or None
+        return self._round_result(question_data, user_answer, reaction_time)
+    
     def get_score(self):
         """Get the current score."""
         return self.score
@@ -447,9 +577,10 @@ class TriviaGame:
         return self.current_difficulty
         
     def get_asked_questions(self):
-        """Get the set of asked question IDs (for serialization)."""
+        """Get the asked question IDs as a list."""
         return list(self.asked_questions)
         
-    def set_asked_questions(self, asked_questions_list):
-        """Set the asked questions from a list (after deserialization)."""
-        self.asked_questions = set(asked_questions_list) 
\ No newline at end of file
+    def set_asked_questions(self, asked_questions):
+        """Set the asked questions from a serialized QuestionBitset or a list of IDs."""
+        self.asked_questions = QuestionBitset.deserialize(asked_questions)
+ 
\ No newline at end of file
@@ -0,0 +1,471 @@
+# Adaptive Trivia Quiz Game - Out-of-Process Inference Service
+"""
+Run difficulty predictions in dedicated worker processes.
+
+With TensorFlow installed, predict_difficulty runs Keras inference on the
+Flask request thread, where it competes for the GIL and for TensorFlow's
+own thread pools with every other request. InferenceService moves the
+model into a few worker processes instead, each started with a bounded
+number of TensorFlow (and BLAS) threads:
+
+- Request threads only put their inputs on a queue and wait on a future.
+- A dispatcher thread groups the queued requests into micro-batches (up
+  to max_batch rows, waiting at most max_wait seconds for more) and sends
+  each batch over a pipe to an idle worker, which evaluates it with one
+  predict_normalized_batch call.
+- One reader thread per worker resolves the futures of a finished batch.
+  When its worker dies it fails that worker's unfinished batches and
+  starts a new worker in its place.
+
+RemotePredictor wraps the service behind the usual predict_difficulty
+interface. Each process needs its own service, so servers that fork
+workers after loading the app start it in every worker after the fork
+(see serve.py); otherwise it is started in the background on first use.
+Until the service is running, and whenever it fails or misses the
+timeout, predictions come from the rule-based fallback instead.
+"""
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+import numpy as np
+
+from numpy_mlp import NumpyMLP, WEIGHTS_SUFFIX
+from policies import DifficultyPolicy
+
+def _limit_threads(threads):
+    """Cap the TensorFlow and BLAS thread pools of this process (before they start)."""
+    for variable in ('TF_NUM_INTRAOP_THREADS', 'TF_NUM_INTEROP_THREADS',
+                     'OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+        os.environ[variable] = str(threads)
+
+def _serve(connection, model_path, threads):
+    """
+    Worker process: load the predictor and evaluate batches until told to stop.
+
+    Messages received are (batch_id, inputs) tuples, or None to stop; each
+    answer is (batch_id, predictions, error).
+    """
+    _limit_threads(threads)
+    from ai_module import TF_AVAILABLE, get_predictor
+    if TF_AVAILABLE:
+        import tensorflow as tf
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        tf.config.threading.set_inter_op_parallelism_threads(threads)
+
+    try:
+        predictor = get_predictor(model_path)
+    except Exception as e:
+        connection.send((None, None, repr(e)))
+        return
+    connection.send((None, None, None))
+
+    while True:
+        message = connection.recv()
+        if message is None:
+            break
+        batch_id, inputs = message
+        try:
+            connection.send((batch_id, np.asarray(predictor.predict_normalized_batch(inputs)), None))
+        except Exception as e:
+            connection.send((batch_id, None, repr(e)))
+    connection.close()
+
+class InferenceService:
+    """
+    Pool of inference worker processes fed with micro-batches over pipes.
+    """
+
+    def __init__(self, model_path=None, workers=1, max_batch=64, max_wait=0.002, threads=1,
+                 start_timeout=120):
+        """
+        Start the worker processes and wait until their models are loaded.
+
+        Args:
+            model_path (str): Model loaded by every worker (see get_predictor)
+            workers (int): Number of worker processes
+            max_batch (int): Most rows sent to a worker at once
+            max_wait (float): Seconds a batch waits for more requests
+            threads (int): TensorFlow and BLAS threads per worker
+            start_timeout (float): Seconds to wait for the workers to load the model
+        """
+        self.model_path = model_path
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.threads = threads
+        self.start_timeout = start_timeout
+        self.requests = 0
+        self.batches = 0
+        self.restarts = 0
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._idle = queue.Queue()
+        self._queued = set()  # Workers waiting in _idle, so none is queued twice
+        self._pending = {}  # (worker, batch) by batch ID
+        self._next_batch = 0
+        self._closed = False
+        workers = max(1, workers)
+        self._live = workers
+        self._connections = [None] * workers
+        self._processes = [None] * workers
+        self._readers = []
+
+        # Spawned workers don't inherit the web process's threads and locks
+        self._context = multiprocessing.get_context('spawn')
+        for index in range(workers):
+            self._start_worker(index)
+
+        for index in range(workers):
+            error = self._wait_ready(index)
+            if error:
+                self.close()
+                raise RuntimeError(f"Inference worker failed to load the model: {error}")
+            reader = threading.Thread(target=self._read, args=(index,), name='inference-reader', daemon=True)
+            reader.start()
+            self._readers.append(reader)
+            self._release(index)
+
+        self._dispatcher = threading.Thread(target=self._dispatch, name='inference-dispatcher', daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, inputs):
+        """
+        Queue normalized inputs for prediction.
+
+        Args:
+            inputs (array): Array of shape (n, 3), as for predict_normalized_batch
+
+        Returns:
+            Future: Resolves to the predictions, an array of shape (n,)
+        """
+        future = Future()
+        if self._closed:
+            future.set_exception(RuntimeError("Inference service is closed"))
+            return future
+        self._queue.put((np.asarray(inputs, dtype=np.float64).reshape(-1, 3), future))
+        return future
+
+    def stats(self):
+        """Return the number of requests and batches sent so far and the mean batch size."""
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'batches': self.batches,
+                'mean_batch_size': self.requests / self.batches if self.batches else 0.0,
+                'workers': self._live,
+                'restarts': self.restarts
+            }
+
+    def close(self):
+        """Stop the dispatcher and the worker processes."""
+        if self._closed:
+            return
+        self._closed = True
+        # The dispatcher is the only sender on the pipes, so it tells the workers to stop
+        self._queue.put(None)
+        if not hasattr(self, '_dispatcher'):
+            self._stop_workers()
+        for process in self._processes:
+            if process is None:
+                continue
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+    def _start_worker(self, index):
+        """Start the worker process of a slot (it loads the model, then says it is ready)."""
+        connection, child_connection = self._context.Pipe()
+        process = self._context.Process(target=_serve, args=(child_connection, self.model_path, self.threads),
+                                        name='inference-worker', daemon=True)
+        process.start()
+        child_connection.close()
+        self._connections[index] = connection
+        self._processes[index] = process
+
+    def _wait_ready(self, index):
+        """
+        Wait until a worker has loaded its model.
+
+        Returns:
+            str: The error that stopped the worker, or None if it is ready
+        """
+        connection = self._connections[index]
+        try:
+            if not connection.poll(self.start_timeout):
+                raise EOFError("timed out")
+            _, _, error = connection.recv()
+        except EOFError as e:
+            error = f"worker exited ({e or 'no reply'})"
+        return error
+
+    def _restart_worker(self, index):
+        """
+        Replace a worker that died with a new process.
+
+        Returns:
+            bool: True if the new worker is ready
+        """
+        self._processes[index].join(timeout=1)
+        self._start_worker(index)
+        error = self._wait_ready(index)
+        if error:
+            print(f"Inference worker could not be restarted: {error}")
+            if self._processes[index].is_alive():
+                self._processes[index].terminate()
+            return False
+        with self._lock:
+            self.restarts += 1
+        return True
+
+    def _release(self, worker):
+        """Queue a worker as idle unless it is already waiting there."""
+        with self._lock:
+            if worker in self._queued:
+                return
+            self._queued.add(worker)
+        self._idle.put(worker)
+
+    def _next_idle(self):
+        """Wait for an idle worker; return None once every worker is gone."""
+        while True:
+            try:
+                worker = self._idle.get(timeout=0.1)
+            except queue.Empty:
+                if self._live == 0:
+                    return None
+                continue
+            with self._lock:
+                self._queued.discard(worker)
+            return worker
+
+    def _stop_workers(self):
+        """Ask every worker process to exit."""
+        for connection in self._connections:
+            try:
+                connection.send(None)
+            except (OSError, ValueError):
+                pass
+
+    def _dispatch(self):
+        """Group queued requests into batches and hand them to idle workers."""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch, rows = [item], len(item[0])
+            deadline = time.monotonic() + self.max_wait
+            stop = False
+            while rows < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+                rows += len(item[0])
+
+            worker = self._next_idle()
+            if worker is None:
+                for _, future in batch:
+                    future.set_exception(RuntimeError("No inference worker is running"))
+                if stop:
+                    break
+                continue
+            # Requests that arrived while every worker was busy join this batch
+            while rows < self.max_batch and not stop:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+                rows += len(item[0])
+
+            self._send(worker, batch)
+            if stop:
+                break
+        self._stop_workers()
+
+    def _send(self, worker, batch):
+        """Send one batch to a worker."""
+        with self._lock:
+            batch_id = self._next_batch
+            self._next_batch += 1
+            self._pending[batch_id] = (worker, batch)
+            self.requests += len(batch)
+            self.batches += 1
+        try:
+            self._connections[worker].send((batch_id, np.concatenate([inputs for inputs, _ in batch])))
+        except (OSError, ValueError) as e:
+            with self._lock:
+                self._pending.pop(batch_id, None)
+            for _, future in batch:
+                future.set_exception(RuntimeError(f"Inference worker unavailable: {e}"))
+
+    def _read(self, worker):
+        """Resolve the futures of the batches a worker finishes, restarting the worker if it dies."""
+        while True:
+            try:
+                batch_id, predictions, error = self._connections[worker].recv()
+            except (EOFError, OSError):
+                # The worker is gone: fail its unfinished batches instead of leaving callers waiting
+                self._fail_pending(worker)
+                if self._closed or not self._restart_worker(worker):
+                    break
+                # A worker that died while idle is still queued; one that was busy is not
+                self._release(worker)
+                continue
+            with self._lock:
+                _, batch = self._pending.pop(batch_id, (worker, []))
+            self._release(worker)
+
+            start = 0
+            for inputs, future in batch:
+                if error:
+                    future.set_exception(RuntimeError(f"Inference failed: {error}"))
+                else:
+                    future.set_result(predictions[start:start + len(inputs)])
+                start += len(inputs)
+
+        with self._lock:
+            self._live -= 1
+
+    def _fail_pending(self, worker):
+        """Fail the batches sent to a worker that stopped."""
+        with self._lock:
+            failed = [batch_id for batch_id, (owner, _) in self._pending.items() if owner == worker]
+            batches = [self._pending.pop(batch_id)[1] for batch_id in failed]
+        for batch in batches:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(RuntimeError("Inference worker stopped"))
+
+class RemotePredictor(DifficultyPolicy):
+    """
+    Difficulty predictor answered by an InferenceService.
+    """
+
+    def __init__(self, model_path=None, workers=1, max_batch=64, max_wait=0.002, threads=1, timeout=5.0,
+                 retry_interval=30.0):
+        """
+        Configure the service; start() runs it in the current process.
+
+        Args:
+            model_path (str): Model loaded by the workers (see get_predictor)
+            workers (int): Number of worker processes
+            max_batch (int): Most rows sent to a worker at once
+            max_wait (float): Seconds a batch waits for more requests
+            threads (int): TensorFlow and BLAS threads per worker
+            timeout (float): Seconds to wait for a prediction before using the
+                rule-based fallback (None waits however long it takes)
+            retry_interval (float): Seconds before starting the service again after it failed to start
+        """
+        self.model_path = model_path
+        self.workers = workers
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.threads = threads
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self.fallbacks = 0
+        if model_path and model_path.endswith(WEIGHTS_SUFFIX) and os.path.exists(model_path):
+            # The model is loaded in the workers, but the metrics window is needed here
+            self.window = NumpyMLP.load_weights(model_path).window or self.window
+        self._service = None
+        self._starter = None
+        self._retry_at = 0.0
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def service(self):
+        """The InferenceService of this process, started on first use (None if it failed to start)."""
+        return self.start()
+
+    def start(self, wait=True):
+        """
+        Start this process's service, unless it is running or already starting.
+
+        The worker processes load the model on a background thread, so
+        callers that don't wait keep getting fallback predictions until the
+        service is ready instead of queuing behind the start.
+
+        Args:
+            wait (bool): Whether to wait until the service is ready
+
+        Returns:
+            InferenceService: The running service, or None if it isn't ready
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                # A forked child can't use its parent's threads or pipes
+                self._service = None
+                self._starter = None
+                self._retry_at = 0.0
+                self._pid = os.getpid()
+            if self._service is None and self._starter is None and time.monotonic() >= self._retry_at:
+                self._starter = threading.Thread(target=self._start_service, name='inference-start', daemon=True)
+                self._starter.start()
+            starter = self._starter
+        if wait and starter is not None:
+            starter.join()
+        return self._service
+
+    def _start_service(self):
+        """Start the service (on the starter thread) and publish it once it is ready."""
+        try:
+            service = InferenceService(self.model_path, self.workers, self.max_batch,
+                                       self.max_wait, self.threads)
+        except Exception as e:
+            print(f"Inference service failed to start: {e}")
+            service = None
+        with self._lock:
+            self._service = service
+            self._starter = None
+            if service is None:
+                self._retry_at = time.monotonic() + self.retry_interval
+
+    def predict_difficulty(self, accuracy, reaction_time, attempts):
+        """Predict the next difficulty level based on performance metrics."""
+        # Normalize inputs to expected ranges, as DifficultyPredictor does
+        norm_reaction_time = min(reaction_time, 20) / 20
+        norm_attempts = min(attempts, 3) / 3
+        predictions = self.predict_normalized_batch([[accuracy, norm_reaction_time, norm_attempts]])
+        return float(predictions[0])
+
+    def predict_normalized_batch(self, inputs):
+        """
+        Evaluate the model on many normalized inputs in a worker process.
+
+        Falls back to the rule-based model when the service isn't running,
+        fails or doesn't answer within the timeout.
+
+        Returns:
+            np.ndarray: Predicted difficulties of shape (n,), clipped to [0.1, 0.9]
+        """
+        inputs = np.asarray(inputs, dtype=np.float64).reshape(-1, 3)
+        service = self.start(wait=False)
+        if service is not None:
+            try:
+                return np.clip(service.submit(inputs).result(self.timeout), 0.1, 0.9)
+            except (FutureTimeoutError, RuntimeError):
+                # A late answer still resolves the future; nobody reads it
+                pass
+        with self._lock:
+            self.fallbacks += 1
+        from ai_module import rule_difficulty
+        return np.clip(np.array([rule_difficulty(*row) for row in inputs], dtype=np.float64), 0.1, 0.9)
+
+    def close(self):
+        """Stop this process's service, if it was started."""
+        with self._lock:
+            if self._service is not None and self._pid == os.getpid():
+                self._service.close()
+            self._service = None
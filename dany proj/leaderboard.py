@@ -0,0 +1,199 @@
+# Adaptive Trivia Quiz Game - Persistent Leaderboard
+"""
+SQLite-backed leaderboard of finished games.
+
+Games are ranked globally, per day and per final difficulty. Each board is
+served by a (key, score) index, so a top-N query reads N index entries no
+matter how many games are stored. Inserts are buffered and written in one
+transaction per batch, and the top N of every viewed board is cached in
+memory and updated as games come in instead of being re-queried.
+"""
+import bisect
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+
+# Difficulty labels a game can be ranked under (see convert_difficulty_value_to_label)
+DIFFICULTY_LEVELS = ['easy', 'medium', 'hard']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    player_name TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    difficulty TEXT NOT NULL,
+    played_on TEXT NOT NULL,
+    played_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_games_score ON games (score DESC, played_at);
+CREATE INDEX IF NOT EXISTS idx_games_day_score ON games (played_on, score DESC, played_at);
+CREATE INDEX IF NOT EXISTS idx_games_difficulty_score ON games (difficulty, score DESC, played_at);
+"""
+
+class Leaderboard:
+    """
+    Persistent leaderboard of finished games, stored in SQLite.
+
+    Finished games are buffered and written in batches. The top entries of
+    each board (global, per day, per difficulty) are kept in memory and
+    updated as games are recorded, so page views don't query the database.
+    """
+
+    def __init__(self, db_path='data/leaderboard.db', top_n=10, batch_size=50, refresh_interval=60):
+        """
+        Open (or create) the leaderboard database.
+
+        Args:
+            db_path (str): SQLite database file (':memory:' for a temporary board)
+            top_n (int): Number of entries cached per board
+            batch_size (int): Number of buffered games that triggers a write
+            refresh_interval (float): Seconds after which a cached board is
+                reloaded, to pick up games recorded by other processes (None never reloads)
+        """
+        if db_path != ':memory:' and os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db_path = db_path
+        self.top_n = top_n
+        self.batch_size = batch_size
+        self.refresh_interval = refresh_interval
+        self._lock = threading.RLock()
+        self._pending = []
+        # Cached boards, keyed by (scope, key): sorted lists of (-score, played_at, name, difficulty)
+        self._boards = {}
+        self._loaded_at = {}
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        if db_path != ':memory:':
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def record_game(self, player_name, score, difficulty, played_at=None):
+        """
+        Record a finished game.
+
+        Args:
+            player_name (str): Name of the player
+            score (int): Final score
+            difficulty (str): Difficulty label the game ended at
+            played_at (float): Unix timestamp of the end of the game (defaults to now)
+        """
+        played_at = time.time() if played_at is None else played_at
+        played_on = datetime.fromtimestamp(played_at).date().isoformat()
+        entry = (-int(score), played_at, player_name, difficulty)
+
+        with self._lock:
+            self._pending.append((player_name, int(score), difficulty, played_on, played_at))
+            for board in (('global', None), ('daily', played_on), ('difficulty', difficulty)):
+                self._add_to_board(board, entry)
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+
+    def flush(self):
+        """Write all buffered games to the database in one transaction."""
+        with self._lock:
+            if not self._pending:
+                return 0
+            pending, self._pending = self._pending, []
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO games (player_name, score, difficulty, played_on, played_at) "
+                    "VALUES (?, ?, ?, ?, ?)", pending)
+            return len(pending)
+
+    def top(self, scope='global', key=None, n=None):
+        """
+        Return the best games of a board.
+
+        Args:
+            scope (str): 'global', 'daily' or 'difficulty'
+            key (str): Day (YYYY-MM-DD, defaults to today) or difficulty label
+            n (int): Number of entries (defaults to top_n)
+
+        Returns:
+            list: Dictionaries with rank, player_name, score, difficulty and played_at
+        """
+        n = self.top_n if n is None else n
+        board = self._board_key(scope, key)
+
+        with self._lock:
+            if n > self.top_n:
+                # Larger boards than the cache holds go to the database
+                entries = self._query(board, n)
+            else:
+                if board not in self._boards or self._is_stale(board):
+                    self._boards[board] = self._query(board, self.top_n)
+                    self._loaded_at[board] = time.monotonic()
+                    if scope == 'daily':
+                        self._drop_old_days(board[1])
+                entries = self._boards[board][:n]
+
+        return [{
+            'rank': rank,
+            'player_name': name,
+            'score': -neg_score,
+            'difficulty': difficulty,
+            'played_at': played_at
+        } for rank, (neg_score, played_at, name, difficulty) in enumerate(entries, 1)]
+
+    def count(self):
+        """Return the number of recorded games."""
+        with self._lock:
+            self.flush()
+            return self._conn.execute("SELECT COUNT(*) FROM games").fetchone()[0]
+
+    def close(self):
+        """Write buffered games and close the database."""
+        with self._lock:
+            self.flush()
+            self._conn.close()
+
+    def _board_key(self, scope, key):
+        """Validate a board and fill in its default key."""
+        if scope == 'global':
+            return ('global', None)
+        if scope == 'daily':
+            return ('daily', key or date.today().isoformat())
+        if scope == 'difficulty':
+            if key not in DIFFICULTY_LEVELS:
+                raise ValueError(f"Unknown difficulty: {key}")
+            return ('difficulty', key)
+        raise ValueError(f"Unknown leaderboard scope: {scope}")
+
+    def _query(self, board, n):
+        """Read the top n entries of a board from the (flushed) database."""
+        self.flush()
+        scope, key = board
+        columns = "SELECT score, played_at, player_name, difficulty FROM games"
+        order = "ORDER BY score DESC, played_at LIMIT ?"
+        if scope == 'global':
+            rows = self._conn.execute(f"{columns} {order}", (n,))
+        elif scope == 'daily':
+            rows = self._conn.execute(f"{columns} WHERE played_on = ? {order}", (key, n))
+        else:
+            rows = self._conn.execute(f"{columns} WHERE difficulty = ? {order}", (key, n))
+        return [(-score, played_at, name, difficulty) for score, played_at, name, difficulty in rows]
+
+    def _is_stale(self, board):
+        """Check whether a cached board is due to be reloaded from the database."""
+        if self.refresh_interval is None:
+            return False
+        return time.monotonic() - self._loaded_at[board] > self.refresh_interval
+
+    def _add_to_board(self, board, entry):
+        """Insert an entry into a cached board if it makes the top N."""
+        entries = self._boards.get(board)
+        if entries is None:
+            # Not cached yet; it will be loaded from the database when first viewed
+            return
+        if len(entries) >= self.top_n and entry >= entries[-1]:
+            return
+        bisect.insort(entries, entry)
+        del entries[self.top_n:]
+
+    def _drop_old_days(self, keep_day):
+        """Forget cached daily boards of days before keep_day."""
+        for board in [b for b in self._boards if b[0] == 'daily' and b[1] < keep_day]:
+            del self._boards[board]
+            del self._loaded_at[board]
\ No newline at end of file
@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
 # Adaptive Trivia Quiz Game - Main Module
+import argparse
+import random
 import time
 import os
 import sys
@@ -81,8 +83,9 @@ def main():
     
     # Initialize components
     game = TriviaGame(player_name)
-    data_handler = DataHandler(player_name)
-    ai_predictor = get_predictor()
+    predictor = get_predictor(policy=os.environ.get('DIFFICULTY_POLICY'))
+    data_handler = DataHandler(player_name, window=predictor.window)
+    ai_predictor = predictor.for_player(game.get_current_difficulty())
     
     # Game configuration
     max_rounds = 10
@@ -102,18 +105,12 @@ def main():
                 current_difficulty,
                 round_data["accuracy"],
                 round_data["reaction_time"],
-                round_data["attempts"]
+                round_data["attempts"],
+                round_data["question_id"]
             )
             
-            # Get performance metrics
-            avg_accuracy, avg_reaction_time, avg_attempts = data_handler.get_average_metrics()
-            
             # Use AI to predict new difficulty
-            new_difficulty = ai_predictor.predict_difficulty(
-                avg_accuracy, 
-                avg_reaction_time,
-                avg_attempts
-            )
+            new_difficulty = next_difficulty(ai_predictor, data_handler, round_data)
             
             # Adjust game difficulty
             game.adjust_difficulty(new_difficulty)
@@ -139,5 +136,154 @@ def main():
     # Display game summary
     display_game_summary(player_name, game.get_score(), data_handler)
 
+def parse_answer_script(lines, default_reaction_time=5.0):
+    """
+    Parse scripted answers, one player per line.
+    
+    Each line is `player_name,answer,answer,...`. An answer is an option
+    (1-4 or a-d), optionally followed by `:seconds` for its reaction time;
+    an empty answer means the player didn't answer. Blank lines and lines
+    starting with # are ignored.
+    
+    Args:
+        lines (iterable): Lines of the script
+        default_reaction_time (float): Reaction time for answers without one
+        
+    Returns:
+        list: (player_name, [(answer, reaction_time), ...]) tuples
+    """
+    players = []
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        
+        fields = [field.strip() for field in line.split(',')]
+        player_name = fields[0] or f"Player{line_number}"
+        answers = []
+        for field in fields[1:]:
+            answer, _, seconds = field.partition(':')
+            try:
+                reaction_time = float(seconds) if seconds else default_reaction_time
+            except ValueError:
+                raise ValueError(f"Line {line_number}: invalid reaction time '{seconds}'")
+            answers.append((answer, reaction_time))
+        players.append((player_name, answers))
+    return players
+
+def next_difficulty(policy, data_handler, round_data):
+    """
+    Choose the difficulty after a logged round.
+    
+    Online policies return it straight from the answer; the others predict
+    it from the average metrics of the recent rounds.
+    
+    Args:
+        policy (DifficultyPolicy): The player's policy (see for_player)
+        data_handler (DataHandler): Handler the round was logged to
+        round_data (dict): Performance data returned for the round
+        
+    Returns:
+        float: The new difficulty
+    """
+    new_difficulty = policy.record_answer(
+        round_data["question_id"], round_data["difficulty"], round_data["correct"])
+    if new_difficulty is None:
+        avg_accuracy, avg_reaction_time, avg_attempts = data_handler.get_average_metrics()
+        new_difficulty = policy.predict_difficulty(avg_accuracy, avg_reaction_time, avg_attempts)
+    return new_difficulty
+
+def play_scripted_game(player_name, answers, ai_predictor, max_rounds=None):
+    """
+    Play one game from scripted answers, without screen clears, prompts or pauses.
+    
+    Args:
+        player_name (str): Name of the player
+        answers (list): (answer, reaction_time) tuples, one per round
+        ai_predictor (DifficultyPolicy): Policy shared by all games
+        max_rounds (int): Optional limit on the number of rounds
+        
+    Returns:
+        tuple: (TriviaGame, DataHandler) after the game
+    """
+    game = TriviaGame(player_name)
+    data_handler = DataHandler(player_name, window=ai_predictor.window)
+    policy = ai_predictor.for_player(game.get_current_difficulty())
+    
+    if max_rounds is not None:
+        answers = answers[:max_rounds]
+    
+    for round_num, (answer, reaction_time) in enumerate(answers, 1):
+        round_data = game.play_scripted_round(answer, reaction_time)
+        
+        data_handler.log_performance(
+            round_num,
+            game.get_current_difficulty(),
+            round_data["accuracy"],
+            round_data["reaction_time"],
+            round_data["attempts"],
+            round_data["question_id"]
+        )
+        
+        game.adjust_difficulty(next_difficulty(policy, data_handler, round_data))
+    
+    return game, data_handler
+
+def run_batch(script, max_rounds=None, output=None, seed=None, default_reaction_time=5.0, model_path=None):
+    """
+    Play every game of an answer script and save all results in one CSV file.
+    
+    Args:
+        script (iterable): Lines of the answer script (see parse_answer_script)
+        max_rounds (int): Optional limit on rounds per game
+        output (str): Name of the combined CSV file in the data directory
+        seed (int): Seed for question selection, for reproducible runs
+        default_reaction_time (float): Reaction time for answers without one
+        model_path (str): Saved predictor model to use
+        
+    Returns:
+        list: (player_name, score, rounds_played) tuples
+    """
+    if seed is not None:
+        random.seed(seed)
+    
+    ai_predictor = get_predictor(model_path)
+    results = []
+    handlers = []
+    for player_name, answers in parse_answer_script(script, default_reaction_time):
+        game, data_handler = play_scripted_game(player_name, answers, ai_predictor, max_rounds)
+        handlers.append(data_handler)
+        results.append((player_name, game.get_score(), len(data_handler.rows)))
+    
+    if output != '':
+        filepath = DataHandler.save_combined_csv(handlers, output)
+        print(f"Saved results of {len(handlers)} games to: {filepath}")
+    return results
+
+def parse_args(argv=None):
+    """Parse the command-line options."""
+    parser = argparse.ArgumentParser(description="AI-Enhanced Adaptive Trivia Quiz Game")
+    parser.add_argument('--answers', metavar='FILE',
+                        help="Play non-interactively with scripted answers from FILE ('-' for stdin)")
+    parser.add_argument('--rounds', type=int, default=None, help="Maximum rounds per scripted game")
+    parser.add_argument('--output', default=None,
+                        help="Combined CSV file name in data/ (empty string to skip saving)")
+    parser.add_argument('--seed', type=int, default=None, help="Seed for question selection")
+    parser.add_argument('--reaction-time', type=float, default=5.0,
+                        help="Reaction time for scripted answers without one")
+    parser.add_argument('--model-path', default=None, help="Saved predictor model")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    args = parse_args()
+    if args.answers is None:
+        main()
+    else:
+        script = sys.stdin if args.answers == '-' else open(args.answers)
+        try:
+            for player_name, score, rounds_played in run_batch(script, args.rounds, args.output, args.seed,
+                                                              args.reaction_time, args.model_path):
+                print(f"{player_name}\t{score}\t{rounds_played}")
+        finally:
+            if script is not sys.stdin:
+                script.close() 
\ No newline at end of file
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# Adaptive Trivia Quiz Game - Hyperparameter and Architecture Search
+"""
+Search over difficulty network configurations and keep the Pareto front.
+
+Each configuration sets the hidden layer widths, the training epochs and
+batch size, and the window of rounds averaged by get_average_metrics.
+Configurations are trained (with the NumPy backend, see numpy_mlp.py) and
+scored in parallel over a process pool:
+
+- val_mse: error on held-out samples of the simulated training data
+- tracking_error: mean |final difficulty - player skill| over simulated
+  games played with the configuration's window (see simulator.py)
+- latency_us: time per predict_difficulty call, measured afterwards in the
+  main process one configuration at a time, so workers don't skew it
+
+Configurations that no other configuration beats on both tracking error
+and latency form the Pareto front. The most accurate configuration on the
+front (within --max-latency-us, if given) is saved as a .weights.npz
+artifact, next to a JSON report of every configuration. The artifact
+records the configuration's window, and the game averages the metrics
+over that window when it loads the network.
+
+Usage:
+    python model_search.py --hidden 8 16 16,8 32,16 --epochs 20 50 --windows 1 3 5
+    python model_search.py --max-latency-us 15 --output models/difficulty_predictor.weights.npz
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from ai_module import DifficultyPredictor, simulated_training_data
+from numpy_mlp import NumpyMLP, WEIGHTS_SUFFIX
+from simulator import LogisticPlayer, sample_skills, simulate_game
+
+def build_configs(hidden_layers=((16, 8),), epochs=(50,), batch_sizes=(32,), windows=(3,)):
+    """
+    Return every combination of the given settings.
+
+    Args:
+        hidden_layers (list): Tuples of hidden layer widths
+        epochs (list): Training epochs
+        batch_sizes (list): Training batch sizes
+        windows (list): Rounds averaged by get_average_metrics
+
+    Returns:
+        list: Configuration dictionaries
+    """
+    return [{'hidden': tuple(hidden), 'epochs': n_epochs, 'batch_size': batch_size, 'window': window}
+            for hidden, n_epochs, batch_size, window in itertools.product(hidden_layers, epochs,
+                                                                          batch_sizes, windows)]
+
+def evaluate_config(config, n_samples=1000, n_games=300, rounds=10, seed=0):
+    """
+    Train one configuration and score its prediction quality.
+
+    Args:
+        config (dict): Configuration from build_configs
+        n_samples (int): Simulated training samples
+        n_games (int): Simulated games used for the tracking error
+        rounds (int): Rounds per simulated game
+        seed (int): Seed of the simulated players (shared by all configurations)
+
+    Returns:
+        dict: The configuration, its scores and the trained weights
+    """
+    x_train, y_train = simulated_training_data(n_samples)
+    x_val, y_val = simulated_training_data(max(n_samples // 2, 1), seed=43)
+
+    network = NumpyMLP((3, *config['hidden'], 1), seed=42)
+    network.fit(x_train, y_train, epochs=config['epochs'], batch_size=config['batch_size'])
+    val_mse = float(((network.predict(x_val) - y_val) ** 2).mean())
+
+    # Question selection draws from the random module, so seed it too
+    predictor = DifficultyPredictor(model=network)
+    random.seed(seed)
+    rng = np.random.default_rng(seed)
+    tracking_error = 0.0
+    for skill in sample_skills(n_games, 'uniform', rng):
+        result = simulate_game(LogisticPlayer(skill), predictor, rounds, rng, window=config['window'])
+        tracking_error += abs(result['trajectory'][-1] - skill) if result['trajectory'] else 0.0
+
+    return {
+        'config': config,
+        'parameters': int(sum(w.size for w in network.weights)),
+        'val_mse': val_mse,
+        'tracking_error': tracking_error / max(n_games, 1),
+        'weights': network.get_weights()
+    }
+
+def measure_latency(network, n_calls=2000, seed=0):
+    """
+    Time predict_difficulty of a network, one call at a time as the game makes them.
+
+    Returns:
+        float: Mean microseconds per call
+    """
+    predictor = DifficultyPredictor(model=network)
+    rng = np.random.default_rng(seed)
+    inputs = np.column_stack([rng.random(n_calls), rng.random(n_calls) * 20, rng.integers(1, 4, n_calls)])
+    predictor.predict_difficulty(*inputs[0])  # Warm up
+    started = time.perf_counter()
+    for accuracy, reaction_time, attempts in inputs:
+        predictor.predict_difficulty(accuracy, reaction_time, attempts)
+    return (time.perf_counter() - started) / n_calls * 1e6
+
+def pareto_front(results, objectives=('tracking_error', 'latency_us')):
+    """
+    Return the results not dominated by any other (lower is better for every objective).
+
+    A result is dominated when another one is at least as good on every
+    objective and better on one.
+    """
+    front = []
+    for result in results:
+        values = [result[key] for key in objectives]
+        dominated = any(
+            all(other[key] <= value for key, value in zip(objectives, values)) and
+            any(other[key] < value for key, value in zip(objectives, values))
+            for other in results if other is not result)
+        if not dominated:
+            front.append(result)
+    return sorted(front, key=lambda result: [result[key] for key in objectives])
+
+def choose_best(front, max_latency_us=None):
+    """Pick the most accurate configuration on the front, within the latency budget if possible."""
+    eligible = [result for result in front
+                if max_latency_us is None or result['latency_us'] <= max_latency_us]
+    return min(eligible or front, key=lambda result: (result['tracking_error'], result['latency_us']))
+
+def run_search(configs, workers=None, n_samples=1000, n_games=300, rounds=10, seed=0,
+               max_latency_us=None, output='models/difficulty_predictor' + WEIGHTS_SUFFIX,
+               report_path=None):
+    """
+    Evaluate configurations over a process pool and save the best network.
+
+    Args:
+        configs (list): Configurations from build_configs
+        workers (int): Worker processes (defaults to the CPU count; 1 runs in-process)
+        n_samples (int): Simulated training samples per configuration
+        n_games (int): Simulated games per configuration
+        rounds (int): Rounds per simulated game
+        seed (int): Seed of the simulated players
+        max_latency_us (float): Latency budget for the chosen configuration
+        output (str): Where to save the chosen network's weights (None skips saving)
+        report_path (str): Where to write the JSON report (defaults next to output)
+
+    Returns:
+        dict: Report with every result, the Pareto front and the chosen configuration
+    """
+    workers = max(1, min(workers or os.cpu_count() or 1, len(configs)))
+    arguments = ([n_samples] * len(configs), [n_games] * len(configs),
+                 [rounds] * len(configs), [seed] * len(configs))
+    if workers == 1:
+        results = list(map(evaluate_config, configs, *arguments))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(evaluate_config, configs, *arguments))
+
+    networks = []
+    for result in results:
+        network = NumpyMLP((3, *result['config']['hidden'], 1))
+        network.set_weights(result.pop('weights'))
+        result['latency_us'] = measure_latency(network)
+        networks.append(network)
+
+    front = pareto_front(results)
+    best = choose_best(front, max_latency_us)
+    for result in results:
+        result['pareto'] = any(result is member for member in front)
+
+    report = {
+        'configs': len(configs),
+        'best': best,
+        'pareto_front': front,
+        'results': results,
+        'artifact': None
+    }
+    if output:
+        if os.path.dirname(output):
+            os.makedirs(os.path.dirname(output), exist_ok=True)
+        # The app averages the metrics over the window the network was chosen for
+        report['artifact'] = networks[results.index(best)].save_weights(output, best['config']['window'])
+        report_path = report_path or output[:-len(WEIGHTS_SUFFIX)] + '.search.json'
+    if report_path:
+        with open(report_path, 'w') as f:
+            json.dump(report, f, indent=2)
+    return report
+
+def _parse_hidden(value):
+    """Parse hidden layer widths such as '16,8'."""
+    return tuple(int(units) for units in value.split(','))
+
+def main(argv=None):
+    """Run a search from the command line and print the Pareto front."""
+    parser = argparse.ArgumentParser(description="Search difficulty network configurations")
+    parser.add_argument('--hidden', nargs='+', type=_parse_hidden, default=[(8,), (16,), (16, 8), (32, 16)],
+                        help="Hidden layer widths, e.g. 16,8")
+    parser.add_argument('--epochs', nargs='+', type=int, default=[20, 50])
+    parser.add_argument('--batch-sizes', nargs='+', type=int, default=[32])
+    parser.add_argument('--windows', nargs='+', type=int, default=[1, 3, 5])
+    parser.add_argument('--games', type=int, default=300, help="Simulated games per configuration")
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--samples', type=int, default=1000, help="Simulated training samples")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-latency-us', type=float, default=None)
+    parser.add_argument('--output', default='models/difficulty_predictor' + WEIGHTS_SUFFIX)
+    args = parser.parse_args(argv)
+
+    configs = build_configs(args.hidden, args.epochs, args.batch_sizes, args.windows)
+    report = run_search(configs, args.workers, args.samples, args.games, args.rounds, args.seed,
+                        args.max_latency_us, args.output)
+
+    print(f"Evaluated {report['configs']} configurations; Pareto front:")
+    for result in report['pareto_front']:
+        config = result['config']
+        marker = '*' if result is report['best'] else ' '
+        print(f"{marker} hidden={','.join(map(str, config['hidden'])):<6} epochs={config['epochs']:<4} "
+              f"batch={config['batch_size']:<4} window={config['window']}  "
+              f"tracking={result['tracking_error']:.3f}  val_mse={result['val_mse']:.4f}  "
+              f"latency={result['latency_us']:.1f}us")
+    if report['artifact']:
+        print(f"Best network saved to {report['artifact']} (window {report['best']['config']['window']})")
+
+if __name__ == "__main__":
+    main()
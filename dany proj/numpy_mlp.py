@@ -0,0 +1,213 @@
+# Adaptive Trivia Quiz Game - NumPy Training Backend for the Difficulty Network
+"""
+The difficulty network (Dense 16 relu -> Dense 8 relu -> Dense 1 sigmoid)
+implemented in plain NumPy, so it can be trained and served without
+TensorFlow.
+
+NumpyMLP mirrors the parts of the Keras model that DifficultyPredictor
+uses: predict() and fit() take the same arguments, and get_weights() /
+set_weights() use the Keras layout (kernel of shape (inputs, units), then
+bias, for each layer). Weights are saved as .weights.npz files in that
+layout, which both backends can load.
+
+Training is mini-batch Adam on the mean squared error, with the forward
+and backward passes of a whole batch done as matrix products. Matrix
+products use NumPy's BLAS; its thread count can be capped per call when
+threadpoolctl is installed.
+
+Usage:
+    python numpy_mlp.py --output models/difficulty_predictor.weights.npz --blas-threads 2
+"""
+import argparse
+import contextlib
+
+import numpy as np
+
+try:
+    from threadpoolctl import threadpool_limits
+except ImportError:
+    threadpool_limits = None
+
+# File suffix of saved network weights (see save_weights)
+WEIGHTS_SUFFIX = '.weights.npz'
+
+def blas_thread_limit(threads=None):
+    """
+    Return a context manager capping the BLAS threads used by NumPy.
+
+    Does nothing when threads is None or threadpoolctl is not installed.
+    """
+    if not threads or threadpool_limits is None:
+        return contextlib.nullcontext()
+    return threadpool_limits(limits=threads, user_api='blas')
+
+class NumpyMLP:
+    def __init__(self, layer_sizes=(3, 16, 8, 1), learning_rate=0.001, seed=None):
+        """
+        Initialize the network with Glorot-uniform kernels and zero biases, like Keras.
+
+        Args:
+            layer_sizes (tuple): Inputs followed by the units of each layer;
+                hidden layers use ReLU and the output layer a sigmoid
+            learning_rate (float): Adam step size
+            seed (int): Seed for the initial weights and the batch shuffling
+        """
+        self.layer_sizes = tuple(layer_sizes)
+        self.learning_rate = learning_rate
+        self.window = None  # Rounds averaged into the inputs it was chosen for, if known
+        self.rng = np.random.default_rng(seed)
+        self.weights = []
+        for fan_in, fan_out in zip(self.layer_sizes[:-1], self.layer_sizes[1:]):
+            limit = np.sqrt(6.0 / (fan_in + fan_out))
+            self.weights.append(self.rng.uniform(-limit, limit, (fan_in, fan_out)))
+            self.weights.append(np.zeros(fan_out))
+        self._reset_optimizer()
+
+    def get_weights(self):
+        """Return copies of the kernels and biases, in the order Keras uses."""
+        return [w.copy() for w in self.weights]
+
+    def set_weights(self, weights):
+        """Replace the kernels and biases (as returned by get_weights or a Keras model)."""
+        weights = [np.asarray(w, dtype=np.float64) for w in weights]
+        if [w.shape for w in weights] != [w.shape for w in self.weights]:
+            raise ValueError("Weights don't match the layer sizes "
+                             f"{self.layer_sizes}: {[w.shape for w in weights]}")
+        self.weights = weights
+        self._reset_optimizer()
+
+    def predict(self, inputs, verbose=0, batch_size=None):
+        """
+        Evaluate the network.
+
+        Args:
+            inputs (array): Array of shape (n, inputs)
+            verbose (int): Ignored, for compatibility with Keras
+            batch_size (int): Ignored, the whole array is one batch
+
+        Returns:
+            np.ndarray: Outputs of shape (n, 1)
+        """
+        return self._forward(np.asarray(inputs, dtype=np.float64).reshape(-1, self.layer_sizes[0]))[-1]
+
+    def fit(self, x, y, epochs=50, batch_size=32, verbose=0, blas_threads=None):
+        """
+        Train with mini-batch Adam on the mean squared error.
+
+        Args:
+            x (array): Inputs of shape (n, inputs)
+            y (array): Targets of shape (n, 1)
+            epochs (int): Passes over the data (reshuffled every epoch)
+            batch_size (int): Samples per Adam step
+            verbose (int): Print the loss after every epoch if non-zero
+            blas_threads (int): Cap on BLAS threads while training (needs threadpoolctl)
+
+        Returns:
+            dict: Mean loss and mean absolute error of every epoch
+        """
+        x = np.asarray(x, dtype=np.float64).reshape(-1, self.layer_sizes[0])
+        y = np.asarray(y, dtype=np.float64).reshape(-1, self.layer_sizes[-1])
+        with blas_thread_limit(blas_threads):
+            return self._fit(x, y, epochs, batch_size, verbose)
+
+    def save_weights(self, path, window=None):
+        """Save the weights in the Keras layout (and the metrics window, if known) as a .weights.npz file."""
+        window = window or self.window
+        extra = {'window': np.array(window)} if window else {}
+        np.savez(path, layer_sizes=np.array(self.layer_sizes), **extra,
+                 **{f'weight_{i}': w for i, w in enumerate(self.weights)})
+        return path
+
+    @classmethod
+    def load_weights(cls, path):
+        """Create a network from a file written by save_weights."""
+        with np.load(path) as data:
+            model = cls(tuple(int(size) for size in data['layer_sizes']))
+            model.set_weights([data[f'weight_{i}'] for i in range(len(model.weights))])
+            if 'window' in data:
+                model.window = int(data['window'])
+        return model
+
+    def _fit(self, x, y, epochs, batch_size, verbose):
+        """Run the training loop."""
+        history = {'loss': [], 'mae': []}
+        n = len(x)
+        for epoch in range(epochs):
+            order = self.rng.permutation(n)
+            loss_sum = abs_sum = 0.0
+            for start in range(0, n, batch_size):
+                batch = order[start:start + batch_size]
+                activations = self._forward(x[batch])
+                error = activations[-1] - y[batch]
+                loss_sum += float((error ** 2).sum())
+                abs_sum += float(np.abs(error).sum())
+                self._adam_step(self._backward(activations, 2.0 * error / error.size))
+            history['loss'].append(loss_sum / y.size)
+            history['mae'].append(abs_sum / y.size)
+            if verbose:
+                print(f"Epoch {epoch + 1}/{epochs} - loss: {history['loss'][-1]:.4f} "
+                      f"- mae: {history['mae'][-1]:.4f}")
+        return history
+
+    def _forward(self, x):
+        """Return the activations of every layer, starting with the inputs."""
+        activations = [x]
+        n_layers = len(self.weights) // 2
+        for layer in range(n_layers):
+            z = activations[-1] @ self.weights[2 * layer] + self.weights[2 * layer + 1]
+            if layer < n_layers - 1:
+                activations.append(np.maximum(z, 0.0))
+            else:
+                activations.append(1.0 / (1.0 + np.exp(-z)))
+        return activations
+
+    def _backward(self, activations, output_gradient):
+        """Return the loss gradient of every weight, given d(loss)/d(output)."""
+        gradients = [None] * len(self.weights)
+        output = activations[-1]
+        delta = output_gradient * output * (1.0 - output)  # Through the sigmoid
+        for layer in range(len(self.weights) // 2 - 1, -1, -1):
+            gradients[2 * layer] = activations[layer].T @ delta
+            gradients[2 * layer + 1] = delta.sum(axis=0)
+            if layer > 0:
+                # Through the ReLU of the previous layer
+                delta = (delta @ self.weights[2 * layer].T) * (activations[layer] > 0)
+        return gradients
+
+    def _adam_step(self, gradients, beta1=0.9, beta2=0.999, epsilon=1e-7):
+        """Apply one Adam update (Keras default hyperparameters)."""
+        self._step += 1
+        correction = np.sqrt(1 - beta2 ** self._step) / (1 - beta1 ** self._step)
+        for w, g, m, v in zip(self.weights, gradients, self._m, self._v):
+            m += (1 - beta1) * (g - m)
+            v += (1 - beta2) * (g * g - v)
+            w -= self.learning_rate * correction * m / (np.sqrt(v) + epsilon)
+
+    def _reset_optimizer(self):
+        """Forget the Adam moment estimates."""
+        self._step = 0
+        self._m = [np.zeros_like(w) for w in self.weights]
+        self._v = [np.zeros_like(w) for w in self.weights]
+
+def main(argv=None):
+    """Train the difficulty network with NumPy and save its weights."""
+    parser = argparse.ArgumentParser(description="Train the difficulty network without TensorFlow")
+    parser.add_argument('--output', default='models/difficulty_predictor' + WEIGHTS_SUFFIX)
+    parser.add_argument('--blas-threads', type=int, default=None, help="Cap on BLAS threads")
+    args = parser.parse_args(argv)
+
+    import os
+    import time
+    from ai_module import DifficultyPredictor
+    if os.path.dirname(args.output):
+        os.makedirs(os.path.dirname(args.output), exist_ok=True)
+
+    started = time.perf_counter()
+    with blas_thread_limit(args.blas_threads):
+        # The predictor trains its network on simulated data when created
+        predictor = DifficultyPredictor(backend='numpy')
+    predictor.save_weights(args.output)
+    print(f"Trained in {time.perf_counter() - started:.2f}s, weights saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
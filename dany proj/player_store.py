@@ -0,0 +1,196 @@
+# Adaptive Trivia Quiz Game - Persistent Player Profiles
+"""
+Per-player history that carries over between games.
+
+Each profile holds a few rolling statistics (exponential moving averages of
+accuracy, reaction time and attempts over all rounds played), the
+difficulty the last game ended at and the questions the player has seen,
+so a returning player starts where they left off instead of at medium
+difficulty with no history.
+
+Profiles are stored in SQLite, keyed by player name. An in-process LRU
+cache sits in front of the database, so looking up a returning player
+usually costs no disk I/O.
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Weight of the newest round in the rolling averages
+ROLLING_WEIGHT = 0.2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    player_name TEXT PRIMARY KEY,
+    games_played INTEGER NOT NULL,
+    rounds_played INTEGER NOT NULL,
+    avg_accuracy REAL NOT NULL,
+    avg_reaction_time REAL NOT NULL,
+    avg_attempts REAL NOT NULL,
+    last_difficulty REAL NOT NULL,
+    best_score INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    seen_questions TEXT NOT NULL DEFAULT ''
+)
+"""
+
+_FIELDS = ['player_name', 'games_played', 'rounds_played', 'avg_accuracy', 'avg_reaction_time',
+           'avg_attempts', 'last_difficulty', 'best_score', 'updated_at', 'seen_questions']
+
+class PlayerStore:
+    """
+    SQLite store of player profiles with an LRU cache in front of it.
+    """
+
+    def __init__(self, db_path='data/players.db', cache_size=1024):
+        """
+        Open (or create) the profile database.
+
+        Args:
+            db_path (str): SQLite database file (':memory:' for a temporary store)
+            cache_size (int): Number of profiles kept in memory
+        """
+        if db_path != ':memory:' and os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self._lock = threading.RLock()
+        # Profiles by player name, least recently used first; None marks unknown players
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        if db_path != ':memory:':
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_SCHEMA)
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(players)")]
+        if 'seen_questions' not in columns:
+            # Databases created before seen questions were tracked
+            self._conn.execute("ALTER TABLE players ADD COLUMN seen_questions TEXT NOT NULL DEFAULT ''")
+
+    def get(self, player_name):
+        """
+        Look up a player's profile.
+
+        Args:
+            player_name (str): Name of the player
+
+        Returns:
+            dict: Copy of the profile, or None for a player without history
+        """
+        with self._lock:
+            if player_name in self._cache:
+                self.hits += 1
+                self._cache.move_to_end(player_name)
+                profile = self._cache[player_name]
+            else:
+                self.misses += 1
+                row = self._conn.execute(
+                    f"SELECT {', '.join(_FIELDS)} FROM players WHERE player_name = ?",
+                    (player_name,)).fetchone()
+                profile = dict(zip(_FIELDS, row)) if row else None
+                self._remember(player_name, profile)
+        return dict(profile) if profile else None
+
+    def record_game(self, player_name, rounds, final_difficulty, score, seen_questions=None):
+        """
+        Fold a finished game into the player's profile and save it.
+
+        Args:
+            player_name (str): Name of the player
+            rounds (list): Round dictionaries logged by DataHandler, oldest first
+            final_difficulty (float): Difficulty the game ended at
+            score (int): Final score
+            seen_questions (str): Serialized QuestionBitset of every question
+                the player has seen (None keeps the stored one)
+
+        Returns:
+            dict: The updated profile
+        """
+        with self._lock:
+            profile = self.get(player_name) or {
+                'player_name': player_name,
+                'games_played': 0,
+                'rounds_played': 0,
+                'avg_accuracy': None,
+                'avg_reaction_time': None,
+                'avg_attempts': None,
+                'best_score': 0,
+                'seen_questions': ''
+            }
+
+            for row in rounds:
+                for field, key in (('avg_accuracy', 'accuracy'),
+                                   ('avg_reaction_time', 'reaction_time'),
+                                   ('avg_attempts', 'attempts')):
+                    value = float(row[key])
+                    if profile[field] is None:
+                        profile[field] = value
+                    else:
+                        profile[field] += ROLLING_WEIGHT * (value - profile[field])
+
+            # Players who quit before answering keep the DataHandler defaults
+            for field, default in (('avg_accuracy', 0.5), ('avg_reaction_time', 10.0), ('avg_attempts', 1.0)):
+                if profile[field] is None:
+                    profile[field] = default
+
+            profile['games_played'] += 1
+            profile['rounds_played'] += len(rounds)
+            profile['last_difficulty'] = float(final_difficulty)
+            profile['best_score'] = max(profile['best_score'], int(score))
+            profile['updated_at'] = time.time()
+            if seen_questions is not None:
+                profile['seen_questions'] = seen_questions
+
+            with self._conn:
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO players ({', '.join(_FIELDS)}) "
+                    f"VALUES ({', '.join('?' * len(_FIELDS))})",
+                    [profile[field] for field in _FIELDS])
+            self._remember(player_name, profile)
+            return dict(profile)
+
+    def cache_info(self):
+        """
+        Report how well the cache is working.
+
+        Returns:
+            dict: Hits, misses, hit rate and current size
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'size': len(self._cache)
+            }
+
+    def close(self):
+        """Close the database."""
+        with self._lock:
+            self._conn.close()
+
+    def _remember(self, player_name, profile):
+        """Put a profile in the cache, evicting the least recently used one if full."""
+        self._cache[player_name] = profile
+        self._cache.move_to_end(player_name)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+def warm_start_metrics(profile):
+    """
+    Return the baseline metrics for a player's first rounds.
+
+    Args:
+        profile (dict): Player profile, or None for a new player
+
+    Returns:
+        tuple: (accuracy, reaction_time, attempts), or None for a new player
+    """
+    if not profile:
+        return None
+    return profile['avg_accuracy'], profile['avg_reaction_time'], profile['avg_attempts']
\ No newline at end of file
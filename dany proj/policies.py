@@ -0,0 +1,199 @@
+# Adaptive Trivia Quiz Game - Difficulty Policies
+"""
+The interface shared by everything that picks the next difficulty, and an
+online rating policy that needs neither TensorFlow nor pandas.
+
+A difficulty policy is asked for a per-player instance when a game starts
+(for_player) and is told about every answer (record_answer). Window-based
+policies such as DifficultyPredictor keep no per-player state: they return
+themselves from for_player and None from record_answer, and the caller
+asks predict_difficulty with the player's recent average metrics instead.
+
+EloPolicy rates players and questions on the game's own 0-1 difficulty
+scale, like chess players and their opponents. Each answer moves the
+player's rating and the question's rating in opposite directions by an
+amount proportional to how surprising the answer was, which is a handful
+of arithmetic operations per answer and no history at all. The next
+difficulty is simply the player's rating: questions the player is
+expected to know about half of the time.
+"""
+import math
+import threading
+from abc import ABC, abstractmethod
+
+class DifficultyPolicy(ABC):
+    """
+    Base class of the difficulty policies returned by get_predictor.
+
+    Subclasses implement predict_difficulty; online policies also override
+    for_player and answer through the per-player instances.
+    """
+
+    # Whether record_answer returns the next difficulty (no metrics window needed)
+    online = False
+    # Rounds averaged into the metrics passed to predict_difficulty
+    window = 3
+
+    def for_player(self, initial_difficulty=0.5):
+        """
+        Return the policy instance used for one player's game.
+
+        Args:
+            initial_difficulty (float): Difficulty the game starts at
+
+        Returns:
+            DifficultyPolicy: self for policies without per-player state
+        """
+        return self
+
+    def record_answer(self, question_id, question_difficulty, correct):
+        """
+        Learn from an answer.
+
+        Args:
+            question_id (int): ID of the answered question (None if unknown)
+            question_difficulty (float): Numeric difficulty of the question
+            correct (bool): Whether the answer was correct
+
+        Returns:
+            float: The next difficulty, or None if it should be predicted
+                from the average metrics with predict_difficulty
+        """
+        return None
+
+    def preview_answer(self, question_id, question_difficulty, correct):
+        """Return what record_answer would return, without learning from the answer."""
+        return None
+
+    def prediction_key(self, accuracy, reaction_time, attempts):
+        """
+        Return a key that is equal for metrics that get the same prediction.
+
+        The default is the metrics themselves. Policies that quantize their
+        inputs return the cell the metrics fall in, so callers can tell
+        whether a prediction made for other metrics still holds.
+        """
+        return (accuracy, reaction_time, attempts)
+
+    @abstractmethod
+    def predict_difficulty(self, accuracy, reaction_time, attempts):
+        """Predict the next difficulty level from the player's average metrics."""
+
+class EloPolicy(DifficultyPolicy):
+    """
+    Online Elo-style ratings of players and questions.
+
+    The chance of a correct answer is modelled as
+
+        P(correct) = guess_rate + (1 - guess_rate) * sigmoid(slope * (rating - difficulty))
+
+    and after every answer both ratings move by K * (correct - P). K shrinks
+    as a player or question collects answers, so new players settle quickly
+    and established ratings stay stable. Question ratings are shared by all
+    players of the process; player ratings live in the EloPlayer instances.
+    """
+
+    online = True
+
+    def __init__(self, k_player=0.2, k_question=0.05, k_min=0.03, slope=8.0, guess_rate=0.25):
+        """
+        Initialize the policy with no rated questions.
+
+        Args:
+            k_player (float): Step size of a new player's first answer
+            k_question (float): Step size of a new question's first answer
+            k_min (float): Smallest step size, however many answers were seen
+            slope (float): Steepness of the answer model (per unit of difficulty)
+            guess_rate (float): Chance of guessing right (one of four options)
+        """
+        self.k_player = k_player
+        self.k_question = k_question
+        self.k_min = k_min
+        self.slope = slope
+        self.guess_rate = guess_rate
+        # [rating, answers] of every question answered so far, by question ID
+        self.question_ratings = {}
+        self._lock = threading.Lock()
+
+    def for_player(self, initial_difficulty=0.5):
+        """Start rating a player at the difficulty their game starts at."""
+        return EloPlayer(self, initial_difficulty)
+
+    def question_rating(self, question_id, question_difficulty):
+        """Return the current rating of a question (its difficulty until it is answered)."""
+        with self._lock:
+            rating = self.question_ratings.get(question_id)
+            return question_difficulty if rating is None else rating[0]
+
+    def expected(self, player_rating, question_rating):
+        """Return the modelled probability of a correct answer."""
+        knows = 1.0 / (1.0 + math.exp(-self.slope * (player_rating - question_rating)))
+        return self.guess_rate + (1.0 - self.guess_rate) * knows
+
+    def predict_difficulty(self, accuracy, reaction_time, attempts):
+        """Reject the call: the next difficulty is a player's rating, which only for_player() instances have."""
+        raise TypeError("EloPolicy has no player rating; call predict_difficulty on the "
+                        "EloPlayer returned by for_player()")
+
+    def step_size(self, base, answers):
+        """Return the K factor after a number of answers."""
+        return max(base / math.sqrt(1.0 + answers), self.k_min)
+
+    def update(self, player, question_id, question_difficulty, correct):
+        """
+        Move a player's and a question's ratings after an answer.
+
+        Args:
+            player (EloPlayer): The answering player
+            question_id (int): ID of the question (None rates only the player)
+            question_difficulty (float): Difficulty of the question
+            correct (bool): Whether the answer was correct
+
+        Returns:
+            float: The player's new rating
+        """
+        with self._lock:
+            entry = self.question_ratings.get(question_id) if question_id is not None else None
+            question_rating = question_difficulty if entry is None else entry[0]
+            surprise = (1.0 if correct else 0.0) - self.expected(player.rating, question_rating)
+
+            player.rating = _clip(player.rating + self.step_size(self.k_player, player.answers) * surprise)
+            player.answers += 1
+            if question_id is not None:
+                if entry is None:
+                    entry = self.question_ratings[question_id] = [question_difficulty, 0]
+                entry[0] = _clip(entry[0] - self.step_size(self.k_question, entry[1]) * surprise)
+                entry[1] += 1
+            return player.rating
+
+class EloPlayer(DifficultyPolicy):
+    """
+    One player's rating under an EloPolicy.
+    """
+
+    online = True
+
+    def __init__(self, policy, rating=0.5):
+        """Initialize the player's rating."""
+        self.policy = policy
+        self.rating = _clip(rating)
+        self.answers = 0
+
+    def record_answer(self, question_id, question_difficulty, correct):
+        """Update the ratings and return the next difficulty."""
+        return self.policy.update(self, question_id, question_difficulty, correct)
+
+    def preview_answer(self, question_id, question_difficulty, correct):
+        """Return the next difficulty after an answer without changing any rating."""
+        policy = self.policy
+        question_rating = policy.question_rating(question_id, question_difficulty)
+        surprise = (1.0 if correct else 0.0) - policy.expected(self.rating, question_rating)
+        return _clip(self.rating + policy.step_size(policy.k_player, self.answers) * surprise)
+
+    def predict_difficulty(self, accuracy, reaction_time, attempts):
+        """Return the player's rating; the metrics are not needed."""
+        return self.rating
+
+def _clip(difficulty):
+    """Keep a rating in the game's difficulty range [0.1, 0.9]."""
+    return min(max(difficulty, 0.1), 0.9)
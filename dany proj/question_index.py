@@ -0,0 +1,576 @@
+# Adaptive Trivia Quiz Game - Question Index and Seen-Question Bitsets
+"""
+Compact tracking of the questions a player has seen.
+
+QuestionBitset stores a set of question IDs as the bits of one Python
+integer: bit n is set when question n has been seen. Tens of thousands of
+questions fit in a few kilobytes, and the set serializes to a short
+base64 string that can live in the session cookie and the player profile.
+
+QuestionIndex precomputes one bitmask per difficulty label of the bank,
+so "unseen questions at difficulty X" is a single AND NOT of two integers
+instead of a scan over the bank. It also keeps the questions sorted by
+numeric difficulty, so the questions closest to a predicted difficulty are
+found by bisection. For each player's seen set it also keeps a Fenwick
+tree of unseen questions in that order, so the unseen question nearest to
+a difficulty is found in O(log n) as well.
+
+Within the chosen difficulty window questions are drawn in proportion to
+a per-question weight, stored in a Fenwick tree (binary indexed tree) in
+difficulty order: drawing and updating a weight are both O(log n), so the
+weights can change after every answer without rebuilding anything. By
+default the weight favors questions that players answer correctly about
+half of the time, which say the most about a player's level.
+"""
+import base64
+import random
+import threading
+import zlib
+from bisect import bisect_left, bisect_right
+
+# Numeric position of labelled questions: the center of each label's band in
+# convert_difficulty_value_to_label, so the nearest label is the one the
+# predicted difficulty falls in
+LABEL_DIFFICULTIES = {'easy': 0.15, 'medium': 0.45, 'hard': 0.75}
+
+# Random draws tried in a window before scanning it for unseen questions
+_SAMPLE_ATTEMPTS = 8
+
+# Most positions of a window scanned after the random draws missed
+_SCAN_LIMIT = 256
+
+# Smallest weight answer_weight gives, so every question can still be drawn
+MIN_WEIGHT = 0.1
+
+# Number of set bits in each byte value
+_BYTE_POPCOUNT = [bin(value).count('1') for value in range(256)]
+
+class QuestionBitset:
+    """Set of non-negative question IDs stored as the bits of an integer."""
+
+    __slots__ = ('bits', 'ranks')
+
+    def __init__(self, ids=None, bits=0):
+        """
+        Initialize the set.
+
+        Args:
+            ids (iterable): Question IDs to add
+            bits (int): Initial bitmask
+        """
+        self.bits = bits
+        # [index, bits it reflects, FenwickTree] kept by QuestionIndex._unseen_tree
+        self.ranks = None
+        if ids is not None:
+            self.update(ids)
+
+    def add(self, question_id):
+        """Mark a question as seen."""
+        self.bits |= 1 << question_id
+
+    def discard(self, question_id):
+        """Forget a question if it was seen."""
+        self.bits &= ~(1 << question_id)
+
+    def update(self, ids):
+        """Mark several questions as seen."""
+        for question_id in ids:
+            self.bits |= 1 << question_id
+
+    def clear(self):
+        """Forget all questions."""
+        self.bits = 0
+
+    def copy(self):
+        """Return an independent copy of the set (and of its unseen tree, with a list copy)."""
+        duplicate = QuestionBitset(bits=self.bits)
+        if self.ranks is not None:
+            index, bits, tree = self.ranks
+            duplicate.ranks = [index, bits, tree.copy()]
+        return duplicate
+
+    def __contains__(self, question_id):
+        return isinstance(question_id, int) and question_id >= 0 and (self.bits >> question_id) & 1 == 1
+
+    def __len__(self):
+        return self.bits.bit_count()
+
+    def __bool__(self):
+        return self.bits != 0
+
+    def __iter__(self):
+        return iter_bits(self.bits)
+
+    def __eq__(self, other):
+        if isinstance(other, QuestionBitset):
+            return self.bits == other.bits
+        if isinstance(other, (set, frozenset)):
+            return len(self) == len(other) and all(question_id in self for question_id in other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"QuestionBitset({sorted(self)})"
+
+    def serialize(self):
+        """
+        Encode the set as a short ASCII string.
+
+        The bitmask bytes are zlib-compressed when that makes them shorter
+        (sparse sets of large IDs); the first character records which
+        encoding was used.
+
+        Returns:
+            str: Encoded set ('' for an empty set)
+        """
+        if not self.bits:
+            return ''
+        raw = self.bits.to_bytes((self.bits.bit_length() + 7) // 8, 'little')
+        compressed = zlib.compress(raw, 9)
+        if len(compressed) < len(raw):
+            return 'z' + base64.urlsafe_b64encode(compressed).decode('ascii')
+        return 'r' + base64.urlsafe_b64encode(raw).decode('ascii')
+
+    @classmethod
+    def deserialize(cls, data):
+        """
+        Decode a string produced by serialize().
+
+        Lists of IDs (the format used before bitsets) are accepted as well.
+
+        Args:
+            data (str or list): Encoded set
+
+        Returns:
+            QuestionBitset: The decoded set
+        """
+        if not data:
+            return cls()
+        if not isinstance(data, str):
+            return cls(data)
+        raw = base64.urlsafe_b64decode(data[1:].encode('ascii'))
+        if data[0] == 'z':
+            raw = zlib.decompress(raw)
+        elif data[0] != 'r':
+            raise ValueError(f"Unknown question set encoding: {data[0]!r}")
+        return cls(bits=int.from_bytes(raw, 'little'))
+
+def iter_bits(bits):
+    """Yield the positions of the set bits of an integer in increasing order."""
+    for byte_index, byte in enumerate(bits.to_bytes((bits.bit_length() + 7) // 8, 'little')):
+        while byte:
+            low = byte & -byte
+            yield byte_index * 8 + low.bit_length() - 1
+            byte ^= low
+
+def nth_bit(bits, n):
+    """
+    Return the position of the n-th (zero-based) set bit of an integer.
+
+    Raises:
+        IndexError: If fewer than n + 1 bits are set
+    """
+    for byte_index, byte in enumerate(bits.to_bytes((bits.bit_length() + 7) // 8, 'little')):
+        count = _BYTE_POPCOUNT[byte]
+        if n < count:
+            for _ in range(n):
+                byte &= byte - 1
+            return byte_index * 8 + (byte & -byte).bit_length() - 1
+        n -= count
+    raise IndexError("bit index out of range")
+
+class FenwickTree:
+    """Prefix sums over a list of non-negative weights with O(log n) updates and lookups."""
+
+    def __init__(self, weights):
+        """
+        Build the tree in O(n).
+
+        Args:
+            weights (list): Initial weight of each position
+        """
+        self.weights = [float(weight) for weight in weights]
+        self.size = len(self.weights)
+        self.tree = [0.0] + self.weights
+        for i in range(1, self.size + 1):
+            parent = i + (i & -i)
+            if parent <= self.size:
+                self.tree[parent] += self.tree[i]
+
+    def add(self, position, delta):
+        """Add delta to the weight at a position."""
+        self.weights[position] += delta
+        i = position + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def set(self, position, weight):
+        """Set the weight at a position."""
+        self.add(position, weight - self.weights[position])
+
+    def copy(self):
+        """Return an independent copy of the tree without rebuilding it."""
+        duplicate = FenwickTree.__new__(FenwickTree)
+        duplicate.weights = self.weights.copy()
+        duplicate.size = self.size
+        duplicate.tree = self.tree.copy()
+        return duplicate
+
+    def prefix_sum(self, stop):
+        """Return the total weight of positions [0, stop)."""
+        total = 0.0
+        while stop > 0:
+            total += self.tree[stop]
+            stop -= stop & -stop
+        return total
+
+    def find(self, value):
+        """Return the first position whose cumulative weight exceeds value."""
+        position = 0
+        step = 1 << self.size.bit_length()
+        while step:
+            next_position = position + step
+            if next_position <= self.size and self.tree[next_position] <= value:
+                position = next_position
+                value -= self.tree[next_position]
+            step >>= 1
+        return min(position, self.size - 1)
+
+    def sample(self, start, stop, rng=random):
+        """
+        Draw a position in [start, stop) with probability proportional to its weight.
+
+        Returns:
+            int: The drawn position, or None if the range has no weight
+        """
+        low = self.prefix_sum(start)
+        total = self.prefix_sum(stop) - low
+        if total <= 0:
+            return None
+        position = self.find(low + rng.random() * total)
+        # Guard against rounding at the edges of the range
+        return min(max(position, start), stop - 1)
+
+def answer_weight(times_asked, times_correct):
+    """
+    Weight of a question from its answer history.
+
+    Uses p * (1 - p) of the smoothed correct rate p, scaled so an unasked
+    question weighs 1: questions almost everyone gets right (or wrong) are
+    drawn less often.
+
+    Returns:
+        float: Weight between MIN_WEIGHT and 1
+    """
+    p = (times_correct + 1) / (times_asked + 2)
+    return max(4 * p * (1 - p), MIN_WEIGHT)
+
+class QuestionIndex:
+    """Bitmasks and difficulty order of a question bank, for seen-question queries."""
+
+    def __init__(self, question_bank):
+        """
+        Index the questions of a bank that have an integer ID.
+
+        Args:
+            question_bank (list): List of question dictionaries
+        """
+        self.questions = {}
+        self.masks = {}
+        self.all_mask = 0
+        by_difficulty = []
+        for question in question_bank:
+            question_id = question.get('id')
+            if not isinstance(question_id, int) or question_id < 0:
+                continue
+            self.questions[question_id] = question
+            bit = 1 << question_id
+            self.all_mask |= bit
+            label = question['difficulty']
+            self.masks[label] = self.masks.get(label, 0) | bit
+            by_difficulty.append((question_difficulty(question), question_id))
+
+        # Question IDs sorted by numeric difficulty, with the difficulties alongside for bisect
+        by_difficulty.sort()
+        self.sorted_difficulties = [difficulty for difficulty, _ in by_difficulty]
+        self.sorted_ids = [question_id for _, question_id in by_difficulty]
+        self.positions = {question_id: position for position, question_id in enumerate(self.sorted_ids)}
+
+        # Draw weights in difficulty order, shared by every game using the bank
+        self.weights = FenwickTree([1.0] * len(self.sorted_ids))
+        self.answer_counts = {}  # question ID -> [times asked, times correct]
+        self._lock = threading.Lock()
+
+    def set_weight(self, question_id, weight):
+        """Set the draw weight of a question (O(log n)); 0 only draws it when nothing else is left."""
+        if weight < 0:
+            raise ValueError("Question weights must not be negative")
+        with self._lock:
+            self.weights.set(self.positions[question_id], weight)
+
+    def record_answer(self, question_id, correct):
+        """
+        Update a question's answer history and its draw weight (see answer_weight).
+
+        Args:
+            question_id (int): ID of the answered question
+            correct (bool): Whether the answer was correct
+        """
+        if question_id not in self.positions:
+            return
+        with self._lock:
+            counts = self.answer_counts.setdefault(question_id, [0, 0])
+            counts[0] += 1
+            counts[1] += bool(correct)
+            self.weights.set(self.positions[question_id], answer_weight(*counts))
+
+    def unseen_mask(self, difficulty, seen):
+        """
+        Return the bitmask of questions at a difficulty that haven't been seen.
+
+        Args:
+            difficulty (str): Difficulty label, or None for any difficulty
+            seen (QuestionBitset): Questions already seen
+
+        Returns:
+            int: Bitmask of unseen question IDs
+        """
+        mask = self.all_mask if difficulty is None else self.masks.get(difficulty, 0)
+        return mask & ~seen.bits
+
+    def count_unseen(self, difficulty, seen):
+        """Return the number of unseen questions at a difficulty (None for any)."""
+        return self.unseen_mask(difficulty, seen).bit_count()
+
+    def unseen(self, difficulty, seen):
+        """Return the unseen questions at a difficulty (None for any)."""
+        return [self.questions[question_id] for question_id in iter_bits(self.unseen_mask(difficulty, seen))]
+
+    def random_unseen(self, difficulty, seen, rng=random):
+        """
+        Pick a random unseen question at a difficulty without listing the candidates.
+
+        Returns:
+            dict: The question, or None if every question at the difficulty was seen
+        """
+        mask = self.unseen_mask(difficulty, seen)
+        count = mask.bit_count()
+        if count == 0:
+            return None
+        return self.questions[nth_bit(mask, rng.randrange(count))]
+
+    def select(self, desired_difficulty, seen, rng=random):
+        """
+        Select a question the same way select_question does, using the bitmasks.
+
+        Prefers unseen questions at the desired difficulty, then any unseen
+        question. Once the player has seen the whole bank the seen set is
+        reset. The selected question is added to seen.
+
+        Args:
+            desired_difficulty (str): Desired difficulty label
+            seen (QuestionBitset): Questions already seen (updated in place)
+            rng: Random number generator
+
+        Returns:
+            dict: Selected question, or None if the index is empty
+            bool: Whether the selection constraints were relaxed
+        """
+        question = self.random_unseen(desired_difficulty, seen, rng)
+        relaxed = question is None
+        if question is None:
+            question = self.random_unseen(None, seen, rng)
+        if question is None and self.all_mask:
+            # Every question has been seen: start over
+            seen.clear()
+            question = (self.random_unseen(desired_difficulty, seen, rng)
+                        or self.random_unseen(None, seen, rng))
+        if question is not None:
+            seen.add(question['id'])
+        return question, relaxed
+
+    def select_nearest(self, target, seen, rng=random, tolerance=0.05):
+        """
+        Select an unseen question close to a numeric difficulty.
+
+        Finds the unseen question nearest to the target by bisecting the
+        sorted difficulties and asking the player's unseen tree for the
+        closest unseen position on either side, then draws one of the
+        unseen questions within tolerance of that question's difficulty, in
+        proportion to their weights. The window is centered on the nearest
+        difficulty rather than on the target, so it never reaches past the
+        nearest difficulty into the next one: with labelled banks (spaced
+        0.3 apart) the label the target falls in is always the one served.
+        The window is sampled through the weight tree, so a pick takes
+        O(log n) tree steps while the questions around the target are mostly
+        unseen (at most _SCAN_LIMIT more once they are mostly seen). On top
+        of that come a few whole-integer operations on the seen bitmask
+        (comparing and setting a bit), which run in C over n / 64 words,
+        and building the unseen tree, O(n), the first time a seen set is
+        used. Once the player has seen the whole bank the seen set is reset. The
+        selected question is added to seen.
+
+        Args:
+            target (float): Predicted difficulty (0.1-0.9)
+            seen (QuestionBitset): Questions already seen (updated in place)
+            rng: Random number generator
+            tolerance (float): How far from the nearest unseen difficulty a
+                candidate may be
+
+        Returns:
+            dict: Selected question, or None if the index is empty
+            bool: Whether the nearest unseen question was further than tolerance
+        """
+        if not self.sorted_ids:
+            return None, True
+
+        unseen = self._unseen_tree(seen)
+        position = self._nearest_unseen(target, unseen)
+        if position is None:
+            # Every question has been seen: start over
+            seen.clear()
+            unseen = self._unseen_tree(seen)
+            position = self._nearest_unseen(target, unseen)
+
+        nearest = self.sorted_difficulties[position]
+        question = self._random_unseen_between(nearest - tolerance, nearest + tolerance, unseen, rng)
+        if question is None:
+            # Too few unseen questions left in the window to find one quickly
+            question = self.questions[self.sorted_ids[position]]
+        seen.add(question['id'])
+        unseen.set(self.positions[question['id']], 0.0)
+        seen.ranks[1] = seen.bits
+        return question, abs(nearest - target) > tolerance
+
+    def _unseen_tree(self, seen):
+        """
+        Return the Fenwick tree of a seen set's unseen questions in difficulty order.
+
+        Each position holds 1 while its question is unseen, so prefix sums
+        count unseen questions and find() locates the k-th one. The tree is
+        built in O(n) the first time the set is used with this index and
+        kept on the set. Bits the set gained or lost elsewhere since then
+        (add, clear, ...) are applied to it here, one O(log n) update each,
+        or by rebuilding when many changed.
+
+        Args:
+            seen (QuestionBitset): Questions already seen
+
+        Returns:
+            FenwickTree: Unseen count (0 or 1) of each position
+        """
+        if seen.ranks is not None and seen.ranks[0] is self:
+            _, bits, tree = seen.ranks
+            changed = bits ^ seen.bits
+            if not changed:
+                return tree
+            if changed.bit_count() <= _SCAN_LIMIT:
+                while changed:
+                    low = changed & -changed
+                    question_id = low.bit_length() - 1
+                    changed ^= low
+                    if question_id in self.positions:
+                        tree.set(self.positions[question_id], 0.0 if seen.bits & low else 1.0)
+                seen.ranks[1] = seen.bits
+                return tree
+
+        raw = seen.bits.to_bytes((seen.bits.bit_length() + 7) // 8, 'little')
+        tree = FenwickTree([0.0 if (question_id >> 3) < len(raw) and raw[question_id >> 3] >> (question_id & 7) & 1
+                            else 1.0 for question_id in self.sorted_ids])
+        seen.ranks = [self, seen.bits, tree]
+        return tree
+
+    def _nearest_unseen(self, target, unseen):
+        """
+        Return the position of the unseen question closest to target, or None if all were seen.
+
+        Args:
+            target (float): Predicted difficulty
+            unseen (FenwickTree): The player's unseen tree (see _unseen_tree)
+        """
+        difficulties = self.sorted_difficulties
+        split = bisect_left(difficulties, target)
+        before = int(unseen.prefix_sum(split))
+        total = int(unseen.prefix_sum(unseen.size))
+        # Last unseen position before the split and first one from it
+        left = unseen.find(before - 1) if before > 0 else None
+        right = unseen.find(before) if before < total else None
+        if left is None or right is None:
+            return right if left is None else left
+        # Prefer whichever side is closer to the target, the lower one on ties
+        return left if target - difficulties[left] <= difficulties[right] - target else right
+
+    def _random_unseen_between(self, low, high, unseen, rng):
+        """
+        Draw a weighted unseen question with a difficulty in [low, high].
+
+        Tries a few weighted draws first. If they all hit seen questions,
+        which happens once a player has seen most of the window, it scans
+        at most _SCAN_LIMIT positions of the window from a random offset,
+        outside the lock, and draws among the unseen questions found there.
+
+        Args:
+            low (float): Lowest difficulty of the window
+            high (float): Highest difficulty of the window
+            unseen (FenwickTree): The player's unseen tree (see _unseen_tree)
+            rng: Random number generator
+
+        Returns:
+            dict: The question, or None if no unseen question was found
+        """
+        start = bisect_left(self.sorted_difficulties, low)
+        stop = bisect_right(self.sorted_difficulties, high)
+        if start >= stop:
+            return None
+        with self._lock:
+            for _ in range(_SAMPLE_ATTEMPTS):
+                position = self.weights.sample(start, stop, rng)
+                if position is None:
+                    break
+                if unseen.weights[position]:
+                    return self.questions[self.sorted_ids[position]]
+
+        # Mostly seen (or weightless) window: look at a bounded stretch of it
+        span = stop - start
+        offset = rng.randrange(span)
+        unseen = [start + (offset + step) % span for step in range(min(span, _SCAN_LIMIT))
+                  if unseen.weights[start + (offset + step) % span]]
+        if not unseen:
+            return None
+        with self._lock:
+            weights = [self.weights.weights[position] for position in unseen]
+        if sum(weights) > 0:
+            position = rng.choices(unseen, weights=weights)[0]
+        else:
+            position = rng.choice(unseen)
+        return self.questions[self.sorted_ids[position]]
+
+def question_difficulty(question):
+    """Return the numeric difficulty of a question (calibrated, numeric or from its label)."""
+    if 'calibrated_difficulty' in question:
+        return float(question['calibrated_difficulty'])
+    difficulty = question['difficulty']
+    if isinstance(difficulty, str):
+        return LABEL_DIFFICULTIES.get(difficulty, 0.45)
+    return float(difficulty)
+
+# Indexes already built in this process, keyed by the id of their question bank
+_index_cache = {}
+
+def get_question_index(question_bank):
+    """
+    Return the index of a question bank, building it only once per process.
+
+    Banks are expected to be the shared lists returned by get_question_bank.
+
+    Args:
+        question_bank (list): List of question dictionaries
+
+    Returns:
+        QuestionIndex: The index of the bank
+    """
+    cached = _index_cache.get(id(question_bank))
+    if cached is None or cached[0] is not question_bank:
+        cached = (question_bank, QuestionIndex(question_bank))
+        _index_cache[id(question_bank)] = cached
+    return cached[1]
\ No newline at end of file
@@ -0,0 +1,103 @@
+import hashlib
+import os
+
+from flask import current_app, make_response, render_template, session, url_for
+
+# Templates compiled at startup by precompile_templates()
+PAGE_TEMPLATES = ['index.html', 'game.html', 'results.html', 'leaderboard.html']
+
+# Cache lifetime for fingerprinted static assets (one year)
+STATIC_MAX_AGE = 365 * 24 * 60 * 60
+
+# Content hashes of static files, keyed by filename relative to the static folder
+_static_versions = {}
+
+# Rendered static pages, keyed by template name: (body, etag)
+_page_cache = {}
+
+def init_rendering(app):
+    """
+    Configure the Flask app for cached rendering.
+
+    Registers the static_url template helper and gives static files
+    long-lived cache headers. Static URLs carry a content hash, so browsers
+    fetch a new copy whenever a file changes.
+
+    Args:
+        app (Flask): The Flask application
+    """
+    app.config['SEND_FILE_MAX_AGE_DEFAULT'] = STATIC_MAX_AGE
+    app.add_template_global(static_url)
+
+def precompile_templates(app, template_names=None):
+    """
+    Compile the page templates once so the first requests don't pay for it.
+
+    Also turns off template auto-reload, so Jinja stops checking the
+    template files for changes on every render.
+
+    Args:
+        app (Flask): The Flask application
+        template_names (list): Templates to compile (defaults to PAGE_TEMPLATES)
+
+    Returns:
+        list: Names of the compiled templates
+    """
+    template_names = template_names or PAGE_TEMPLATES
+    app.config['TEMPLATES_AUTO_RELOAD'] = False
+    app.jinja_env.auto_reload = False
+    for name in template_names:
+        app.jinja_env.get_template(name)
+    return template_names
+
+def static_version(filename):
+    """Return a short content hash of a static file (computed once per process)."""
+    if filename not in _static_versions:
+        path = os.path.join(current_app.static_folder, filename)
+        try:
+            with open(path, 'rb') as f:
+                _static_versions[filename] = hashlib.sha1(f.read()).hexdigest()[:12]
+        except OSError:
+            _static_versions[filename] = None
+    return _static_versions[filename]
+
+def static_url(filename):
+    """Build a fingerprinted URL for a static file, safe to cache for a long time."""
+    version = static_version(filename)
+    if version is None:
+        return url_for('static', filename=filename)
+    return url_for('static', filename=filename, v=version)
+
+def render_static_page(template_name, request):
+    """
+    Serve a page that has no per-request content, with ETag / 304 support.
+
+    The page is rendered once and then served from memory. Pages with pending
+    flash messages are rendered normally, since those differ per visitor.
+
+    Args:
+        template_name (str): Template to render
+        request (Request): The current Flask request
+
+    Returns:
+        Response: The page, or an empty 304 response if the client copy is current
+    """
+    if session.get('_flashes'):
+        return make_response(render_template(template_name))
+
+    if template_name not in _page_cache:
+        body = render_template(template_name)
+        etag = hashlib.sha1(body.encode('utf-8')).hexdigest()
+        _page_cache[template_name] = (body, etag)
+    body, etag = _page_cache[template_name]
+
+    response = make_response(body)
+    response.set_etag(etag)
+    # Let browsers keep the page, but revalidate it on every visit
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+def clear_render_cache():
+    """Forget cached pages and static file hashes (e.g. after editing templates)."""
+    _page_cache.clear()
+    _static_versions.clear()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# Adaptive Trivia Quiz Game - Replay of Archived Performance Logs
+"""
+Replay archived performance logs through a candidate DifficultyPredictor.
+
+Each CSV under data/ is streamed row by row into a fresh DataHandler, and
+after every round the candidate predicts the next difficulty from
+get_average_metrics(), exactly as the game does. The predictions are then
+compared with the difficulty the game actually moved to (the next row's
+difficulty), or with a baseline predictor replayed on the same rounds.
+
+The recorded answers are kept as they were: the replay shows how the
+difficulty trajectory would have differed, not how the player would have
+answered different questions. Files are replayed in parallel.
+
+Usage:
+    python replay.py --model-path models/candidate.npz --data-dir data
+    python replay.py --model-path new.npz --baseline-path old.npz --json
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from data_handler import DataHandler
+from game_logic import convert_difficulty_value_to_label
+from ai_module import get_predictor
+
+def read_rounds(filepath):
+    """
+    Stream the rounds of a performance log, grouped by player.
+
+    Handles single-player logs (named <player>_performance_<timestamp>.csv)
+    and combined logs with a player column.
+
+    Yields:
+        tuple: (player_name, list of round dictionaries), one per player
+    """
+    default_player = os.path.basename(filepath).split('_performance_')[0]
+    current_player, rounds = None, []
+    with open(filepath, newline='') as f:
+        for row in csv.DictReader(f):
+            player_name = row.get('player') or default_player
+            if player_name != current_player and rounds:
+                yield current_player, rounds
+                rounds = []
+            current_player = player_name
+            rounds.append({
+                'round': int(float(row['round'])),
+                'difficulty': float(row['difficulty']),
+                'accuracy': float(row['accuracy']),
+                'reaction_time': float(row['reaction_time']),
+                'attempts': float(row['attempts'])
+            })
+    if rounds:
+        yield current_player, rounds
+
+def replay_trajectory(player_name, rounds, predictor, n_rounds=None):
+    """
+    Replay recorded rounds and return the difficulty predicted after each one.
+
+    Args:
+        player_name (str): Name of the player
+        rounds (list): Round dictionaries in play order
+        predictor: DifficultyPredictor (or compatible) to replay
+        n_rounds (int): Window used for get_average_metrics (None uses the
+            predictor's window, as the live game does)
+
+    Returns:
+        list: Predicted difficulty after each round
+    """
+    data_handler = DataHandler(player_name, window=n_rounds or predictor.window)
+    trajectory = []
+    for row in rounds:
+        data_handler.log_performance(row['round'], row['difficulty'], row['accuracy'],
+                                     row['reaction_time'], row['attempts'])
+        avg_accuracy, avg_reaction_time, avg_attempts = data_handler.get_average_metrics()
+        trajectory.append(predictor.predict_difficulty(avg_accuracy, avg_reaction_time, avg_attempts))
+    return trajectory
+
+def compare_trajectories(reference, candidate):
+    """
+    Compare two difficulty trajectories round by round.
+
+    Returns:
+        dict: Number of compared rounds, summed and maximum absolute
+            difference, number of rounds where the difficulty label differs
+            and the summed difficulties of both trajectories
+    """
+    pairs = list(zip(reference, candidate))
+    differences = [abs(a - b) for a, b in pairs]
+    return {
+        'rounds': len(pairs),
+        'abs_diff_sum': sum(differences),
+        'max_abs_diff': max(differences, default=0.0),
+        'label_changes': sum(convert_difficulty_value_to_label(a) != convert_difficulty_value_to_label(b)
+                             for a, b in pairs),
+        'reference_sum': sum(reference[:len(pairs)]),
+        'candidate_sum': sum(candidate[:len(pairs)])
+    }
+
+# Predictors loaded once per worker process by _init_worker
+_worker_predictors = {}
+
+def _init_worker(model_path, baseline_path):
+    """Load the candidate (and baseline) predictors once in each worker process."""
+    _worker_predictors['candidate'] = get_predictor(model_path)
+    _worker_predictors['baseline'] = get_predictor(baseline_path) if baseline_path else None
+
+def replay_file(filepath, candidate=None, baseline=None, n_rounds=None):
+    """
+    Replay one performance log.
+
+    Args:
+        filepath (str): CSV file to replay
+        candidate: Predictor being evaluated (defaults to the worker's)
+        baseline: Predictor to compare against; None compares against the
+            difficulties recorded in the log
+        n_rounds (int): Window used for get_average_metrics (None uses each
+            predictor's own window)
+
+    Returns:
+        dict: Comparison statistics of the file (see compare_trajectories)
+    """
+    if candidate is None:
+        candidate = _worker_predictors['candidate']
+        baseline = _worker_predictors.get('baseline')
+
+    totals = compare_trajectories([], [])
+    totals.update({'file': filepath, 'players': 0, 'final_diff_sum': 0.0})
+    for player_name, rounds in read_rounds(filepath):
+        predicted = replay_trajectory(player_name, rounds, candidate, n_rounds)
+        if baseline is not None:
+            reference = replay_trajectory(player_name, rounds, baseline, n_rounds)
+        else:
+            # The game moved to the difficulty recorded on the following round
+            reference = [row['difficulty'] for row in rounds[1:]]
+
+        stats = compare_trajectories(reference, predicted)
+        totals['players'] += 1
+        for key in ('rounds', 'abs_diff_sum', 'label_changes', 'reference_sum', 'candidate_sum'):
+            totals[key] += stats[key]
+        totals['max_abs_diff'] = max(totals['max_abs_diff'], stats['max_abs_diff'])
+        if reference and predicted:
+            totals['final_diff_sum'] += predicted[len(reference) - 1] - reference[-1]
+    return totals
+
+def summarize(file_stats):
+    """
+    Combine the statistics of several files into one report.
+
+    Returns:
+        dict: Totals, mean absolute difference, rate of rounds with a
+            different difficulty label, mean difficulty of both trajectories
+            and the per-file statistics
+    """
+    rounds = sum(stats['rounds'] for stats in file_stats)
+    players = sum(stats['players'] for stats in file_stats)
+    divisor = max(rounds, 1)
+    return {
+        'files': len(file_stats),
+        'players': players,
+        'rounds': rounds,
+        'mean_abs_diff': sum(stats['abs_diff_sum'] for stats in file_stats) / divisor,
+        'max_abs_diff': max((stats['max_abs_diff'] for stats in file_stats), default=0.0),
+        'label_change_rate': sum(stats['label_changes'] for stats in file_stats) / divisor,
+        'mean_reference_difficulty': sum(stats['reference_sum'] for stats in file_stats) / divisor,
+        'mean_candidate_difficulty': sum(stats['candidate_sum'] for stats in file_stats) / divisor,
+        'mean_final_shift': sum(stats['final_diff_sum'] for stats in file_stats) / max(players, 1),
+        'per_file': file_stats
+    }
+
+def replay_archive(data_dir='data', model_path=None, baseline_path=None, workers=None,
+                   pattern='*.csv', n_rounds=None):
+    """
+    Replay every performance log in data_dir over a process pool.
+
+    Args:
+        data_dir (str): Directory holding the archived CSV files
+        model_path (str): Candidate predictor model
+        baseline_path (str): Baseline predictor model (None compares with the logs)
+        workers (int): Worker processes (1 runs in-process)
+        pattern (str): Glob pattern of the files to replay
+        n_rounds (int): Window used for get_average_metrics (None uses each
+            predictor's own window)
+
+    Returns:
+        dict: Report, see summarize()
+    """
+    files = sorted(glob.glob(os.path.join(data_dir, pattern)))
+    workers = workers or min(len(files), os.cpu_count() or 1) or 1
+
+    if workers == 1:
+        candidate = get_predictor(model_path)
+        baseline = get_predictor(baseline_path) if baseline_path else None
+        return summarize([replay_file(path, candidate, baseline, n_rounds) for path in files])
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(model_path, baseline_path)) as executor:
+        file_stats = list(executor.map(replay_file, files, [None] * len(files),
+                                       [None] * len(files), [n_rounds] * len(files)))
+    return summarize(file_stats)
+
+def main(argv=None):
+    """Replay the archive from the command line and print the report."""
+    parser = argparse.ArgumentParser(description="Replay archived performance logs through a predictor")
+    parser.add_argument('--model-path', default=None, help="Candidate predictor model")
+    parser.add_argument('--baseline-path', default=None,
+                        help="Baseline predictor model (default: compare with the recorded difficulties)")
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--pattern', default='*.csv')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--window', type=int, default=None,
+                        help="Rounds averaged by get_average_metrics (default: each model's own window)")
+    parser.add_argument('--json', action='store_true', help="Print the full report as JSON")
+    args = parser.parse_args(argv)
+
+    report = replay_archive(args.data_dir, args.model_path, args.baseline_path,
+                            args.workers, args.pattern, args.window)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"Replayed {report['rounds']} rounds of {report['players']} players in {report['files']} files")
+    print(f"Mean |difference|:       {report['mean_abs_diff']:.4f} (max {report['max_abs_diff']:.4f})")
+    print(f"Label change rate:       {report['label_change_rate']:.1%}")
+    print(f"Mean difficulty:         {report['mean_reference_difficulty']:.3f} -> "
+          f"{report['mean_candidate_difficulty']:.3f}")
+    print(f"Mean final shift:        {report['mean_final_shift']:+.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+# Adaptive Trivia Quiz Game - Multiplayer Room Load Generator
+"""
+Play a multiplayer room with many simulated players over real HTTP.
+
+Every simulated player joins the room, keeps a Server-Sent Events stream
+open and answers each question with a random option after a random
+delay, on its own thread. The host starts the next round as soon as
+every player has seen the results of the previous one.
+
+Each player rebuilds the scores from its snapshot and the leaderboard
+diffs it receives; at the end they are compared with the server's
+standings.
+Without --url the app is started on a local port through serve.py, with
+the backend, threads and room stream budget given, so the load reaches
+the same thread pool as in production. Players whose event stream is
+refused (past the budget) are reported as errors.
+
+Reported figures:
+
+- fan-out latency: from publishing a question to a player receiving it
+- answer latency: time of the POST that submits an answer
+- bytes per player and round received on the event stream (after the
+  initial snapshot)
+
+Usage:
+    python room_load.py --players 200 --rounds 5 --server waitress --room-streams 200
+    python room_load.py --players 500 --url http://localhost:5000
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+class SimulatedRoomPlayer:
+    """
+    One player of the load test, answering over HTTP from its own thread.
+    """
+
+    def __init__(self, base_url, room_id, name, max_delay=0.5, seed=None):
+        """
+        Initialize the player (join() adds it to the room).
+
+        Args:
+            base_url (str): URL of the server
+            room_id (str): Room to play in
+            name (str): Player name
+            max_delay (float): Most seconds the player waits before answering
+            seed (int): Seed of the player's answers and delays
+        """
+        self.url = urlsplit(base_url)
+        self.room_id = room_id
+        self.name = name
+        self.max_delay = max_delay
+        self.rng = random.Random(seed)
+        self.player_id = None
+        self.scores = {}  # Leaderboard score by name
+        self.questions = 0
+        self.results = 0
+        self.accepted = 0
+        self.bytes_received = 0
+        self.fanout_latencies = []
+        self.answer_latencies = []
+        self.errors = []
+        self.refused = False  # Event stream turned away past the server's budget
+        self.subscribed = threading.Event()
+        self.last_round = 0
+        self.round_done = threading.Condition()
+        self._thread = None
+
+    def join(self):
+        """Join the room and open the event stream on a new thread."""
+        self.player_id = _post(self.url, f'/api/rooms/{self.room_id}/join', {'player_name': self.name})['player_id']
+        self._thread = threading.Thread(target=self._listen, name=f'player-{self.name}', daemon=True)
+        self._thread.start()
+
+    def join_thread(self, timeout=None):
+        """Wait for the event stream to end."""
+        self._thread.join(timeout)
+
+    def _listen(self):
+        """Read events until the room is finished."""
+        connection = _connect(self.url)
+        try:
+            connection.request('GET', f'/api/rooms/{self.room_id}/events',
+                               headers={'Accept': 'text/event-stream'})
+            response = connection.getresponse()
+            if response.status != 200:
+                self.refused = True
+                raise RuntimeError(f"event stream refused with {response.status}")
+            answers = _connect(self.url)
+            for event, data, size in _read_events(response):
+                if event == 'snapshot':
+                    self.scores = {entry['name']: entry['score'] for entry in data['leaderboard']}
+                    self.subscribed.set()
+                    continue
+                self.bytes_received += size
+                if event == 'question':
+                    self.questions += 1
+                    self.fanout_latencies.append(time.time() - data['sent_at'])
+                    self._answer(answers, data['question'])
+                elif event == 'results':
+                    self.results += 1
+                    for entry in data['leaderboard']['changes']:
+                        self.scores[entry['name']] = entry['score']
+                    with self.round_done:
+                        self.last_round = data['round_number']
+                        self.round_done.notify_all()
+                    if data['game_over']:
+                        break
+            answers.close()
+        except Exception as e:
+            self.errors.append(repr(e))
+            self.subscribed.set()
+        finally:
+            connection.close()
+
+    def _answer(self, connection, question):
+        """Answer a question with a random option after a random delay."""
+        time.sleep(self.rng.uniform(0, self.max_delay))
+        payload = {
+            'player_id': self.player_id,
+            'question_id': question['id'],
+            'answer': str(self.rng.randint(1, len(question['options'])))
+        }
+        started = time.perf_counter()
+        try:
+            result = _post(self.url, f'/api/rooms/{self.room_id}/answer', payload, connection)
+            self.accepted += bool(result.get('accepted'))
+        except Exception as e:
+            # The round may have closed on time before a late answer arrived
+            self.errors.append(repr(e))
+        self.answer_latencies.append(time.perf_counter() - started)
+
+def _connect(url, timeout=60):
+    """Open an HTTP connection to the server."""
+    return http.client.HTTPConnection(url.hostname, url.port or 80, timeout=timeout)
+
+def _post(url, path, payload, connection=None):
+    """POST JSON and return the decoded answer, raising on HTTP errors."""
+    own_connection = connection is None
+    connection = connection or _connect(url)
+    try:
+        connection.request('POST', path, body=json.dumps(payload),
+                           headers={'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        body = json.loads(response.read() or b'{}')
+        if response.status != 200:
+            raise RuntimeError(f"{path} returned {response.status}: {body.get('error')}")
+        return body
+    finally:
+        if own_connection:
+            connection.close()
+
+def _read_events(response):
+    """Yield (event, data, bytes) for every Server-Sent Event of a response."""
+    event, data, size = None, [], 0
+    while True:
+        line = response.readline()
+        if not line:
+            return
+        size += len(line)
+        line = line.decode('utf-8').rstrip('\r\n')
+        if not line:
+            if event is not None:
+                yield event, json.loads('\n'.join(data)), size
+            event, data, size = None, [], 0
+        elif line.startswith('event:'):
+            event = line[6:].strip()
+        elif line.startswith('data:'):
+            data.append(line[5:].strip())
+
+def _percentiles(values):
+    """Return the 50th and 99th percentiles of latencies in milliseconds."""
+    if not values:
+        return {'p50_ms': 0.0, 'p99_ms': 0.0}
+    p50, p99 = np.percentile(np.asarray(values) * 1000, [50, 99])
+    return {'p50_ms': float(p50), 'p99_ms': float(p99)}
+
+def serve_locally():
+    """
+    Serve the app on a free local port from a background thread.
+
+    Returns:
+        tuple: (base URL, server); call server.shutdown() when done
+    """
+    import logging
+    from werkzeug.serving import make_server
+    from app import app
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)  # No access log line per request
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='room-server', daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server
+
+def serve_subprocess(server='auto', threads=None, room_streams=None, timeout=60):
+    """
+    Start serve.py on a free local port in a child process.
+
+    Args:
+        server (str): Backend passed to serve.py --server
+        threads (int): Request threads (None keeps serve.py's default)
+        room_streams (int): Room event stream budget (None keeps serve.py's default)
+        timeout (float): Seconds to wait for the server to accept connections
+
+    Returns:
+        tuple: (base URL, process); terminate the process when done
+    """
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    command = [sys.executable, 'serve.py', '--server', server, '--host', '127.0.0.1', '--port', str(port)]
+    if threads is not None:
+        command += ['--threads', str(threads)]
+    if room_streams is not None:
+        command += ['--room-streams', str(room_streams)]
+    process = subprocess.Popen(command, cwd=os.path.dirname(os.path.abspath(__file__)),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"serve.py exited with {process.returncode}")
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return f"http://127.0.0.1:{port}", process
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("serve.py did not start in time")
+
+def run_load(n_players=100, rounds=5, url=None, answer_seconds=10, max_delay=0.5, seed=0,
+             server=None, threads=None, room_streams=None):
+    """
+    Play one room with simulated players and measure the broadcast.
+
+    Args:
+        n_players (int): Number of simulated players
+        rounds (int): Questions in the room
+        url (str): Server to test (None starts one locally)
+        answer_seconds (float): Seconds players get to answer
+        max_delay (float): Most seconds a player waits before answering
+        seed (int): Seed of the players' answers and delays
+        server (str): serve.py backend to start without url (None serves
+            the app with Werkzeug in this process)
+        threads (int): Request threads of the started server
+        room_streams (int): Room event stream budget of the started server
+
+    Returns:
+        dict: Counts of events and answers, latency percentiles, bytes per
+            player and round, and whether every player's leaderboard
+            matches the server's
+    """
+    local_server = process = None
+    if url is None and server is not None:
+        url, process = serve_subprocess(server, threads, room_streams)
+    elif url is None:
+        url, local_server = serve_locally()
+    try:
+        base = urlsplit(url)
+        room = _post(base, '/api/rooms', {'rounds': rounds, 'answer_seconds': answer_seconds})
+        players = [SimulatedRoomPlayer(url, room['room_id'], f"player{i}", max_delay, seed + i)
+                   for i in range(n_players)]
+        for player in players:
+            player.join()
+        for player in players:
+            player.subscribed.wait(30)
+
+        started = time.perf_counter()
+        for round_number in range(1, rounds + 1):
+            _post(base, f"/api/rooms/{room['room_id']}/next", {'host_token': room['host_token']})
+            for player in players:
+                with player.round_done:
+                    player.round_done.wait_for(lambda: player.last_round >= round_number or player.errors,
+                                               answer_seconds + 30)
+        elapsed = time.perf_counter() - started
+        for player in players:
+            player.join_thread(10)
+
+        connection = _connect(base)
+        connection.request('GET', f"/api/rooms/{room['room_id']}")
+        final = json.loads(connection.getresponse().read())
+        connection.close()
+    finally:
+        if local_server is not None:
+            local_server.shutdown()
+        if process is not None:
+            process.terminate()
+            process.wait(10)
+
+    # Players who never scored appear in no diff; they are at 0
+    standings = {entry['name']: entry['score'] for entry in final['leaderboard'] if entry['score']}
+    return {
+        'players': n_players,
+        'rounds': rounds,
+        'seconds': elapsed,
+        'questions_received': sum(player.questions for player in players),
+        'results_received': sum(player.results for player in players),
+        'answers_accepted': sum(player.accepted for player in players),
+        'errors': [error for player in players for error in player.errors],
+        'streams_refused': sum(player.refused for player in players),
+        'fanout': _percentiles([latency for player in players for latency in player.fanout_latencies]),
+        'answer': _percentiles([latency for player in players for latency in player.answer_latencies]),
+        'bytes_per_player_round': sum(player.bytes_received for player in players) / max(n_players * rounds, 1),
+        'leaderboards_consistent': all({name: score for name, score in player.scores.items() if score} == standings
+                                       for player in players if not player.refused)
+    }
+
+def main(argv=None):
+    """Run a load test from the command line and print the report."""
+    parser = argparse.ArgumentParser(description="Load-test a multiplayer room")
+    parser.add_argument('--players', type=int, default=100)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--url', default=None, help="Server to test (default: start serve.py locally)")
+    parser.add_argument('--server', default='auto', help="serve.py backend to start without --url")
+    parser.add_argument('--threads', type=int, default=None, help="Request threads of the started server")
+    parser.add_argument('--room-streams', type=int, default=None,
+                        help="Room event stream budget of the started server")
+    parser.add_argument('--answer-seconds', type=float, default=10)
+    parser.add_argument('--max-delay', type=float, default=0.5, help="Most seconds before a player answers")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    report = run_load(args.players, args.rounds, args.url, args.answer_seconds, args.max_delay, args.seed,
+                      args.server, args.threads, args.room_streams)
+    print(f"{report['players']} players, {report['rounds']} rounds in {report['seconds']:.2f}s")
+    print(f"Questions received: {report['questions_received']}, results received: "
+          f"{report['results_received']}, answers accepted: {report['answers_accepted']}")
+    print(f"Fan-out latency: p50 {report['fanout']['p50_ms']:.1f} ms, p99 {report['fanout']['p99_ms']:.1f} ms")
+    print(f"Answer latency:  p50 {report['answer']['p50_ms']:.1f} ms, p99 {report['answer']['p99_ms']:.1f} ms")
+    print(f"Event stream: {report['bytes_per_player_round']:.0f} bytes per player and round")
+    print(f"Leaderboards consistent: {report['leaderboards_consistent']}, errors: {len(report['errors'])}, "
+          f"streams refused: {report['streams_refused']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+# Adaptive Trivia Quiz Game - Live Multiplayer Rooms
+"""
+Rooms where many players answer the same question at the same time.
+
+A Room holds one TriviaGame that picks the questions and one difficulty
+policy that adapts the room's difficulty to how the whole room did. A
+round goes like this:
+
+- start_round() picks the question and publishes a 'question' event.
+- submit() parses each player's first answer and stores it; it does no scoring.
+- close_round() runs when every player has answered or the answer time
+  is up. It scores all the answers in one evaluate_answers batch (see
+  engine.py), adds the points and publishes a 'results' event.
+
+Events go to an EventLog instead of to each player. The log formats an
+event as a Server-Sent Events message once, appends it, and wakes every
+subscriber waiting on its condition variable. Each subscriber then copies
+the new messages to its own connection. Publishing a round therefore costs
+one encoding plus O(players) wake-ups and writes, and nobody polls.
+
+The 'results' event carries a leaderboard diff: only the players whose
+score changed since the previous round (players who haven't scored yet
+are at 0 and only appear once they do). Ranks are
+not sent, because one score change can shift the rank of every player
+behind it; clients rank the scores themselves, highest first, with tied
+scores sharing a rank. A client builds the full standings from the
+snapshot it gets when it subscribes, then applies the diffs.
+"""
+import itertools
+import json
+import secrets
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from engine import evaluate_answers, parse_answer
+from game_logic import TriviaGame, public_question
+from utils import create_difficulty_label
+
+def format_event(event, data, event_id):
+    """Encode an event as a Server-Sent Events message."""
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n".encode('utf-8')
+
+class EventLog:
+    """
+    Bounded log of encoded events that many subscribers read from.
+    """
+
+    def __init__(self, maxlen=256):
+        """
+        Initialize an empty log.
+
+        Args:
+            maxlen (int): Events kept for subscribers that fall behind
+        """
+        self.maxlen = maxlen
+        self.last_id = 0
+        self.closed = False
+        self._events = deque(maxlen=maxlen)  # (id, message), oldest first
+        self._condition = threading.Condition()
+
+    def publish(self, event, data):
+        """
+        Encode an event once and wake every waiting subscriber.
+
+        Returns:
+            int: ID of the event
+        """
+        with self._condition:
+            self.last_id += 1
+            self._events.append((self.last_id, format_event(event, data, self.last_id)))
+            self._condition.notify_all()
+            return self.last_id
+
+    def read(self, after, timeout=None):
+        """
+        Return the messages published after an event ID, waiting for one if there are none.
+
+        Args:
+            after (int): ID of the last event the subscriber has seen
+            timeout (float): Seconds to wait (None waits until an event or close())
+
+        Returns:
+            list: (id, message) pairs, empty on timeout or when closed, or
+                None if some of the events were already dropped from the log
+        """
+        with self._condition:
+            if after < self.last_id - len(self._events):
+                return None
+            if after >= self.last_id and not self.closed:
+                self._condition.wait_for(lambda: self.last_id > after or self.closed, timeout)
+            # IDs are consecutive, so the new events are the last (last_id - after) entries
+            start = len(self._events) - (self.last_id - after)
+            return list(itertools.islice(self._events, max(start, 0), None))
+
+    def close(self):
+        """Wake every subscriber for good; read() stops waiting."""
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+class Room:
+    """
+    One question at a time for every player of the room.
+    """
+
+    def __init__(self, room_id, predictor=None, rounds=10, answer_seconds=15.0, initial_difficulty=0.5,
+                 history=256):
+        """
+        Initialize a room waiting for players.
+
+        Args:
+            room_id (str): ID of the room
+            predictor (DifficultyPolicy): Policy adapting the room's difficulty
+                (None keeps the initial difficulty)
+            rounds (int): Number of questions
+            answer_seconds (float): Seconds players get to answer (None waits for everyone)
+            initial_difficulty (float): Difficulty of the first question
+            history (int): Events kept for subscribers that fall behind
+        """
+        self.room_id = room_id
+        self.host_token = secrets.token_urlsafe(12)  # Needed to start rounds
+        self.rounds = rounds
+        self.answer_seconds = answer_seconds
+        self.game = TriviaGame(f"room-{room_id}", initial_difficulty)
+        self.policy = predictor.for_player(initial_difficulty) if predictor is not None else None
+        self.events = EventLog(history)
+        self.state = 'lobby'  # 'lobby', 'question', 'results' or 'finished'
+        self.round_number = 0
+        self.question = None
+        self.question_time = None
+
+        self.player_ids = {}  # Player index by player ID
+        self.names = []
+        self.scores = np.zeros(0, dtype=np.int64)
+        self.answers = {}  # (option index, reaction time) by player index, for the current round
+        # Score of every player as of the last broadcast
+        self._shown_scores = np.zeros(0, dtype=np.int64)
+        self._timer = None
+        self._lock = threading.RLock()
+
+    def join(self, player_name):
+        """
+        Add a player to the room.
+
+        Players joining mid-game start with 0 points; they show up in the
+        leaderboard diffs once they score.
+
+        Args:
+            player_name (str): Name shown on the leaderboard (unique in the room)
+
+        Returns:
+            str: Secret player ID to answer with
+        """
+        with self._lock:
+            if self.state == 'finished':
+                raise ValueError("The room is finished")
+            if player_name in self.names:
+                raise ValueError(f"{player_name} is already in the room")
+            player_id = secrets.token_urlsafe(12)
+            self.player_ids[player_id] = len(self.names)
+            self.names.append(player_name)
+            self.scores = np.append(self.scores, 0)
+            self._shown_scores = np.append(self._shown_scores, 0)
+            return player_id
+
+    def start_round(self):
+        """
+        Issue the next question to the whole room (closing the current round first).
+
+        Returns:
+            dict: The question, including its correct answer, or None if the
+                room has played all its rounds
+        """
+        with self._lock:
+            if self.state == 'question':
+                self.close_round()
+            if self.state == 'finished':
+                return None
+
+            self.round_number += 1
+            self.question = self.game.generate_question()
+            self.question_time = time.time()
+            self.answers = {}
+            self.state = 'question'
+            self.events.publish('question', {
+                'round_number': self.round_number,
+                'max_rounds': self.rounds,
+                'question': public_question(self.question),
+                'answer_seconds': self.answer_seconds,
+                'players': len(self.names),
+                'sent_at': self.question_time
+            })
+
+            if self.answer_seconds:
+                self._timer = threading.Timer(self.answer_seconds, self._close_on_time, (self.round_number,))
+                self._timer.daemon = True
+                self._timer.start()
+            return self.question
+
+    def submit(self, player_id, question_id, answer, answered_at=None):
+        """
+        Store a player's answer to the current question (later answers are ignored).
+
+        Answers that can't be parsed are stored as wrong answers, as
+        TriviaGame.evaluate_answer scores them, so one malformed answer can't
+        break the scoring of the round.
+
+        Args:
+            player_id (str): ID returned by join()
+            question_id (int): ID of the question answered
+            answer (str): Answer such as "2" or "b"
+            answered_at (float): Time of the answer (defaults to now)
+
+        Returns:
+            bool: True if the answer was stored, False if the player had already answered
+        """
+        answered_at = time.time() if answered_at is None else answered_at
+        with self._lock:
+            index = self.player_ids.get(player_id)
+            if index is None:
+                raise ValueError("Unknown player")
+            if self.state != 'question' or question_id != self.question['id']:
+                raise ValueError("question_id does not match the current question")
+            if index in self.answers:
+                return False
+            self.answers[index] = (parse_answer(answer), answered_at - self.question_time)
+            if len(self.answers) == len(self.names):
+                self.close_round()
+            return True
+
+    def close_round(self):
+        """
+        Score the answers of the current round in one batch and broadcast the results.
+
+        Returns:
+            dict: Data of the 'results' event, or None if no round was open
+        """
+        with self._lock:
+            if self.state != 'question':
+                return None
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+            question = self.question
+            players = np.fromiter(self.answers.keys(), dtype=np.int64, count=len(self.answers))
+            choices = np.array([choice for choice, _ in self.answers.values()], dtype=np.int64)
+            reaction_times = np.array([reaction_time for _, reaction_time in self.answers.values()])
+            correct, points = evaluate_answers(choices, np.full(len(players), question['answer']),
+                                               np.full(len(players), question['difficulty']),
+                                               reaction_times)
+            self.scores[players] += points
+            for is_correct in correct:
+                self.game.record_answer(question, bool(is_correct))
+
+            if len(players):
+                # A round nobody answered says nothing about the room's level
+                self._adapt_difficulty(question, float(correct.mean()), float(reaction_times.mean()))
+
+            self.state = 'finished' if self.round_number >= self.rounds else 'results'
+            results = {
+                'round_number': self.round_number,
+                'question_id': question['id'],
+                'answer': question['answer'] + 1,
+                'answered': len(players),
+                'correct': int(correct.sum()),
+                'next_difficulty': create_difficulty_label(self.game.get_current_difficulty()),
+                'leaderboard': self._leaderboard_diff(),
+                'game_over': self.state == 'finished'
+            }
+            self.events.publish('results', results)
+            if self.state == 'finished':
+                self.events.close()
+            return results
+
+    def snapshot(self):
+        """
+        Return the full state of the room, for clients that (re)subscribe.
+
+        Returns:
+            dict: Room state with every player's rank and score, and the ID
+                of the last event it includes (diffs after it apply on top)
+        """
+        with self._lock:
+            return {
+                'room_id': self.room_id,
+                'state': self.state,
+                'round_number': self.round_number,
+                'max_rounds': self.rounds,
+                'question': public_question(self.question) if self.state == 'question' else None,
+                'players': len(self.names),
+                'leaderboard': self.standings(),
+                'last_event_id': self.events.last_id
+            }
+
+    def standings(self, n=None):
+        """Return the current leaderboard entries, best first."""
+        with self._lock:
+            ranks = rank_scores(self.scores)
+            order = sorted(range(len(self.names)), key=lambda index: (ranks[index], index))
+            return [{'name': self.names[index], 'rank': int(ranks[index]), 'score': int(self.scores[index])}
+                    for index in order[:n]]
+
+    def _close_on_time(self, round_number):
+        """Close a round when its answer time is up (unless it was already closed)."""
+        with self._lock:
+            if self.state == 'question' and self.round_number == round_number:
+                self.close_round()
+
+    def _adapt_difficulty(self, question, accuracy, reaction_time):
+        """Move the room's difficulty according to the room's average performance."""
+        if self.policy is None:
+            return
+        difficulty = self.policy.record_answer(question['id'], question['difficulty'], accuracy >= 0.5)
+        if difficulty is None:
+            difficulty = self.policy.predict_difficulty(accuracy, reaction_time, 1)
+        self.game.adjust_difficulty(difficulty)
+
+    def _leaderboard_diff(self):
+        """Return the players whose score changed since the last broadcast, and remember the new scores."""
+        changed = np.flatnonzero(self.scores != self._shown_scores)
+        self._shown_scores = self.scores.copy()
+        return {
+            'players': len(self.names),
+            'changes': [{'name': self.names[index], 'score': int(self.scores[index])} for index in changed]
+        }
+
+def rank_scores(scores):
+    """
+    Rank scores from 1 (highest); tied scores share a rank.
+
+    Args:
+        scores (array): Scores of every player
+
+    Returns:
+        np.ndarray: Rank of each score
+    """
+    scores = np.asarray(scores)
+    return np.searchsorted(np.sort(-scores), -scores, side='left') + 1
+
+class RoomRegistry:
+    """
+    The rooms of one server process, by ID.
+    """
+
+    def __init__(self, predictor=None, max_rooms=100):
+        """
+        Initialize an empty registry.
+
+        Args:
+            predictor (DifficultyPolicy): Policy given to every new room
+            max_rooms (int): Most rooms kept; the oldest finished rooms are dropped first
+        """
+        self.predictor = predictor
+        self.max_rooms = max_rooms
+        self.rooms = {}
+        self._lock = threading.Lock()
+
+    def create(self, **options):
+        """Create a room with a new ID (options are passed to Room)."""
+        with self._lock:
+            if len(self.rooms) >= self.max_rooms:
+                finished = [room_id for room_id, room in self.rooms.items() if room.state == 'finished']
+                if not finished:
+                    raise ValueError("Too many active rooms")
+                del self.rooms[finished[0]]
+            room_id = secrets.token_hex(4)
+            room = self.rooms[room_id] = Room(room_id, self.predictor, **options)
+            return room
+
+    def get(self, room_id):
+        """Return a room, or None if it doesn't exist."""
+        return self.rooms.get(room_id)
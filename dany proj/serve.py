@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# Adaptive Trivia Quiz Game - Production Server Entry Point
+"""
+Serve the web app without the Werkzeug debugger or reloader.
+
+The server backend is picked from what is installed, in this order:
+
+- gunicorn: pre-forked worker processes, each with a thread pool. The app is
+  preloaded in the master process so the question bank and the predictor are
+  loaded once and shared with the workers.
+- waitress: a single process with a thread pool.
+- werkzeug: Flask's own server in threaded mode, with debug and reload off.
+
+Game state lives in the memory of the worker that created it, so running
+more than one worker needs a load balancer with sticky sessions.
+
+A multiplayer room's event stream holds a request thread for as long as
+it is open. Every process therefore gets --room-streams threads on top of
+--threads. The app refuses streams beyond that budget, so answers and
+pages always have --threads threads left.
+
+Usage:
+    python serve.py --workers 1 --threads 8 --room-streams 300 --port 5000
+"""
+import argparse
+import atexit
+import os
+import signal
+import sys
+
+from app import create_app, flush_pending_logs, start_inference_service, start_ngrok_tunnel
+
+def build_server_options(host='0.0.0.0', port=5000, workers=1, threads=8, timeout=30):
+    """
+    Build the gunicorn settings used by run_gunicorn.
+
+    Args:
+        host (str): Interface to bind to
+        port (int): Port to bind to
+        workers (int): Number of worker processes
+        threads (int): Number of threads per worker
+        timeout (int): Seconds before a stuck worker is restarted
+
+    Returns:
+        dict: gunicorn configuration values
+    """
+    return {
+        'bind': f"{host}:{port}",
+        'workers': max(1, workers),
+        'threads': max(1, threads),
+        'worker_class': 'gthread',
+        'preload_app': True,
+        'timeout': timeout,
+        'graceful_timeout': timeout,
+        'accesslog': None,
+        # Each worker runs its own inference processes; start loading them as soon as it is forked
+        # (without holding up the worker's boot, which gunicorn would time out)
+        'post_fork': lambda server, worker: start_inference_service(wait=False),
+        # Save unfinished games whenever a worker stops
+        'worker_exit': lambda server, worker: flush_pending_logs(),
+    }
+
+def run_gunicorn(application, options):
+    """Run the application with gunicorn using the given options."""
+    from gunicorn.app.base import BaseApplication
+
+    class TriviaApplication(BaseApplication):
+        def __init__(self, app, settings):
+            self.application = app
+            self.settings = settings
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.settings.items():
+                if key in self.cfg.settings:
+                    self.cfg.set(key, value)
+
+        def load(self):
+            return self.application
+
+    TriviaApplication(application, options).run()
+
+def run_waitress(application, host, port, threads):
+    """Run the application with waitress (single process, thread pool)."""
+    from waitress import serve
+    # Every thread may hold an open connection, and clients keep more open between requests
+    serve(application, host=host, port=port, threads=threads, connection_limit=max(100, threads * 2))
+
+def run_werkzeug(application, host, port):
+    """Run the application with Werkzeug's threaded server, without debugger or reloader."""
+    from werkzeug.serving import run_simple
+    run_simple(host, port, application, threaded=True,
+               use_reloader=False, use_debugger=False)
+
+def _handle_sigterm(signum, frame):
+    """Exit cleanly on SIGTERM so the atexit flush runs."""
+    sys.exit(0)
+
+def main(argv=None):
+    """Parse command-line options and start the chosen server backend."""
+    parser = argparse.ArgumentParser(description="Serve the Adaptive Trivia Quiz Game")
+    parser.add_argument('--host', default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 5000)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_WORKERS', 1)),
+                        help="Worker processes (gunicorn only)")
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('WEB_THREADS', 8)),
+                        help="Threads per worker for requests other than room event streams")
+    parser.add_argument('--room-streams', type=int, default=int(os.environ.get('ROOM_STREAMS', 100)),
+                        help="Room event streams per worker (each adds a thread)")
+    parser.add_argument('--timeout', type=int, default=30,
+                        help="Seconds allowed for a request / graceful shutdown")
+    parser.add_argument('--server', choices=['auto', 'gunicorn', 'waitress', 'werkzeug'],
+                        default='auto', help="Server backend to use")
+    parser.add_argument('--model-path', default=os.environ.get('MODEL_PATH'),
+                        help="Saved predictor model to preload")
+    parser.add_argument('--public-url', action='store_true',
+                        help="Also open an ngrok tunnel to the server")
+    args = parser.parse_args(argv)
+
+    # Load the question bank and predictor before any worker is forked
+    application = create_app(preload=True, model_path=args.model_path, threads=args.threads,
+                             room_streams=args.room_streams)
+    # Open event streams never take the threads of the other requests
+    threads = args.threads + max(args.room_streams, 0)
+
+    server = args.server
+    if server == 'auto':
+        server = 'werkzeug'
+        for candidate in ('gunicorn', 'waitress'):
+            if candidate == 'gunicorn' and os.name == 'nt':
+                continue
+            try:
+                __import__(candidate)
+                server = candidate
+                break
+            except ImportError:
+                continue
+
+    if args.workers > 1:
+        if server != 'gunicorn':
+            print(f" * {server} runs a single process; ignoring --workers={args.workers}")
+        else:
+            print(" * Game state is kept per worker: use sticky sessions with several workers")
+
+    if args.public_url:
+        start_ngrok_tunnel(args.port)
+
+    print(f" * Serving with {server} on {args.host}:{args.port}")
+    if server == 'gunicorn':
+        options = build_server_options(args.host, args.port, args.workers,
+                                       threads, args.timeout)
+        run_gunicorn(application, options)
+    else:
+        # Single process servers: flush unfinished games when the process exits
+        atexit.register(flush_pending_logs)
+        signal.signal(signal.SIGTERM, _handle_sigterm)
+        start_inference_service()
+        if server == 'waitress':
+            run_waitress(application, args.host, args.port, threads)
+        else:
+            run_werkzeug(application, args.host, args.port)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+# Adaptive Trivia Quiz Game - Shadow Evaluation of Candidate Predictors
+"""
+Run candidate difficulty predictors next to the live one without serving them.
+
+After every answer the game hands the player's average metrics and the
+difficulty the live predictor chose to ShadowEvaluator.submit(), which
+only puts them on a bounded queue. A background thread takes them off the
+queue, asks every candidate for its difficulty and aggregates how far the
+candidates are from the live predictor.
+
+Submitting never blocks and never runs a model: when the queue is full the
+sample is dropped and counted, so a slow candidate can only lose samples,
+not slow down answers.
+
+The thread is started by the first submit() of each process. Servers that
+fork workers after loading the app create the evaluator in the master
+process, and threads don't survive a fork, so every worker starts its own.
+"""
+import os
+import queue
+import threading
+
+from game_logic import convert_difficulty_value_to_label
+
+class ShadowEvaluator:
+    """
+    Background comparison of candidate predictors against the live predictor.
+    """
+
+    def __init__(self, candidates, maxsize=1000):
+        """
+        Initialize the evaluator; the worker thread starts on the first submit().
+
+        Args:
+            candidates (dict): Candidate predictors by name
+            maxsize (int): Samples the queue holds before dropping new ones
+        """
+        self.candidates = dict(candidates)
+        self.maxsize = maxsize
+        self.submitted = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize)
+        self._lock = threading.Lock()
+        self._stats = {name: _empty_stats() for name in self.candidates}
+        self._worker = None
+        self._pid = None  # Process that started the worker thread
+        self._start_lock = threading.Lock()  # Only held while starting the worker
+
+    def submit(self, accuracy, reaction_time, attempts, live_difficulty):
+        """
+        Queue one prediction of the live predictor for comparison.
+
+        Args:
+            accuracy (float): Average accuracy the live predictor was given
+            reaction_time (float): Average reaction time in seconds
+            attempts (float): Average attempts
+            live_difficulty (float): Difficulty the live predictor chose
+
+        Returns:
+            bool: True if queued, False if the queue was full and the sample dropped
+        """
+        if self._pid != os.getpid():
+            self._start_worker()
+        try:
+            self._queue.put_nowait((accuracy, reaction_time, attempts, live_difficulty))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.submitted += 1
+        return True
+
+    def stats(self):
+        """
+        Report the divergence of every candidate from the live predictor.
+
+        Returns:
+            dict: Queue counters and, per candidate, the number of compared
+                samples, mean and maximum |candidate - live|, root mean square
+                difference, the rate of samples with a different difficulty
+                label, the mean difficulty of both and the number of errors
+        """
+        with self._lock:
+            candidates = {}
+            for name, stats in self._stats.items():
+                count = max(stats['samples'], 1)
+                candidates[name] = {
+                    'samples': stats['samples'],
+                    'mean_abs_diff': stats['abs_diff_sum'] / count,
+                    'max_abs_diff': stats['max_abs_diff'],
+                    'rms_diff': (stats['sq_diff_sum'] / count) ** 0.5,
+                    'label_change_rate': stats['label_changes'] / count,
+                    'mean_live_difficulty': stats['live_sum'] / count,
+                    'mean_candidate_difficulty': stats['candidate_sum'] / count,
+                    'errors': stats['errors']
+                }
+            return {
+                'submitted': self.submitted,
+                'dropped': self.dropped,
+                'pending': self._queue.qsize(),
+                'queue_size': self.maxsize,
+                'candidates': candidates
+            }
+
+    def join(self):
+        """Wait until every queued sample has been evaluated."""
+        self._queue.join()
+
+    def close(self):
+        """Evaluate the queued samples and stop the worker thread (if this process started one)."""
+        if self._worker is None or self._pid != os.getpid():
+            return
+        self._queue.put(None)
+        self._worker.join()
+        self._worker = None
+
+    def _start_worker(self):
+        """Start the worker thread of this process (a forked child can't use its parent's)."""
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                # Nothing reads the parent's queue here, and the parent's worker may have
+                # held its locks at the fork
+                self._queue = queue.Queue(self.maxsize)
+                self._lock = threading.Lock()
+            self._worker = threading.Thread(target=self._run, name='shadow-evaluator', daemon=True)
+            self._worker.start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        """Evaluate queued samples until close() is called."""
+        while True:
+            sample = self._queue.get()
+            try:
+                if sample is None:
+                    return
+                self._evaluate(*sample)
+            finally:
+                self._queue.task_done()
+
+    def _evaluate(self, accuracy, reaction_time, attempts, live_difficulty):
+        """Run every candidate on one sample and add it to the statistics."""
+        live_label = convert_difficulty_value_to_label(live_difficulty)
+        for name, candidate in self.candidates.items():
+            try:
+                difficulty = candidate.predict_difficulty(accuracy, reaction_time, attempts)
+            except Exception as e:
+                print(f"Error in shadow predictor {name}: {e}")
+                with self._lock:
+                    self._stats[name]['errors'] += 1
+                continue
+
+            diff = abs(difficulty - live_difficulty)
+            with self._lock:
+                stats = self._stats[name]
+                stats['samples'] += 1
+                stats['abs_diff_sum'] += diff
+                stats['sq_diff_sum'] += diff * diff
+                stats['max_abs_diff'] = max(stats['max_abs_diff'], diff)
+                stats['label_changes'] += convert_difficulty_value_to_label(difficulty) != live_label
+                stats['live_sum'] += live_difficulty
+                stats['candidate_sum'] += difficulty
+
+def _empty_stats():
+    """Return zeroed running statistics of one candidate."""
+    return {
+        'samples': 0,
+        'abs_diff_sum': 0.0,
+        'sq_diff_sum': 0.0,
+        'max_abs_diff': 0.0,
+        'label_changes': 0,
+        'live_sum': 0.0,
+        'candidate_sum': 0.0,
+        'errors': 0
+    }
+
+def parse_shadow_models(spec):
+    """
+    Parse a SHADOW_MODELS setting into candidate names and model paths.
+
+    Args:
+        spec (str): Comma-separated model paths, each optionally prefixed
+            with a name, e.g. "small=models/small.weights.npz,models/table.npz"
+
+    Returns:
+        dict: Model paths by candidate name (the path itself when unnamed)
+    """
+    models = {}
+    for item in (spec or '').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, path = item.rpartition('=')
+        models[name or path] = path
+    return models
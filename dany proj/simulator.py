@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+# Adaptive Trivia Quiz Game - Offline Game Simulator
+"""
+Play large numbers of synthetic games without any terminal I/O or sleeps.
+
+Each game drives the real TriviaGame, DataHandler and DifficultyPredictor
+with a simulated player, the same way main.py does for a human player.
+Games are split into chunks and spread over a process pool; every chunk
+returns summed statistics, so results stay small however many games run.
+
+Every difficulty decision is timed, so the same run also measures the
+latency of the difficulty policy; --benchmark plays the same games under
+each policy of ai_module.POLICIES and prints them side by side.
+
+Usage:
+    python simulator.py --games 100000 --workers 8 --skill-dist uniform
+    python simulator.py --games 2000 --workers 1 --benchmark
+"""
+import argparse
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from game_logic import TriviaGame, convert_difficulty_value_to_label
+from data_handler import DataHandler
+from ai_module import get_predictor, POLICIES
+from engine import MultiPlayerEngine
+
+DIFFICULTY_LABELS = ['easy', 'medium', 'hard']
+
+class LogisticPlayer:
+    """
+    Simulated player whose chance of answering correctly falls with question difficulty.
+
+    The probability of a correct answer is a logistic curve centered on the
+    player's skill (on the same 0-1 scale as question difficulty), with a floor
+    for guessing one of the four options. Reaction times are log-normal,
+    slower for harder questions and capped at 20 seconds.
+
+    skill may also be an array, in which case the model describes one player
+    per element and its methods work element-wise.
+    """
+
+    def __init__(self, skill, slope=8.0, guess_rate=0.25, base_reaction_time=4.0,
+                 reaction_spread=0.35):
+        """Initialize the player model."""
+        self.skill = skill
+        self.slope = slope
+        self.guess_rate = guess_rate
+        self.base_reaction_time = base_reaction_time
+        self.reaction_spread = reaction_spread
+
+    def answer_probability(self, difficulty):
+        """Return the probability of answering a question of this difficulty correctly."""
+        knows = 1.0 / (1.0 + np.exp(-self.slope * (self.skill - difficulty)))
+        return self.guess_rate + (1.0 - self.guess_rate) * knows
+
+    def reaction_time(self, difficulty, noise):
+        """Return a reaction time in seconds given a standard normal noise value."""
+        median = self.base_reaction_time * (1.0 + difficulty) * (1.5 - self.skill)
+        return np.minimum(20.0, median * np.exp(self.reaction_spread * noise))
+
+def sample_skills(n_players, skill_dist='uniform', rng=None, mean=0.5, std=0.15):
+    """
+    Draw player skills for a batch of games.
+
+    Args:
+        n_players (int): Number of skills to draw
+        skill_dist (str): 'uniform' (over 0.1-0.9), 'normal' or a fixed float value
+        rng (np.random.Generator): Random generator to use
+        mean (float): Mean skill for the normal distribution
+        std (float): Standard deviation for the normal distribution
+
+    Returns:
+        np.ndarray: Skills clipped to [0, 1]
+    """
+    rng = rng or np.random.default_rng()
+    if skill_dist == 'uniform':
+        skills = rng.uniform(0.1, 0.9, n_players)
+    elif skill_dist == 'normal':
+        skills = rng.normal(mean, std, n_players)
+    else:
+        skills = np.full(n_players, float(skill_dist))
+    return np.clip(skills, 0.0, 1.0)
+
+def _wrong_answer(question, rng):
+    """Return a (1-based) answer string for an option that is not correct."""
+    wrong = [i for i in range(len(question['options'])) if i != question['answer']]
+    return str(wrong[int(rng.integers(len(wrong)))] + 1)
+
+def simulate_game(player, predictor, rounds=10, rng=None, player_name="SimPlayer", window=None):
+    """
+    Play one game with a simulated player.
+
+    Args:
+        player (LogisticPlayer): The simulated player
+        predictor (DifficultyPolicy): Policy that adapts the difficulty
+        rounds (int): Number of rounds to play
+        rng (np.random.Generator): Random generator for the player's answers
+        player_name (str): Name given to the game and the data handler
+        window (int): Rounds averaged by get_average_metrics (None uses
+            the predictor's window, as the live game does)
+
+    Returns:
+        dict: Score, accuracy, difficulty trajectory, questions served and
+            the seconds spent choosing the next difficulty
+    """
+    rng = rng or np.random.default_rng()
+    game = TriviaGame(player_name)
+    data_handler = DataHandler(player_name, window=window or predictor.window)
+    policy = predictor.for_player(game.get_current_difficulty())
+
+    # Draw the player's randomness for the whole game at once
+    uniforms = rng.random(rounds)
+    noises = rng.standard_normal(rounds)
+
+    trajectory = []
+    question_labels = []
+    relaxed = 0
+    correct_count = 0
+    decision_time = 0.0
+
+    for round_num in range(1, rounds + 1):
+        game.round_number = round_num
+        current_difficulty = game.get_current_difficulty()
+        question = game.generate_question()
+
+        question_label = convert_difficulty_value_to_label(question['difficulty'])
+        question_labels.append(question_label)
+        if question_label != convert_difficulty_value_to_label(current_difficulty):
+            relaxed += 1
+
+        correct = uniforms[round_num - 1] < player.answer_probability(question['difficulty'])
+        reaction_time = float(player.reaction_time(question['difficulty'], noises[round_num - 1]))
+        user_answer = str(question['answer'] + 1) if correct else _wrong_answer(question, rng)
+
+        correct, points = game.evaluate_answer(question, user_answer, reaction_time)
+        game.update_score(points)
+        correct_count += correct
+
+        data_handler.log_performance(round_num, current_difficulty,
+                                     1.0 if correct else 0.0, reaction_time, 1, question.get('id'))
+        started = time.perf_counter()
+        new_difficulty = policy.record_answer(question.get('id'), question['difficulty'], correct)
+        if new_difficulty is None:
+            avg_accuracy, avg_reaction_time, avg_attempts = data_handler.get_average_metrics()
+            new_difficulty = policy.predict_difficulty(avg_accuracy, avg_reaction_time, avg_attempts)
+        decision_time += time.perf_counter() - started
+        game.adjust_difficulty(new_difficulty)
+        trajectory.append(new_difficulty)
+
+    return {
+        'score': game.get_score(),
+        'accuracy': correct_count / rounds if rounds else 0.0,
+        'trajectory': trajectory,
+        'question_labels': question_labels,
+        'relaxed': relaxed,
+        'decision_time': decision_time
+    }
+
+def _empty_totals(rounds):
+    """Return zeroed running totals for a batch of games."""
+    return {
+        'games': 0,
+        'rounds': 0,
+        'score_sum': 0.0,
+        'score_sq_sum': 0.0,
+        'accuracy_sum': 0.0,
+        'final_difficulty_sum': 0.0,
+        'tracking_error_sum': 0.0,
+        'decision_time_sum': 0.0,
+        'relaxed': 0,
+        'questions_by_label': {label: 0 for label in DIFFICULTY_LABELS},
+        'difficulty_by_round_sum': [0.0] * rounds,
+        'tracking_error_by_round_sum': [0.0] * rounds
+    }
+
+def merge_totals(total, other):
+    """Add the running totals of other into total and return total."""
+    for key, value in other.items():
+        if isinstance(value, dict):
+            for label, count in value.items():
+                total[key][label] = total[key].get(label, 0) + count
+        elif isinstance(value, list):
+            total[key] = [a + b for a, b in zip(total[key], value)]
+        else:
+            total[key] += value
+    return total
+
+# Predictor loaded once per worker process by _init_worker
+_worker_predictor = None
+
+def _init_worker(model_path, policy=None):
+    """Load the predictor once in each worker process."""
+    global _worker_predictor
+    _worker_predictor = get_predictor(model_path, policy)
+
+def run_chunk(n_games, rounds=10, skill_dist='uniform', seed=0, model_path=None, predictor=None,
+              policy=None):
+    """
+    Play a chunk of games and return their summed statistics.
+
+    Args:
+        n_games (int): Number of games to play
+        rounds (int): Rounds per game
+        skill_dist (str): Player skill distribution (see sample_skills)
+        seed (int): Seed for the players and the question selection
+        model_path (str): Predictor model to load if no predictor is given
+        predictor: Predictor to use (defaults to the worker's predictor)
+        policy (str): Difficulty policy to load if no predictor is given
+
+    Returns:
+        dict: Running totals, see summarize()
+    """
+    global _worker_predictor
+    if predictor is None:
+        if _worker_predictor is None:
+            _init_worker(model_path, policy)
+        predictor = _worker_predictor
+
+    # Question selection draws from the random module, so seed it too
+    random.seed(seed)
+    rng = np.random.default_rng(seed)
+    skills = sample_skills(n_games, skill_dist, rng)
+
+    totals = _empty_totals(rounds)
+    for skill in skills:
+        result = simulate_game(LogisticPlayer(skill), predictor, rounds, rng)
+        final_difficulty = result['trajectory'][-1] if result['trajectory'] else 0.5
+
+        totals['games'] += 1
+        totals['rounds'] += rounds
+        totals['score_sum'] += result['score']
+        totals['score_sq_sum'] += result['score'] ** 2
+        totals['accuracy_sum'] += result['accuracy']
+        totals['final_difficulty_sum'] += final_difficulty
+        totals['tracking_error_sum'] += abs(final_difficulty - skill)
+        totals['decision_time_sum'] += result['decision_time']
+        totals['relaxed'] += result['relaxed']
+        for label in result['question_labels']:
+            totals['questions_by_label'][label] += 1
+        for i, difficulty in enumerate(result['trajectory']):
+            totals['difficulty_by_round_sum'][i] += difficulty
+            totals['tracking_error_by_round_sum'][i] += abs(difficulty - skill)
+    return totals
+
+def run_chunk_vectorized(n_games, rounds=10, skill_dist='uniform', seed=0, model_path=None,
+                         predictor=None, policy=None):
+    """
+    Play a chunk of games side by side on a MultiPlayerEngine.
+
+    Scoring, metrics and difficulty prediction run as one batch per round for
+    the whole chunk; only question selection is done per player, through each
+    player's TriviaGame. Takes the same arguments as run_chunk, but only
+    works with policies that predict from the average metrics.
+
+    Returns:
+        dict: Running totals, see summarize()
+    """
+    global _worker_predictor
+    if predictor is None:
+        if _worker_predictor is None:
+            _init_worker(model_path, policy)
+        predictor = _worker_predictor
+    if predictor.online:
+        raise ValueError("The vectorized engine needs a policy that predicts from average metrics")
+
+    random.seed(seed)
+    rng = np.random.default_rng(seed)
+    skills = sample_skills(n_games, skill_dist, rng)
+    players = LogisticPlayer(skills)
+    games = [TriviaGame("SimPlayer") for _ in range(n_games)]
+    engine = MultiPlayerEngine(n_games, window=predictor.window)
+    correct_counts = np.zeros(n_games, dtype=np.int64)
+
+    totals = _empty_totals(rounds)
+    for round_num in range(rounds):
+        questions = [game.generate_question(difficulty) for game, difficulty in zip(games, engine.difficulty)]
+        difficulties = np.array([q['difficulty'] for q in questions], dtype=np.float64)
+        answers = np.array([q['answer'] for q in questions], dtype=np.int64)
+        option_counts = np.array([len(q['options']) for q in questions], dtype=np.int64)
+
+        for question, difficulty in zip(questions, engine.difficulty):
+            question_label = convert_difficulty_value_to_label(question['difficulty'])
+            totals['questions_by_label'][question_label] += 1
+            if question_label != convert_difficulty_value_to_label(difficulty):
+                totals['relaxed'] += 1
+
+        correct = rng.random(n_games) < players.answer_probability(difficulties)
+        wrong_offset = 1 + (rng.random(n_games) * (option_counts - 1)).astype(np.int64)
+        choices = np.where(correct, answers, (answers + wrong_offset) % option_counts)
+        reaction_times = players.reaction_time(difficulties, rng.standard_normal(n_games))
+
+        started = time.perf_counter()
+        correct, _, new_difficulty = engine.step(predictor, choices, answers, difficulties, reaction_times)
+        totals['decision_time_sum'] += time.perf_counter() - started
+        correct_counts += correct
+        totals['difficulty_by_round_sum'][round_num] += float(new_difficulty.sum())
+        totals['tracking_error_by_round_sum'][round_num] += float(np.abs(new_difficulty - skills).sum())
+
+    final_difficulty = engine.difficulty
+    totals['games'] += n_games
+    totals['rounds'] += n_games * rounds
+    totals['score_sum'] += float(engine.score.sum())
+    totals['score_sq_sum'] += float((engine.score.astype(np.float64) ** 2).sum())
+    totals['accuracy_sum'] += float((correct_counts / max(rounds, 1)).sum())
+    totals['final_difficulty_sum'] += float(final_difficulty.sum())
+    totals['tracking_error_sum'] += float(np.abs(final_difficulty - skills).sum())
+    return totals
+
+def summarize(totals):
+    """
+    Turn running totals into summary statistics.
+
+    Returns:
+        dict: Mean score (and its standard deviation), mean accuracy, mean
+            final difficulty, mean |final difficulty - skill| (also per round),
+            the mean time per difficulty decision in microseconds, the rate of
+            questions served outside the requested difficulty band, the share
+            of questions per difficulty label and the mean difficulty per round
+    """
+    games = max(totals['games'], 1)
+    rounds = max(totals['rounds'], 1)
+    mean_score = totals['score_sum'] / games
+    variance = max(totals['score_sq_sum'] / games - mean_score ** 2, 0.0)
+    return {
+        'games': totals['games'],
+        'mean_score': mean_score,
+        'score_std': variance ** 0.5,
+        'mean_accuracy': totals['accuracy_sum'] / games,
+        'mean_final_difficulty': totals['final_difficulty_sum'] / games,
+        'mean_tracking_error': totals['tracking_error_sum'] / games,
+        'tracking_error_by_round': [value / games for value in totals['tracking_error_by_round_sum']],
+        'mean_decision_us': totals['decision_time_sum'] / rounds * 1e6,
+        'relaxed_rate': totals['relaxed'] / rounds,
+        'question_share': {label: count / rounds
+                           for label, count in totals['questions_by_label'].items()},
+        'mean_difficulty_by_round': [value / games for value in totals['difficulty_by_round_sum']]
+    }
+
+def simulate_games(n_games, rounds=10, skill_dist='uniform', workers=None, chunk_size=1000,
+                   seed=0, model_path=None, vectorized=False, policy=None):
+    """
+    Play n_games synthetic games over a process pool.
+
+    Args:
+        n_games (int): Total number of games
+        rounds (int): Rounds per game
+        skill_dist (str): Player skill distribution (see sample_skills)
+        workers (int): Worker processes (defaults to the CPU count; 1 runs in-process)
+        chunk_size (int): Games per task sent to a worker
+        seed (int): Base seed; chunk i uses seed + i
+        model_path (str): Predictor model loaded by every worker
+        vectorized (bool): Play each chunk side by side on a MultiPlayerEngine
+        policy (str): Difficulty policy, one of ai_module.POLICIES
+
+    Returns:
+        dict: Summary statistics, see summarize()
+    """
+    chunk_runner = run_chunk_vectorized if vectorized else run_chunk
+    workers = workers or os.cpu_count() or 1
+    chunks = [min(chunk_size, n_games - start) for start in range(0, n_games, chunk_size)]
+    totals = _empty_totals(rounds)
+
+    if workers == 1:
+        predictor = get_predictor(model_path, policy)
+        for i, size in enumerate(chunks):
+            merge_totals(totals, chunk_runner(size, rounds, skill_dist, seed + i, predictor=predictor))
+        return summarize(totals)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(model_path, policy)) as executor:
+        futures = [executor.submit(chunk_runner, size, rounds, skill_dist, seed + i)
+                   for i, size in enumerate(chunks)]
+        for future in futures:
+            merge_totals(totals, future.result())
+    return summarize(totals)
+
+def benchmark_policies(n_games, rounds=10, skill_dist='uniform', seed=0, model_path=None, policies=None):
+    """
+    Play the same games under several difficulty policies.
+
+    Every policy runs in-process on the same players and seeds, so the
+    decision latencies are comparable and the adaptation quality (how close
+    the difficulty gets to each player's skill, and how fast) is measured on
+    identical games.
+
+    Args:
+        n_games (int): Games per policy
+        rounds (int): Rounds per game
+        skill_dist (str): Player skill distribution (see sample_skills)
+        seed (int): Seed shared by all policies
+        model_path (str): Predictor model for the 'nn' policy
+        policies (list): Policy names (defaults to ai_module.POLICIES)
+
+    Returns:
+        dict: Summary statistics (see summarize()) by policy name
+    """
+    return {policy: simulate_games(n_games, rounds, skill_dist, workers=1, seed=seed,
+                                   model_path=model_path, policy=policy)
+            for policy in policies or POLICIES}
+
+def main(argv=None):
+    """Run a simulation from the command line and print its summary as JSON."""
+    parser = argparse.ArgumentParser(description="Simulate trivia games offline")
+    parser.add_argument('--games', type=int, default=10000)
+    parser.add_argument('--rounds', type=int, default=10)
+    parser.add_argument('--skill-dist', default='uniform',
+                        help="'uniform', 'normal' or a fixed skill value")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--model-path', default=None)
+    parser.add_argument('--vectorized', action='store_true',
+                        help="Batch scoring and prediction across the games of each chunk")
+    parser.add_argument('--policy', default='nn', choices=POLICIES, help="Difficulty policy")
+    parser.add_argument('--benchmark', action='store_true',
+                        help="Compare all difficulty policies on the same games")
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        results = benchmark_policies(args.games, args.rounds, args.skill_dist, args.seed, args.model_path)
+        print(f"{'policy':<8} {'us/decision':>12} {'final |d-skill|':>16} {'round 3':>8} {'accuracy':>9}")
+        for policy, summary in results.items():
+            by_round = summary['tracking_error_by_round']
+            print(f"{policy:<8} {summary['mean_decision_us']:>12.1f} {summary['mean_tracking_error']:>16.3f} "
+                  f"{by_round[min(2, len(by_round) - 1)] if by_round else 0.0:>8.3f} "
+                  f"{summary['mean_accuracy']:>9.1%}")
+        return
+
+    summary = simulate_games(args.games, args.rounds, args.skill_dist, args.workers,
+                             args.chunk_size, args.seed, args.model_path, args.vectorized, args.policy)
+    print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -4,10 +4,13 @@ import pandas as pd
 import json
 import os
 import sys
+import importlib.util
 from unittest.mock import patch, MagicMock
 from game_logic import TriviaGame, select_question, load_question_bank
 from data_handler import DataHandler
-from ai_module import DifficultyPredictor
+from ai_module import CircuitBreaker, DifficultyPredictor
+from leaderboard import Leaderboard
+from player_store import PlayerStore
 from utils import (
     format_time, shuffle_list, format_score, 
     create_difficulty_label, generate_ascii_progress_bar
@@ -57,6 +60,80 @@ class TestUtils(unittest.TestCase):
         self.assertEqual(len(bar.split("[")[1].split("]")[0]), 10)  # Check width is correct
         self.assertIn("50.0%", bar)  # Check percentage is correct
 
+    @unittest.skipIf(os.name == 'nt', "stdin polling is POSIX only")
+    @patch('builtins.print')
+    def test_input_with_timeout_returns_immediately(self, mock_print):
+        """Test that a timed input returns as soon as an answer is available."""
+        import time
+        from utils import input_with_timeout
+        read_fd, write_fd = os.pipe()
+        with os.fdopen(read_fd) as stream, os.fdopen(write_fd, 'w') as writer:
+            writer.write("2\n")
+            writer.flush()
+            start = time.time()
+            answer = input_with_timeout("Answer:", timeout=5, stream=stream)
+            self.assertEqual(answer, "2")
+            self.assertLess(time.time() - start, 1.0)
+    
+    @unittest.skipIf(os.name == 'nt', "stdin polling is POSIX only")
+    @patch('builtins.print')
+    def test_input_with_timeout_expires(self, mock_print):
+        """Test that a timed input gives up after the timeout."""
+        import time
+        from utils import input_with_timeout
+        read_fd, write_fd = os.pipe()
+        with os.fdopen(read_fd) as stream, os.fdopen(write_fd, 'w'):
+            start = time.time()
+            self.assertIsNone(input_with_timeout("Answer:", timeout=0.2, stream=stream))
+            self.assertLess(time.time() - start, 1.0)
+
+    @unittest.skipIf(os.name == 'nt', "stdin polling is POSIX only")
+    @patch('builtins.print')
+    def test_input_with_timeout_reads_buffered_lines(self, mock_print):
+        """Test that lines already in the stream's buffer are answers, not timeouts."""
+        from utils import input_with_timeout
+        read_fd, write_fd = os.pipe()
+        with os.fdopen(read_fd) as stream, os.fdopen(write_fd, 'w') as writer:
+            writer.write("Alice\n3\n4\n")
+            writer.flush()
+            # Reading the name pulls every line into the stream's buffer
+            self.assertEqual(stream.readline(), "Alice\n")
+            self.assertEqual(input_with_timeout("Answer:", timeout=0.5, stream=stream), "3")
+            self.assertEqual(input_with_timeout("Answer:", timeout=0.5, stream=stream), "4")
+            self.assertTrue(os.get_blocking(read_fd))
+
+    @unittest.skipIf(os.name == 'nt', "stdin polling is POSIX only")
+    def test_non_blocking_reads_hold_the_console_lock(self):
+        """Test that the countdown can't write while stdin (and so a tty's stdout) is non-blocking."""
+        import utils
+        read_fd, write_fd = os.pipe()
+        with os.fdopen(read_fd) as stream, os.fdopen(write_fd, 'w'):
+            locked = []
+            real_set_blocking = os.set_blocking
+            
+            def set_blocking(fd, blocking):
+                locked.append(utils._console_lock.locked())
+                real_set_blocking(fd, blocking)
+            
+            with patch('utils.os.set_blocking', side_effect=set_blocking):
+                self.assertEqual(utils._read_available(stream, read_fd), '')
+        self.assertEqual(locked, [True, True])
+
+    @unittest.skipIf(os.name == 'nt', "stdin polling is POSIX only")
+    @patch('builtins.print')
+    def test_input_with_timeout_waits_for_whole_line(self, mock_print):
+        """Test that an answer typed in pieces is returned once Enter is pressed."""
+        import threading
+        from utils import input_with_timeout
+        read_fd, write_fd = os.pipe()
+        with os.fdopen(read_fd) as stream, os.fdopen(write_fd, 'w') as writer:
+            writer.write("1")
+            writer.flush()
+            finish = threading.Timer(0.1, lambda: (writer.write("2\n"), writer.flush()))
+            finish.start()
+            self.assertEqual(input_with_timeout("Answer:", timeout=5, stream=stream), "12")
+            finish.join()
+
 class TestGameLogic(unittest.TestCase):
     """Test game logic functions."""
     
@@ -137,6 +214,42 @@ class TestGameLogic(unittest.TestCase):
         new_list = [4, 5, 6]
         self.game.set_asked_questions(new_list)
         self.assertEqual(self.game.asked_questions, set(new_list))
+    
+    def test_prefetch_next_questions(self):
+        """Test that prefetched questions are used for the matching outcome."""
+        asked_before = set(self.game.asked_questions)
+        prefetched = self.game.prefetch_next_questions(lambda correct: 0.9 if correct else 0.1)
+        
+        # Nothing is marked as asked until a prefetched question is used
+        self.assertEqual(self.game.asked_questions, asked_before)
+        self.assertEqual(set(prefetched.keys()), {True, False})
+        
+        difficulty = self.game.take_prefetched(True)
+        self.assertEqual(difficulty, 0.9)
+        self.assertEqual(self.game.prefetched, {})
+        
+        question = self.game.generate_question()
+        self.assertEqual(question["id"], prefetched[True][1]["id"])
+        self.assertIn(question["id"], self.game.asked_questions)
+        
+        # Without a prefetch there is nothing to take
+        self.assertIsNone(self.game.take_prefetched(False))
+    
+    def test_prefetch_for_other_difficulty_discarded(self):
+        """Test that a question prefetched for another difficulty is not used."""
+        self.game.prefetch_next_questions(lambda correct: 0.5)
+        self.assertIsNone(self.game.take_prefetched(True, 0.7))
+        self.assertIsNone(self.game.staged_question)
+        
+        self.game.prefetch_next_questions(lambda correct: 0.5)
+        self.assertEqual(self.game.take_prefetched(True, 0.5), 0.5)
+        self.assertIsNotNone(self.game.staged_question)
+    
+    def test_prefetch_discarded_by_new_question(self):
+        """Test that generating a question invalidates an earlier prefetch."""
+        self.game.prefetch_next_questions(lambda correct: 0.5)
+        self.game.generate_question()
+        self.assertIsNone(self.game.take_prefetched(True))
         
     def test_question_selection_with_exhausted_questions(self):
         """Test that question selection works properly when questions are exhausted."""
@@ -212,6 +325,41 @@ class TestDataHandler(unittest.TestCase):
         self.assertAlmostEqual(avg_reaction_time, (5.0 + 10.0 + 3.0) / 3)
         self.assertAlmostEqual(avg_attempts, (1 + 2 + 1) / 3)
 
+    def test_get_average_metrics_with(self):
+        """Test the averages computed as if one more round had been logged."""
+        self.data_handler.log_performance(1, 0.5, 1.0, 5.0, 1)
+        self.data_handler.log_performance(2, 0.6, 0.0, 10.0, 2)
+        self.data_handler.log_performance(3, 0.7, 1.0, 3.0, 1)
+        
+        avg_accuracy, avg_reaction_time, avg_attempts = self.data_handler.get_average_metrics_with(0.0, 8.0, 1)
+        
+        self.assertAlmostEqual(avg_accuracy, (0.0 + 1.0 + 0.0) / 3)
+        self.assertAlmostEqual(avg_reaction_time, (10.0 + 3.0 + 8.0) / 3)
+        self.assertAlmostEqual(avg_attempts, (2 + 1 + 1) / 3)
+        
+        # Nothing is actually logged
+        self.assertEqual(len(self.data_handler.performance_data), 3)
+
+    def test_save_combined_csv(self):
+        """Test that several players' data is written to one CSV file."""
+        import tempfile
+        other = DataHandler("OtherPlayer")
+        self.data_handler.log_performance(1, 0.5, 1.0, 5.0, 1)
+        other.log_performance(1, 0.5, 0.0, 7.0, 1)
+        other.log_performance(2, 0.4, 1.0, 3.0, 1)
+        
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                filepath = DataHandler.save_combined_csv([self.data_handler, other], "combined.csv")
+                combined = pd.read_csv(filepath)
+            finally:
+                os.chdir(cwd)
+        
+        self.assertEqual(len(combined), 3)
+        self.assertEqual(combined['player'].tolist(), ["TestPlayer", "OtherPlayer", "OtherPlayer"])
+
 class TestAIModule(unittest.TestCase):
     """Test AI module functions."""
     
@@ -291,6 +439,1277 @@ class TestAIModule(unittest.TestCase):
                 import shutil
                 shutil.rmtree(test_path, ignore_errors=True)
 
+class TestPredictionCache(unittest.TestCase):
+    """Test memoized difficulty prediction."""
+    
+    def setUp(self):
+        """Set up a predictor with a fallback rule that counts its calls."""
+        self.predictor = DifficultyPredictor()
+        self.calls = []
+        
+        def rule(accuracy, reaction_time, attempts):
+            self.calls.append((accuracy, reaction_time, attempts))
+            return accuracy * 0.8 + 0.1
+        
+        self.predictor.tf_available = False
+        self.predictor.fallback_model = rule
+    
+    def test_cache_hits_skip_model(self):
+        """Test that repeated (quantized) inputs are answered from the cache."""
+        self.predictor.enable_cache(resolution=0.05, maxsize=8)
+        first = self.predictor.predict_difficulty(2 / 3, 5.0, 1)
+        second = self.predictor.predict_difficulty(0.66, 5.1, 1)
+        
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.calls), 1)
+        # The model is evaluated at the grid point, within half a step of the input
+        self.assertAlmostEqual(first, 2 / 3 * 0.8 + 0.1, delta=0.025 * 0.8)
+        
+        info = self.predictor.cache_info()
+        self.assertEqual(info['hits'], 1)
+        self.assertEqual(info['misses'], 1)
+        self.assertAlmostEqual(info['hit_rate'], 0.5)
+    
+    def test_lru_eviction_and_dense_table(self):
+        """Test the LRU bound and the dense lookup table."""
+        self.predictor.enable_cache(resolution=0.1, maxsize=2)
+        for accuracy in (0.0, 0.5, 1.0):
+            self.predictor.predict_difficulty(accuracy, 10.0, 1)
+        self.assertEqual(self.predictor.cache_info()['size'], 2)
+        
+        self.predictor.enable_cache(resolution=0.1, dense=True)
+        self.predictor.predict_difficulty(0.5, 10.0, 1)
+        self.predictor.predict_difficulty(0.5, 10.0, 1)
+        info = self.predictor.cache_info()
+        self.assertEqual((info['hits'], info['size'], info['maxsize']), (1, 1, 11 ** 3))
+    
+    def test_cache_cleared_when_model_swapped(self):
+        """Test that replacing the model discards memoized predictions."""
+        self.predictor.enable_cache(resolution=0.1)
+        self.assertAlmostEqual(self.predictor.predict_difficulty(1.0, 0.0, 1), 0.9)
+        
+        self.predictor.fallback_model = lambda accuracy, reaction_time, attempts: 0.2
+        self.assertEqual(self.predictor.cache_info()['size'], 0)
+        self.assertAlmostEqual(self.predictor.predict_difficulty(1.0, 0.0, 1), 0.2)
+
+class TestPredictionDeadline(unittest.TestCase):
+    """Test the latency budget and circuit breaker of network predictions."""
+    
+    def setUp(self):
+        """Set up a NumPy network whose predictions can be made slow."""
+        import time
+        from numpy_mlp import NumpyMLP
+        self.delay = 0.0
+        network = NumpyMLP(seed=1)
+        fast_predict = network.predict
+        
+        def predict(inputs, verbose=0):
+            time.sleep(self.delay)
+            return fast_predict(inputs)
+        
+        network.predict = predict
+        self.predictor = DifficultyPredictor(model=network)
+        self.rule = self.predictor.load_fallback_model()
+    
+    def test_slow_model_falls_back(self):
+        """Test that a prediction missing the budget returns the rule result and is not cached."""
+        self.predictor.enable_cache(resolution=0.5)
+        self.predictor.enable_deadline(budget_ms=20, failure_threshold=5)
+        self.delay = 0.2
+        difficulty = self.predictor.predict_difficulty(1.0, 10.0, 3)
+        self.assertAlmostEqual(difficulty, self.rule(1.0, 0.5, 1.0))
+        self.assertEqual(self.predictor.cache_info()['size'], 0)
+        
+        info = self.predictor.deadline_info()
+        self.assertEqual((info['calls'], info['misses'], info['state']), (1, 1, 'closed'))
+    
+    def test_circuit_opens_and_recovers(self):
+        """Test that repeated misses open the circuit and a timely probe closes it."""
+        import time
+        breaker = self.predictor.enable_deadline(budget_ms=20, failure_threshold=2, reset_timeout=0.3)
+        self.delay = 0.1
+        for _ in range(3):
+            self.predictor.predict_difficulty(0.5, 10.0, 1)
+        info = breaker.info()
+        self.assertEqual((info['state'], info['misses'], info['rejected'], info['opened']), ('open', 2, 1, 1))
+        
+        self.delay = 0.0
+        time.sleep(0.4)  # Let the late calls finish and the reset timeout pass
+        self.predictor.predict_difficulty(0.5, 10.0, 1)
+        self.assertEqual(breaker.info()['state'], 'closed')
+        self.assertEqual(breaker.info()['consecutive_failures'], 0)
+
+    def test_concurrent_calls_within_budget(self):
+        """Test that concurrent calls don't spend their budget queued behind each other."""
+        from concurrent.futures import ThreadPoolExecutor
+        breaker = self.predictor.enable_deadline(budget_ms=100, workers=8)
+        self.delay = 0.03
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda accuracy: self.predictor.predict_difficulty(accuracy, 10.0, 1),
+                              [i / 8 for i in range(8)]))
+        info = breaker.info()
+        self.assertEqual((info['calls'], info['misses'], info['state']), (8, 0, 'closed'))
+    
+    def test_late_queued_calls_are_cancelled(self):
+        """Test that calls still queued when they miss the budget never reach the model."""
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+        started = []
+        release = threading.Event()
+        breaker = CircuitBreaker(budget=0.02, failure_threshold=10, workers=1)
+        
+        def slow(value):
+            started.append(value)
+            release.wait(5)
+            return value
+        
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda value: breaker.call(slow, value), range(4)))
+        release.set()
+        breaker._executor.shutdown(wait=True)
+        self.assertEqual(results, [None] * 4)
+        self.assertEqual(len(started), 1)
+        self.assertEqual(breaker.info()['misses'], 4)
+
+class TestDifficultyTable(unittest.TestCase):
+    """Test the precompiled difficulty lookup table."""
+    
+    def setUp(self):
+        """Set up a predictor to compile."""
+        self.predictor = DifficultyPredictor()
+    
+    def test_table_matches_exact_model(self):
+        """Test that interpolated predictions stay within the error bound."""
+        from difficulty_table import build_difficulty_table
+        table = build_difficulty_table(self.predictor, error_bound=0.02)
+        self.assertLessEqual(table.max_error, 0.02)
+        
+        rng = np.random.default_rng(1)
+        for accuracy, reaction_time, attempts in zip(rng.random(200), rng.random(200) * 20,
+                                                     rng.integers(1, 4, 200)):
+            exact = self.predictor.predict_difficulty(accuracy, reaction_time, attempts)
+            approx = table.predict_difficulty(accuracy, reaction_time, attempts)
+            self.assertAlmostEqual(approx, exact, delta=0.02)
+    
+    def test_unreachable_error_bound(self):
+        """Test that an error bound the grid can't meet is reported."""
+        from difficulty_table import build_difficulty_table
+        with self.assertRaises(ValueError):
+            build_difficulty_table(self.predictor, error_bound=1e-9, max_points=9)
+    
+    def test_save_and_load_through_get_predictor(self):
+        """Test that a saved table is served by get_predictor without the model."""
+        import tempfile
+        from ai_module import get_predictor
+        from difficulty_table import build_difficulty_table, DifficultyTable
+        table = build_difficulty_table(self.predictor, error_bound=0.05)
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = table.save(os.path.join(tmp, 'table.npz'))
+            loaded = get_predictor(path)
+        
+        self.assertIsInstance(loaded, DifficultyTable)
+        self.assertAlmostEqual(loaded.max_error, table.max_error, places=6)
+        self.assertEqual(loaded.window, self.predictor.window)
+        self.assertAlmostEqual(loaded.predict_difficulty(0.5, 10.0, 2),
+                               table.predict_difficulty(0.5, 10.0, 2))
+
+class TestMultiPlayerEngine(unittest.TestCase):
+    """Test the vectorized multi-player engine."""
+    
+    def test_matches_individual_games(self):
+        """Test that a batch step gives the same results as stepping each TriviaGame."""
+        from engine import MultiPlayerEngine, parse_answers
+        rng = np.random.default_rng(5)
+        n_players, rounds = 25, 7
+        predictor = DifficultyPredictor()
+        bank = load_question_bank()
+        
+        games = [TriviaGame(f"P{i}") for i in range(n_players)]
+        handlers = [DataHandler(f"P{i}") for i in range(n_players)]
+        engine = MultiPlayerEngine(n_players)
+        
+        for round_num in range(1, rounds + 1):
+            questions = [dict(bank[j], difficulty=float(d)) for j, d in
+                         zip(rng.integers(0, len(bank), n_players), rng.choice([0.3, 0.6, 0.9, 0.25], n_players))]
+            answers = [str(a) for a in rng.choice(['1', '2', '3', '4', 'b', 'x', ''], n_players)]
+            reaction_times = rng.random(n_players) * 25
+            
+            for i, game in enumerate(games):
+                current_difficulty = game.get_current_difficulty()
+                correct, points = game.evaluate_answer(questions[i], answers[i], reaction_times[i])
+                game.update_score(points)
+                handlers[i].log_performance(round_num, current_difficulty, 1.0 if correct else 0.0,
+                                            reaction_times[i], 1)
+                game.adjust_difficulty(predictor.predict_difficulty(*handlers[i].get_average_metrics()))
+            
+            engine.step(predictor, parse_answers(answers),
+                        np.array([q['answer'] for q in questions]),
+                        np.array([q['difficulty'] for q in questions]),
+                        reaction_times)
+        
+        self.assertEqual(engine.score.tolist(), [game.get_score() for game in games])
+        for i, game in enumerate(games):
+            self.assertAlmostEqual(engine.difficulty[i], game.get_current_difficulty(), places=12)
+        self.assertTrue(np.all(engine.round_number == rounds))
+    
+    def test_predictions_go_through_the_cache(self):
+        """Test that batch predictions use the prediction cache and match predict_difficulty."""
+        from engine import MultiPlayerEngine
+        rng = np.random.default_rng(2)
+        predictor = DifficultyPredictor()
+        predictor.enable_cache(resolution=0.1)
+        engine = MultiPlayerEngine(40)
+        engine.record_rounds((rng.random(40) < 0.5).astype(np.float64), rng.random(40) * 25, np.ones(40),
+                             np.ones(40, dtype=bool))
+        predicted = engine.predict(predictor)
+        
+        expected = [predictor.predict_difficulty(*metrics) for metrics in zip(*engine.average_metrics())]
+        np.testing.assert_allclose(predicted, expected)
+        info = predictor.cache_info()
+        # The per-player calls found every grid point the batch stored
+        self.assertEqual(info['hits'], 40)
+        self.assertEqual(info['misses'], info['size'])
+        self.assertLess(info['size'], 40)
+    
+    def test_inactive_players_unchanged(self):
+        """Test that players outside the active mask keep their state."""
+        from engine import MultiPlayerEngine
+        engine = MultiPlayerEngine(3, initial_difficulty=0.5)
+        active = np.array([True, False, True])
+        correct, points, difficulty = engine.step(DifficultyPredictor(), np.array([0, 0, 1]), np.array([0, 0, 0]),
+                                                  np.full(3, 0.6), np.full(3, 2.0), active=active)
+        self.assertEqual(correct.tolist(), [True, True, False])
+        self.assertEqual(engine.score.tolist(), [points[0], 0, 0])
+        self.assertEqual(difficulty[1], 0.5)
+        self.assertEqual(engine.round_number.tolist(), [1, 0, 1])
+
+class TestBatchMode(unittest.TestCase):
+    """Test the scripted (non-interactive) CLI mode."""
+    
+    def test_parse_answer_script(self):
+        """Test parsing of scripted answers."""
+        from main import parse_answer_script
+        players = parse_answer_script(["# comment", "", "Ada,1,b:2.5,", "Bob"], default_reaction_time=4.0)
+        self.assertEqual(players, [("Ada", [("1", 4.0), ("b", 2.5), ("", 4.0)]), ("Bob", [])])
+        
+        with self.assertRaises(ValueError):
+            parse_answer_script(["Ada,1:fast"])
+    
+    @patch('time.sleep')
+    @patch('main.clear_screen')
+    def test_run_batch_without_screen_clears_or_sleeps(self, mock_clear, mock_sleep):
+        """Test that scripted games run without clearing the screen or pausing."""
+        from main import run_batch
+        script = ["Ada,1,2,3,4,1", "Bob,a,b,c", "Cy,1,1,1,1,1,1,1"]
+        
+        # Answers update the process-wide question weights, so each run gets a fresh index
+        with patch('builtins.print'):
+            with patch.dict('question_index._index_cache', clear=True):
+                results = run_batch(script, max_rounds=5, output='', seed=3)
+            with patch.dict('question_index._index_cache', clear=True):
+                again = run_batch(script, max_rounds=5, output='', seed=3)
+        
+        mock_clear.assert_not_called()
+        mock_sleep.assert_not_called()
+        self.assertEqual([(name, rounds) for name, _, rounds in results], [("Ada", 5), ("Bob", 3), ("Cy", 5)])
+        self.assertEqual(results, again)
+    
+    def test_scripted_game_updates_like_interactive_rounds(self):
+        """Test that scripted rounds feed the question weights and online policies."""
+        from main import play_scripted_game
+        from policies import EloPolicy
+        policy = EloPolicy()
+        answers = [("1", 3.0)] * 4 + [("", 3.0)]
+        with patch('game_logic.TriviaGame.record_answer', autospec=True) as record:
+            game, data_handler = play_scripted_game("Ada", answers, policy)
+        self.assertEqual(record.call_count, 4)  # Unanswered rounds don't count towards the weights
+        self.assertEqual(sum(count for _, count in policy.question_ratings.values()), 5)
+        self.assertNotEqual(game.get_current_difficulty(), 0.5)
+
+class TestSimulator(unittest.TestCase):
+    """Test the offline game simulator."""
+    
+    def test_player_model(self):
+        """Test that stronger players answer more often and never slower than the cap."""
+        from simulator import LogisticPlayer
+        weak, strong = LogisticPlayer(0.2), LogisticPlayer(0.8)
+        self.assertGreater(strong.answer_probability(0.6), weak.answer_probability(0.6))
+        self.assertGreaterEqual(weak.answer_probability(0.9), 0.25)
+        self.assertLessEqual(weak.reaction_time(0.9, 10.0), 20.0)
+    
+    def test_simulate_game_without_io(self):
+        """Test that a simulated game runs all rounds without prompting or sleeping."""
+        from simulator import LogisticPlayer, simulate_game
+        with patch('builtins.input') as mock_input, patch('time.sleep') as mock_sleep:
+            result = simulate_game(LogisticPlayer(0.7), DifficultyPredictor(), rounds=8,
+                                   rng=np.random.default_rng(3))
+        mock_input.assert_not_called()
+        mock_sleep.assert_not_called()
+        self.assertEqual(len(result['trajectory']), 8)
+        self.assertTrue(all(0.1 <= d <= 0.9 for d in result['trajectory']))
+        self.assertGreaterEqual(result['score'], 0)
+    
+    def test_simulation_uses_the_predictor_window(self):
+        """Test that both simulators average the metrics over the predictor's window."""
+        from engine import MultiPlayerEngine
+        from simulator import LogisticPlayer, simulate_game, run_chunk_vectorized
+        predictor = DifficultyPredictor()
+        predictor.window = 1
+        with patch.object(DataHandler, 'get_average_metrics', autospec=True,
+                          side_effect=DataHandler.get_average_metrics) as averages:
+            simulate_game(LogisticPlayer(0.5), predictor, rounds=3, rng=np.random.default_rng(0))
+        self.assertTrue(all(call.args[0].window == 1 for call in averages.call_args_list))
+        with patch('simulator.MultiPlayerEngine', wraps=MultiPlayerEngine) as engine:
+            run_chunk_vectorized(4, rounds=2, predictor=predictor)
+        self.assertEqual(engine.call_args.kwargs['window'], 1)
+    
+    def test_vectorized_chunks(self):
+        """Test that the vectorized simulation produces a full summary."""
+        from simulator import simulate_games
+        summary = simulate_games(50, rounds=4, workers=1, chunk_size=25, vectorized=True)
+        self.assertEqual(summary['games'], 50)
+        self.assertTrue(0.0 <= summary['mean_accuracy'] <= 1.0)
+        self.assertAlmostEqual(sum(summary['question_share'].values()), 1.0)
+    
+    def test_simulate_games_is_reproducible(self):
+        """Test that the same seed gives the same summary, in-process or in a pool."""
+        from simulator import simulate_games
+        first = simulate_games(60, rounds=5, workers=1, chunk_size=20, seed=7)
+        second = simulate_games(60, rounds=5, workers=2, chunk_size=20, seed=7)
+        self.assertEqual(first['games'], 60)
+        self.assertAlmostEqual(first['mean_score'], second['mean_score'])
+        self.assertAlmostEqual(sum(first['question_share'].values()), 1.0)
+        self.assertEqual(len(first['mean_difficulty_by_round']), 5)
+
+class TestReplay(unittest.TestCase):
+    """Test replaying archived performance logs."""
+    
+    class ConstantPredictor:
+        """Predictor that always returns the same difficulty."""
+        window = 3
+        
+        def __init__(self, value):
+            self.value = value
+        
+        def predict_difficulty(self, accuracy, reaction_time, attempts):
+            return self.value
+    
+    def setUp(self):
+        """Write a small archive to a temporary directory."""
+        import tempfile
+        self.tmp = tempfile.TemporaryDirectory()
+        handler = DataHandler("Ada")
+        for round_num, difficulty in enumerate([0.5, 0.3, 0.7], 1):
+            handler.log_performance(round_num, difficulty, 1.0, 4.0, 1)
+        other = DataHandler("Bob")
+        other.log_performance(1, 0.5, 0.0, 9.0, 1)
+        other.log_performance(2, 0.5, 0.0, 9.0, 1)
+        
+        handler.performance_data.to_csv(os.path.join(self.tmp.name, "Ada_performance_1.csv"), index=False)
+        combined = pd.concat([handler.performance_data.assign(player="Ada"),
+                              other.performance_data.assign(player="Bob")])
+        combined.to_csv(os.path.join(self.tmp.name, "batch_performance_2.csv"), index=False)
+    
+    def tearDown(self):
+        """Remove the temporary archive."""
+        self.tmp.cleanup()
+    
+    def test_read_rounds_groups_players(self):
+        """Test that single-player and combined logs are split per player."""
+        from replay import read_rounds
+        single = list(read_rounds(os.path.join(self.tmp.name, "Ada_performance_1.csv")))
+        combined = list(read_rounds(os.path.join(self.tmp.name, "batch_performance_2.csv")))
+        self.assertEqual([(name, len(rounds)) for name, rounds in single], [("Ada", 3)])
+        self.assertEqual([(name, len(rounds)) for name, rounds in combined], [("Ada", 3), ("Bob", 2)])
+    
+    def test_replay_against_recorded_difficulties(self):
+        """Test the divergence from the difficulties recorded in the logs."""
+        from replay import replay_file
+        stats = replay_file(os.path.join(self.tmp.name, "Ada_performance_1.csv"), self.ConstantPredictor(0.5))
+        # Recorded next difficulties are 0.3 and 0.7
+        self.assertEqual(stats['rounds'], 2)
+        self.assertAlmostEqual(stats['abs_diff_sum'], 0.4)
+        self.assertAlmostEqual(stats['max_abs_diff'], 0.2)
+        self.assertEqual(stats['label_changes'], 2)
+    
+    def test_replay_archive_against_baseline(self):
+        """Test that replaying a model against itself shows no divergence."""
+        from replay import replay_archive
+        with patch('replay.get_predictor', side_effect=lambda path=None: DifficultyPredictor()):
+            report = replay_archive(self.tmp.name, model_path='candidate', baseline_path='baseline', workers=1)
+        self.assertEqual(report['files'], 2)
+        self.assertEqual(report['players'], 3)
+        self.assertEqual(report['rounds'], 8)
+        self.assertEqual(report['mean_abs_diff'], 0.0)
+    
+    def test_replay_uses_the_predictor_window(self):
+        """Test that replays average the metrics over the window the model was trained on."""
+        from replay import replay_trajectory
+        predictor = self.ConstantPredictor(0.5)
+        predictor.window = 1
+        seen = []
+        predictor.predict_difficulty = lambda accuracy, reaction_time, attempts: seen.append(accuracy) or 0.5
+        rounds = [{'round': i, 'difficulty': 0.5, 'accuracy': accuracy, 'reaction_time': 4.0, 'attempts': 1}
+                  for i, accuracy in enumerate([1.0, 0.0, 0.0], 1)]
+        replay_trajectory("Ada", rounds, predictor)
+        self.assertEqual(seen, [1.0, 0.0, 0.0])
+
+class TestLeaderboard(unittest.TestCase):
+    """Test the SQLite leaderboard."""
+    
+    def setUp(self):
+        """Create an in-memory leaderboard with a small cache."""
+        self.board = Leaderboard(':memory:', top_n=3, batch_size=4)
+    
+    def tearDown(self):
+        """Close the leaderboard."""
+        self.board.close()
+    
+    def test_inserts_are_batched(self):
+        """Test that games are written once the batch is full."""
+        for score in range(3):
+            self.board.record_game("Ada", score, 'easy')
+        self.assertEqual(self.board._conn.execute("SELECT COUNT(*) FROM games").fetchone()[0], 0)
+        self.board.record_game("Ada", 3, 'easy')
+        self.assertEqual(self.board._conn.execute("SELECT COUNT(*) FROM games").fetchone()[0], 4)
+    
+    def test_cached_board_updated_incrementally(self):
+        """Test that a viewed board takes new games without querying again."""
+        for name, score in [("Ada", 300), ("Bob", 100), ("Cy", 200)]:
+            self.board.record_game(name, score, 'medium')
+        self.assertEqual([e['player_name'] for e in self.board.top()], ["Ada", "Cy", "Bob"])
+        
+        with patch.object(self.board, '_query', side_effect=AssertionError("board re-queried")):
+            self.board.record_game("Dee", 250, 'hard')
+            self.board.record_game("Eve", 50, 'hard')
+            top = self.board.top()
+        self.assertEqual([(e['rank'], e['player_name'], e['score']) for e in top],
+                         [(1, "Ada", 300), (2, "Dee", 250), (3, "Cy", 200)])
+    
+    def test_daily_and_difficulty_boards(self):
+        """Test the per-day and per-difficulty boards and larger uncached queries."""
+        from datetime import datetime
+        yesterday = datetime(2024, 5, 1, 12).timestamp()
+        today = datetime(2024, 5, 2, 12).timestamp()
+        self.board.record_game("Ada", 500, 'hard', played_at=yesterday)
+        self.board.record_game("Bob", 200, 'easy', played_at=today)
+        self.board.record_game("Cy", 300, 'hard', played_at=today)
+        
+        self.assertEqual([e['player_name'] for e in self.board.top('daily', '2024-05-02')], ["Cy", "Bob"])
+        self.assertEqual([e['player_name'] for e in self.board.top('difficulty', 'hard')], ["Ada", "Cy"])
+        for score in range(5):
+            self.board.record_game("Filler", score, 'easy', played_at=today)
+        self.assertEqual(len(self.board.top('global', n=8)), 8)
+        with self.assertRaises(ValueError):
+            self.board.top('difficulty', 'impossible')
+
+class TestQuestionIndex(unittest.TestCase):
+    """Test the seen-question bitsets and the question index."""
+    
+    def setUp(self):
+        """Set up a small question bank."""
+        self.bank = [{'id': i, 'difficulty': label, 'options': []}
+                     for i, label in enumerate(['easy', 'easy', 'medium', 'hard', 'hard'], 1)]
+    
+    def test_bitset_behaves_like_a_set(self):
+        """Test membership, length, iteration and comparison with sets."""
+        from question_index import QuestionBitset
+        seen = QuestionBitset([3, 70, 5])
+        seen.add(5)
+        self.assertIn(70, seen)
+        self.assertNotIn(4, seen)
+        self.assertEqual(len(seen), 3)
+        self.assertEqual(list(seen), [3, 5, 70])
+        self.assertEqual(seen, {3, 5, 70})
+        seen.discard(70)
+        self.assertEqual(seen, {3, 5})
+    
+    def test_serialization_stays_compact(self):
+        """Test that serialized sets round-trip and stay small."""
+        from question_index import QuestionBitset
+        self.assertEqual(QuestionBitset().serialize(), '')
+        self.assertEqual(QuestionBitset.deserialize([1, 2]), {1, 2})
+        
+        many = QuestionBitset(range(1, 20001))
+        sparse = QuestionBitset([7, 50000])
+        for seen in (many, sparse):
+            encoded = seen.serialize()
+            self.assertEqual(QuestionBitset.deserialize(encoded), seen)
+        self.assertLess(len(many.serialize()), 200)
+        self.assertLess(len(sparse.serialize()), 100)
+    
+    def test_unseen_queries_and_selection(self):
+        """Test per-difficulty unseen queries and the select fallbacks."""
+        from question_index import QuestionBitset, QuestionIndex
+        index = QuestionIndex(self.bank)
+        seen = QuestionBitset([1, 4])
+        self.assertEqual([q['id'] for q in index.unseen('easy', seen)], [2])
+        self.assertEqual(index.count_unseen('hard', seen), 1)
+        
+        question, relaxed = index.select('easy', seen)
+        self.assertEqual((question['id'], relaxed), (2, False))
+        question, relaxed = index.select('easy', seen)
+        self.assertTrue(relaxed)
+        self.assertIn(question['id'], [3, 5])
+        
+        # Once everything has been seen the player starts over
+        seen.update([3, 5])
+        question, _ = index.select('hard', seen)
+        self.assertEqual(seen, {question['id']})
+    
+    def test_select_nearest_widens_tolerance(self):
+        """Test that the closest unseen numeric difficulty is picked first."""
+        from question_index import QuestionBitset, QuestionIndex
+        bank = [{'id': i, 'difficulty': d} for i, d in enumerate([0.1, 0.32, 0.35, 0.5, 0.9], 1)]
+        index = QuestionIndex(bank)
+        self.assertEqual(index.sorted_difficulties, [0.1, 0.32, 0.35, 0.5, 0.9])
+        
+        seen = QuestionBitset()
+        question, relaxed = index.select_nearest(0.34, seen, tolerance=0.02)
+        self.assertIn(question['id'], [2, 3])
+        self.assertFalse(relaxed)
+        index.select_nearest(0.34, seen, tolerance=0.02)
+        self.assertEqual(seen, {2, 3})
+        
+        # Nothing left near 0.34: the window widens to the next closest question
+        question, relaxed = index.select_nearest(0.34, seen, tolerance=0.02)
+        self.assertEqual((question['id'], relaxed), (4, True))
+        
+        # After the whole bank the player starts over
+        seen.update([1, 5])
+        question, _ = index.select_nearest(0.9, seen)
+        self.assertEqual(seen, {5})
+    
+    def test_fenwick_tree_sums_and_sampling(self):
+        """Test prefix sums, updates and range sampling of the Fenwick tree."""
+        import random
+        from question_index import FenwickTree
+        weights = [3.0, 0.0, 1.0, 2.0, 5.0, 1.0, 0.5]
+        tree = FenwickTree(weights)
+        tree.set(4, 2.0)
+        tree.add(1, 1.5)
+        weights[4], weights[1] = 2.0, 1.5
+        for stop in range(len(weights) + 1):
+            self.assertAlmostEqual(tree.prefix_sum(stop), sum(weights[:stop]))
+        self.assertEqual(tree.find(0.0), 0)
+        self.assertEqual(tree.find(3.2), 1)
+        self.assertEqual(tree.find(100.0), len(weights) - 1)
+        
+        rng = random.Random(0)
+        draws = [tree.sample(2, 5, rng) for _ in range(5000)]
+        self.assertEqual(set(draws), {2, 3, 4})
+        # Weights 1, 2, 2 within the range
+        self.assertAlmostEqual(draws.count(2) / len(draws), 0.2, delta=0.03)
+        tree.set(3, 0.0)
+        tree.set(4, 0.0)
+        self.assertEqual({tree.sample(2, 5, rng) for _ in range(100)}, {2})
+    
+    def test_answers_shift_draw_weights(self):
+        """Test that questions everyone answers correctly are drawn less often."""
+        import random
+        from question_index import QuestionBitset, QuestionIndex, MIN_WEIGHT
+        bank = [{'id': i, 'difficulty': 0.5} for i in range(1, 5)]
+        index = QuestionIndex(bank)
+        for _ in range(50):
+            index.record_answer(1, True)
+        self.assertAlmostEqual(index.weights.weights[index.positions[1]], MIN_WEIGHT)
+        index.set_weight(2, 0.0)
+        
+        rng = random.Random(1)
+        draws = [index.select_nearest(0.5, QuestionBitset(), rng)[0]['id'] for _ in range(3000)]
+        self.assertNotIn(2, draws)
+        self.assertLess(draws.count(1), draws.count(3) / 5)
+        
+        # A weightless question is still used once nothing else is left
+        question, _ = index.select_nearest(0.5, QuestionBitset([1, 3, 4]), rng)
+        self.assertEqual(question['id'], 2)
+    
+    def test_labels_map_to_their_bands(self):
+        """Test that labelled banks keep the label a predicted difficulty falls in."""
+        from game_logic import convert_difficulty_value_to_label
+        from question_index import QuestionBitset, QuestionIndex
+        index = QuestionIndex(self.bank)
+        for target in (0.1, 0.25, 0.35, 0.55, 0.65, 0.9):
+            question, _ = index.select_nearest(target, QuestionBitset())
+            self.assertEqual(question['difficulty'], convert_difficulty_value_to_label(target))
+    
+    def test_mostly_seen_window_scan_is_bounded(self):
+        """Test that a nearly exhausted window is not scanned in full to find what is left."""
+        import random
+        from question_index import QuestionBitset, QuestionIndex, _SAMPLE_ATTEMPTS, _SCAN_LIMIT
+        
+        class CountingList(list):
+            checks = 0
+            
+            def __getitem__(self, position):
+                CountingList.checks += 1
+                return super().__getitem__(position)
+        
+        bank = [{'id': i, 'difficulty': 0.5} for i in range(1, 5001)]
+        index = QuestionIndex(bank)
+        rng = random.Random(3)
+        seen = QuestionBitset(range(1, 4998))
+        unseen = index._unseen_tree(seen)
+        unseen.weights = CountingList(unseen.weights)
+        index._random_unseen_between(0.45, 0.55, unseen, rng)
+        self.assertGreater(CountingList.checks, 0)
+        self.assertLessEqual(CountingList.checks, _SAMPLE_ATTEMPTS + _SCAN_LIMIT)
+        
+        # select_nearest still hands out every remaining question
+        picked = {index.select_nearest(0.5, seen, rng)[0]['id'] for _ in range(3)}
+        self.assertEqual(picked, {4998, 4999, 5000})
+    
+    def test_nearest_unseen_matches_a_linear_walk(self):
+        """Test the unseen tree against a scan, including sets changed outside select_nearest."""
+        import random
+        from question_index import QuestionBitset, QuestionIndex
+        rng = random.Random(5)
+        bank = [{'id': i, 'difficulty': round(rng.uniform(0.1, 0.9), 2)} for i in range(300)]
+        index = QuestionIndex(bank)
+        
+        def linear(target, seen):
+            unseen = [p for p, question_id in enumerate(index.sorted_ids) if question_id not in seen]
+            return min(unseen, key=lambda p: (abs(index.sorted_difficulties[p] - target), p), default=None)
+        
+        seen = QuestionBitset(rng.sample(range(300), 200))
+        for _ in range(150):
+            target = rng.uniform(0.05, 0.95)
+            expected = linear(target, seen)
+            position = index._nearest_unseen(target, index._unseen_tree(seen))
+            self.assertEqual(index.sorted_difficulties[position], index.sorted_difficulties[expected])
+            # Changes made directly to the set, or to a copy, are picked up
+            seen.add(rng.randrange(300))
+            seen.discard(rng.randrange(300))
+            copy = seen.copy()
+            copy.add(index.sorted_ids[position])
+            index.select_nearest(target, copy, rng)
+        seen.update(range(300))
+        self.assertIsNone(index._nearest_unseen(0.5, index._unseen_tree(seen)))
+    
+    def test_label_window_stays_in_band(self):
+        """Test that targets near a band edge never draw the neighbouring label."""
+        import random
+        from game_logic import convert_difficulty_value_to_label
+        from question_index import QuestionBitset, QuestionIndex
+        index = QuestionIndex(self.bank)
+        rng = random.Random(0)
+        for step in range(10, 91):
+            target = step / 100
+            labels = {index.select_nearest(target, QuestionBitset(), rng)[0]['difficulty'] for _ in range(20)}
+            self.assertEqual(labels, {convert_difficulty_value_to_label(target)}, target)
+    
+    def test_default_bank_uses_numeric_difficulties(self):
+        """Test that the built-in fallback bank keeps its fine-grained difficulties."""
+        from question_index import QuestionBitset, QuestionIndex
+        bank = load_question_bank('missing_question_bank.json')
+        self.assertGreater(len(bank), 3)
+        self.assertTrue(all(isinstance(question['difficulty'], float) for question in bank))
+        question, relaxed = QuestionIndex(bank).select_nearest(0.2, QuestionBitset(), tolerance=0.01)
+        self.assertEqual((question['difficulty'], relaxed), (0.2, False))
+
+class TestCalibration(unittest.TestCase):
+    """Test the item response calibration of question difficulties."""
+    
+    def simulate_answers(self, n_players=300, n_answers=20000, seed=0):
+        """Draw answers of players with known abilities to questions with known difficulties."""
+        rng = np.random.default_rng(seed)
+        ability = rng.normal(0, 1, n_players)
+        difficulty = np.array([-1.5, -0.5, 0.5, 1.5])
+        players = rng.integers(0, n_players, n_answers)
+        questions = rng.integers(0, len(difficulty), n_answers)
+        correct = rng.random(n_answers) < 1 / (1 + np.exp(difficulty[questions] - ability[players]))
+        return players, questions, correct, difficulty
+    
+    def test_fit_recovers_difficulties(self):
+        """Test that the fitted difficulties match the simulated ones, in-process and chunked in workers."""
+        from calibration import fit_rasch
+        players, questions, correct, difficulty = self.simulate_answers()
+        fit = fit_rasch(players, questions, correct, 300, 4)
+        self.assertTrue(fit['converged'])
+        np.testing.assert_allclose(fit['difficulty'], difficulty, atol=0.2)
+        
+        parallel = fit_rasch(players, questions, correct, 300, 4, workers=2, chunk_size=5000)
+        np.testing.assert_allclose(parallel['difficulty'], fit['difficulty'], atol=1e-6)
+    
+    def test_run_calibration_writes_bank(self):
+        """Test the pipeline from performance logs to a calibrated question bank."""
+        import tempfile
+        from calibration import run_calibration
+        players, questions, correct, _ = self.simulate_answers(n_players=50, n_answers=4000)
+        with tempfile.TemporaryDirectory() as tmp:
+            for player in range(50):
+                handler = DataHandler(f"P{player}")
+                for round_num, (question, answer) in enumerate(zip(questions[players == player],
+                                                                   correct[players == player]), 1):
+                    handler.log_performance(round_num, 0.5, float(answer), 5.0, 1, int(question) + 1)
+                handler.performance_data.to_csv(os.path.join(tmp, f"P{player}_performance_1.csv"), index=False)
+            # Logs from before question IDs were recorded are ignored
+            with open(os.path.join(tmp, "Old_performance_1.csv"), 'w') as f:
+                f.write("round,difficulty,accuracy,reaction_time,attempts,timestamp\n1,0.5,1.0,3.0,1,x\n")
+            
+            bank_path = os.path.join(tmp, 'bank.json')
+            bank = [{'id': i, 'text': f"Q{i}", 'options': ['a', 'b', 'c', 'd'], 'answer': 0, 'difficulty': 'medium'}
+                    for i in range(1, 6)]
+            with open(bank_path, 'w') as f:
+                json.dump(bank, f)
+            
+            summary = run_calibration(tmp, bank_path, workers=1, min_responses=20)
+            calibrated = load_question_bank(bank_path)
+        
+        self.assertEqual(summary['responses'], 4000)
+        self.assertEqual(summary['calibrated'], 4)
+        values = [q['calibrated_difficulty'] for q in calibrated[:4]]
+        self.assertEqual(values, sorted(values))
+        self.assertEqual(calibrated[0]['difficulty'], 'easy')
+        self.assertEqual(calibrated[3]['difficulty'], 'hard')
+        self.assertNotIn('calibrated_difficulty', calibrated[4])
+
+class TestPlayerStore(unittest.TestCase):
+    """Test the persistent player profiles."""
+    
+    def setUp(self):
+        """Create a store in a temporary directory."""
+        import tempfile
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, 'players.db')
+        self.store = PlayerStore(self.db_path, cache_size=2)
+        self.rounds = [{'accuracy': 1.0, 'reaction_time': 4.0, 'attempts': 1},
+                       {'accuracy': 0.0, 'reaction_time': 9.0, 'attempts': 1}]
+    
+    def tearDown(self):
+        """Close the store and remove the database."""
+        self.store.close()
+        self.tmp.cleanup()
+    
+    def test_record_game_updates_rolling_stats(self):
+        """Test that games are folded into the profile and persisted."""
+        self.assertIsNone(self.store.get("Ada"))
+        self.store.record_game("Ada", self.rounds, 0.7, 400)
+        profile = self.store.record_game("Ada", self.rounds[:1], 0.8, 300)
+        
+        self.assertEqual(profile['games_played'], 2)
+        self.assertEqual(profile['rounds_played'], 3)
+        self.assertEqual(profile['best_score'], 400)
+        self.assertEqual(profile['last_difficulty'], 0.8)
+        self.assertAlmostEqual(profile['avg_accuracy'], 0.8 + 0.2 * (1.0 - 0.8))
+        
+        reopened = PlayerStore(self.db_path)
+        self.assertEqual(reopened.get("Ada"), profile)
+        reopened.close()
+    
+    def test_lru_cache_avoids_database(self):
+        """Test that cached profiles are served without a query and old ones are evicted."""
+        for name in ("Ada", "Bob", "Cy"):
+            self.store.record_game(name, self.rounds, 0.5, 100)
+        self.assertEqual(self.store.cache_info()['size'], 2)
+        
+        misses = self.store.misses
+        self.assertEqual(self.store.get("Cy")['player_name'], "Cy")
+        self.assertEqual(self.store.misses, misses)
+        self.assertEqual(self.store.get("Ada")['player_name'], "Ada")
+        self.assertEqual(self.store.misses, misses + 1)
+    
+    def test_warm_start(self):
+        """Test that a profile sets the starting difficulty and baseline metrics."""
+        from player_store import warm_start_metrics
+        profile = self.store.record_game("Ada", self.rounds, 0.75, 100)
+        game = TriviaGame("Ada", profile['last_difficulty'])
+        handler = DataHandler("Ada", warm_start_metrics(profile))
+        
+        self.assertEqual(game.get_current_difficulty(), 0.75)
+        self.assertEqual(handler.get_average_metrics(),
+                         (profile['avg_accuracy'], profile['avg_reaction_time'], profile['avg_attempts']))
+        self.assertEqual(DataHandler("New", warm_start_metrics(None)).get_average_metrics(), (0.5, 10.0, 1.0))
+    
+    def test_warm_start_blends_into_first_rounds(self):
+        """Test that a returning player's history still counts after their first answers."""
+        baseline = (1.0, 4.0, 1.0)
+        returning = DataHandler("Ada", baseline)
+        new = DataHandler("New")
+        predictor = DifficultyPredictor(backend='rules')
+        
+        # The prefetch's estimate matches the average once the round is logged
+        expected = returning.get_average_metrics_with(0.0, 10.0, 1)
+        for handler in (returning, new):
+            handler.log_performance(1, 0.5, 0.0, 10.0, 1)
+        self.assertEqual(returning.get_average_metrics(), expected)
+        
+        # Two of the three rounds of the window are still the baseline
+        accuracy, reaction_time, _ = returning.get_average_metrics()
+        self.assertAlmostEqual(accuracy, 2 / 3)
+        self.assertAlmostEqual(reaction_time, 6.0)
+        self.assertEqual(new.get_average_metrics(), (0.0, 10.0, 1.0))
+        self.assertGreater(predictor.predict_difficulty(*returning.get_average_metrics()),
+                           predictor.predict_difficulty(*new.get_average_metrics()))
+        
+        # Once the window is full of played rounds the baseline is gone
+        for round_num in (2, 3):
+            returning.log_performance(round_num, 0.5, 0.0, 10.0, 1)
+        self.assertEqual(returning.get_average_metrics(), (0.0, 10.0, 1.0))
+
+class TestEloPolicy(unittest.TestCase):
+    """Test the online rating policy."""
+    
+    def setUp(self):
+        """Create a policy with no rated questions."""
+        from policies import EloPolicy
+        self.policy = EloPolicy()
+    
+    def test_answers_move_player_and_question_apart(self):
+        """Test that a correct answer raises the player and lowers the question."""
+        player = self.policy.for_player(0.5)
+        raised = player.record_answer(7, 0.5, True)
+        self.assertGreater(raised, 0.5)
+        self.assertLess(self.policy.question_rating(7, 0.5), 0.5)
+        self.assertEqual(self.policy.question_ratings[7][1], 1)
+        
+        lowered = player.record_answer(8, 0.5, False)
+        self.assertLess(lowered, raised)
+        self.assertEqual(player.predict_difficulty(0.0, 20.0, 3), lowered)
+        self.assertEqual(self.policy.question_rating(99, 0.3), 0.3)
+    
+    def test_preview_matches_record_and_factory(self):
+        """Test that a preview changes nothing and get_predictor builds the policies."""
+        from ai_module import get_predictor
+        from policies import EloPolicy
+        player = self.policy.for_player(0.6)
+        preview = player.preview_answer(3, 0.4, False)
+        self.assertEqual(player.rating, 0.6)
+        self.assertEqual(self.policy.question_ratings, {})
+        self.assertEqual(player.record_answer(3, 0.4, False), preview)
+        
+        self.assertIsInstance(get_predictor(policy='elo'), EloPolicy)
+        predictor = get_predictor()
+        self.assertIs(predictor.for_player(0.6), predictor)
+        self.assertIsNone(predictor.record_answer(3, 0.4, False))
+        with self.assertRaises(ValueError):
+            get_predictor(policy='magic')
+    
+    def test_policy_interface_is_enforced(self):
+        """Test that policies must implement predict_difficulty and the shared Elo policy rejects it."""
+        import threading
+        from policies import DifficultyPolicy
+        
+        class Incomplete(DifficultyPolicy):
+            pass
+        
+        with self.assertRaises(TypeError):
+            Incomplete()
+        with self.assertRaisesRegex(TypeError, 'for_player'):
+            self.policy.predict_difficulty(0.5, 10.0, 1)
+        
+        # Question ratings are read under the lock that updates them
+        player = self.policy.for_player(0.5)
+        self.policy.question_ratings[7] = [0.4, 1]
+        with self.policy._lock:
+            reader = threading.Thread(target=player.preview_answer, args=(7, 0.4, True))
+            reader.start()
+            reader.join(0.1)
+            self.assertTrue(reader.is_alive())
+        reader.join()
+    
+    def test_benchmark_against_nn_policy(self):
+        """Test that both policies are timed and the ratings follow the players' skill."""
+        from simulator import benchmark_policies, simulate_games
+        results = benchmark_policies(200, rounds=8, seed=1)
+        self.assertEqual(set(results), {'nn', 'elo'})
+        for summary in results.values():
+            self.assertGreater(summary['mean_decision_us'], 0.0)
+            self.assertEqual(len(summary['tracking_error_by_round']), 8)
+        elo = results['elo']['tracking_error_by_round']
+        self.assertLess(elo[-1], elo[0])
+        with self.assertRaises(ValueError):
+            simulate_games(10, rounds=2, workers=1, vectorized=True, policy='elo')
+
+class TestNumpyMLP(unittest.TestCase):
+    """Test the NumPy training backend of the difficulty network."""
+    
+    def test_gradients_match_finite_differences(self):
+        """Test the backward pass against numerical derivatives of the loss."""
+        from numpy_mlp import NumpyMLP
+        model = NumpyMLP(seed=1)
+        rng = np.random.default_rng(0)
+        x, y = rng.random((6, 3)), rng.random((6, 1))
+        activations = model._forward(x)
+        gradients = model._backward(activations, 2.0 * (activations[-1] - y) / y.size)
+        
+        loss = lambda: float(((model.predict(x) - y) ** 2).mean())
+        for weight, gradient in zip(model.weights, gradients):
+            index = np.unravel_index(np.argmax(np.abs(gradient)), weight.shape)
+            original = weight[index]
+            weight[index] = original + 1e-6
+            upper = loss()
+            weight[index] = original - 1e-6
+            lower = loss()
+            weight[index] = original
+            self.assertAlmostEqual(gradient[index], (upper - lower) / 2e-6, places=6)
+    
+    def test_fit_reduces_loss(self):
+        """Test that Adam training fits a simple target."""
+        from numpy_mlp import NumpyMLP
+        rng = np.random.default_rng(2)
+        x = rng.random((500, 3))
+        y = (0.2 + 0.6 * x[:, :1]) * (1 - 0.3 * x[:, 1:2])
+        history = NumpyMLP(seed=3).fit(x, y, epochs=30, batch_size=32)
+        self.assertEqual(len(history['loss']), 30)
+        self.assertLess(history['loss'][-1], history['loss'][0] / 5)
+    
+    def test_predictor_backend_round_trip(self):
+        """Test that a NumPy-trained predictor saves weights that get_predictor loads."""
+        import tempfile
+        from ai_module import get_predictor
+        predictor = DifficultyPredictor(backend='numpy')
+        self.assertEqual(predictor.backend, 'numpy')
+        self.assertGreater(predictor.predict_difficulty(1.0, 2.0, 1), predictor.predict_difficulty(0.0, 18.0, 3))
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = predictor.save_weights(os.path.join(tmp, 'network.weights.npz'))
+            loaded = get_predictor(path)
+        self.assertIsInstance(loaded, DifficultyPredictor)
+        self.assertEqual(loaded.backend, 'numpy')
+        self.assertAlmostEqual(loaded.predict_difficulty(0.7, 5.0, 1), predictor.predict_difficulty(0.7, 5.0, 1))
+        with self.assertRaises(ValueError):
+            DifficultyPredictor(backend='torch')
+
+class TestModelSearch(unittest.TestCase):
+    """Test the hyperparameter and architecture search."""
+    
+    def test_pareto_front(self):
+        """Test that dominated configurations are dropped and the budget is respected."""
+        from model_search import pareto_front, choose_best
+        results = [{'name': 'small', 'tracking_error': 0.20, 'latency_us': 5.0},
+                   {'name': 'large', 'tracking_error': 0.10, 'latency_us': 20.0},
+                   {'name': 'worse', 'tracking_error': 0.25, 'latency_us': 25.0},
+                   {'name': 'tied', 'tracking_error': 0.20, 'latency_us': 6.0}]
+        front = pareto_front(results)
+        self.assertEqual([result['name'] for result in front], ['large', 'small'])
+        self.assertEqual(choose_best(front)['name'], 'large')
+        self.assertEqual(choose_best(front, max_latency_us=10.0)['name'], 'small')
+        self.assertEqual(choose_best(front, max_latency_us=1.0)['name'], 'large')
+    
+    def test_search_saves_best_artifact(self):
+        """Test that a small search writes a loadable network and a report."""
+        import tempfile
+        from ai_module import get_predictor
+        from model_search import build_configs, run_search
+        configs = build_configs([(4,), (8, 4)], epochs=[5], windows=[1, 3])
+        self.assertEqual(len(configs), 4)
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, 'best.weights.npz')
+            report = run_search(configs, workers=1, n_samples=200, n_games=20, rounds=4, output=output)
+            self.assertTrue(os.path.exists(os.path.join(tmp, 'best.search.json')))
+            loaded = get_predictor(report['artifact'])
+        
+        self.assertIn(report['best'], report['pareto_front'])
+        self.assertEqual(len(report['results']), 4)
+        self.assertTrue(all(result['latency_us'] > 0 for result in report['results']))
+        self.assertEqual(loaded.model.layer_sizes, (3, *report['best']['config']['hidden'], 1))
+        # The game averages the metrics over the window the network was chosen for
+        self.assertEqual(loaded.window, report['best']['config']['window'])
+
+class TestShadowEvaluator(unittest.TestCase):
+    """Test the shadow evaluation of candidate predictors."""
+    
+    def test_divergence_stats(self):
+        """Test that candidates are compared with the live difficulty in the background."""
+        from shadow import ShadowEvaluator
+        constant = MagicMock()
+        constant.predict_difficulty.return_value = 0.8
+        evaluator = ShadowEvaluator({'constant': constant, 'rules': DifficultyPredictor(backend='rules')})
+        self.assertTrue(evaluator.submit(1.0, 5.0, 1, 0.75))
+        self.assertTrue(evaluator.submit(0.0, 15.0, 2, 0.2))
+        evaluator.close()
+        
+        stats = evaluator.stats()
+        self.assertEqual(stats['submitted'], 2)
+        self.assertEqual(stats['dropped'], 0)
+        self.assertEqual(stats['candidates']['constant']['samples'], 2)
+        self.assertAlmostEqual(stats['candidates']['constant']['mean_abs_diff'], (0.05 + 0.6) / 2)
+        self.assertAlmostEqual(stats['candidates']['constant']['max_abs_diff'], 0.6)
+        self.assertEqual(stats['candidates']['constant']['label_change_rate'], 0.5)
+        self.assertEqual(stats['candidates']['rules']['samples'], 2)
+        constant.predict_difficulty.assert_called_with(0.0, 15.0, 2)
+    
+    def test_full_queue_drops_instead_of_blocking(self):
+        """Test that submitting to a full queue returns at once and counts the drop."""
+        import threading
+        from shadow import ShadowEvaluator, parse_shadow_models
+        release = threading.Event()
+        slow = MagicMock()
+        slow.predict_difficulty.side_effect = lambda *args: release.wait(5) and 0.5
+        evaluator = ShadowEvaluator({'slow': slow}, maxsize=2)
+        
+        results = [evaluator.submit(0.5, 10.0, 1, 0.5) for _ in range(10)]
+        self.assertIn(False, results)
+        self.assertEqual(evaluator.stats()['dropped'], results.count(False))
+        self.assertLessEqual(results.count(True), 3)  # The queue plus the sample being evaluated
+        release.set()
+        evaluator.close()
+        self.assertEqual(evaluator.stats()['candidates']['slow']['samples'], results.count(True))
+        
+        self.assertEqual(parse_shadow_models("small=models/a.weights.npz, models/b.npz,"),
+                         {'small': 'models/a.weights.npz', 'models/b.npz': 'models/b.npz'})
+    
+    @unittest.skipUnless(hasattr(os, 'fork'), "needs os.fork")
+    def test_forked_worker_evaluates_its_samples(self):
+        """Test that a process forked after the evaluator was created runs its own worker thread."""
+        import time
+        from shadow import ShadowEvaluator
+        evaluator = ShadowEvaluator({'rules': DifficultyPredictor(backend='rules')})
+        self.assertIsNone(evaluator._worker)  # Nothing runs until the first sample
+        evaluator.submit(1.0, 5.0, 1, 0.5)
+        evaluator.join()
+        
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            # Child, like a gunicorn worker: the parent's thread doesn't exist here
+            try:
+                os.close(read_fd)
+                for _ in range(3):
+                    evaluator.submit(0.5, 10.0, 1, 0.5)
+                deadline = time.time() + 5
+                while evaluator.stats()['candidates']['rules']['samples'] < 4 and time.time() < deadline:
+                    time.sleep(0.01)
+                os.write(write_fd, str(evaluator.stats()['candidates']['rules']['samples']).encode())
+            finally:
+                os._exit(0)
+        os.close(write_fd)
+        with os.fdopen(read_fd) as reader:
+            child_samples = reader.read()
+        os.waitpid(pid, 0)
+        evaluator.close()
+        
+        self.assertEqual(child_samples, '4')  # The parent's sample plus the child's three
+        self.assertEqual(evaluator.stats()['candidates']['rules']['samples'], 1)
+
+class TestInferenceService(unittest.TestCase):
+    """Test predictions served by inference worker processes."""
+    
+    @classmethod
+    def setUpClass(cls):
+        import tempfile
+        from numpy_mlp import NumpyMLP
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.model_path = os.path.join(cls.tmpdir.name, 'model.weights.npz')
+        NumpyMLP(seed=1).save_weights(cls.model_path)
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+    
+    def test_matches_local_predictor(self):
+        """Test that the remote predictor returns what the model returns in-process."""
+        from inference_service import RemotePredictor
+        local = DifficultyPredictor(self.model_path)
+        remote = RemotePredictor(self.model_path)
+        try:
+            remote.start()
+            for metrics in [(1.0, 2.0, 1), (0.0, 25.0, 3), (0.5, 10.0, 2)]:
+                self.assertAlmostEqual(remote.predict_difficulty(*metrics), local.predict_difficulty(*metrics))
+            inputs = np.array([[0.2, 0.4, 0.6], [0.9, 0.1, 0.3]])
+            np.testing.assert_allclose(remote.predict_normalized_batch(inputs),
+                                       local.predict_normalized_batch(inputs))
+        finally:
+            remote.close()
+    
+    def test_concurrent_requests_are_batched(self):
+        """Test that requests waiting together reach the worker as one batch."""
+        from inference_service import InferenceService
+        service = InferenceService(self.model_path, max_batch=64, max_wait=0.05)
+        try:
+            futures = [service.submit([[i / 20, 0.5, 0.5]]) for i in range(20)]
+            results = [future.result(5) for future in futures]
+            self.assertTrue(all(result.shape == (1,) for result in results))
+            stats = service.stats()
+            self.assertEqual(stats['requests'], 20)
+            self.assertLess(stats['batches'], 20)
+        finally:
+            service.close()
+        
+        with self.assertRaises(RuntimeError):
+            service.submit([[0.5, 0.5, 0.5]]).result(1)
+    
+    def test_falls_back_to_rule_when_late(self):
+        """Test that a prediction that misses the timeout comes from the rule-based fallback."""
+        from ai_module import rule_difficulty
+        from inference_service import RemotePredictor
+        remote = RemotePredictor(self.model_path, max_wait=0.5, timeout=0.01)
+        try:
+            remote.start()
+            self.assertEqual(remote.predict_difficulty(0.8, 4.0, 1), rule_difficulty(0.8, 4.0 / 20, 1 / 3))
+            self.assertEqual(remote.fallbacks, 1)
+        finally:
+            remote.close()
+    
+    def test_dead_worker_is_restarted(self):
+        """Test that a worker that dies fails its batches and is replaced."""
+        import time
+        from inference_service import InferenceService
+        service = InferenceService(self.model_path)
+        try:
+            service._processes[0].kill()
+            deadline = time.time() + 60
+            while service.stats()['restarts'] < 1 and time.time() < deadline:
+                time.sleep(0.05)
+            self.assertEqual(service.stats()['restarts'], 1)
+            self.assertEqual(service.submit([[0.5, 0.5, 0.5]]).result(5).shape, (1,))
+            self.assertEqual(service.stats()['workers'], 1)
+        finally:
+            service.close()
+    
+    def test_idle_worker_restart_is_queued_once(self):
+        """Test that a worker that dies while idle isn't handed two batches at once afterwards."""
+        import time
+        from inference_service import InferenceService
+        service = InferenceService(self.model_path, workers=2)
+        try:
+            service._processes[1].kill()
+            deadline = time.time() + 60
+            while service.stats()['restarts'] < 1 and time.time() < deadline:
+                time.sleep(0.05)
+            self.assertEqual(service.stats()['restarts'], 1)
+            self.assertEqual(service._idle.qsize(), 2)
+            futures = [service.submit([[i / 10, 0.5, 0.5]]) for i in range(10)]
+            self.assertTrue(all(future.result(5).shape == (1,) for future in futures))
+            self.assertEqual(service._idle.qsize(), 2)
+        finally:
+            service.close()
+
+class TestRooms(unittest.TestCase):
+    """Test multiplayer rooms and their event broadcast."""
+    
+    def test_batch_scoring_matches_single_player(self):
+        """Test that a round is scored like TriviaGame.evaluate_answer and only score changes are broadcast."""
+        from rooms import Room
+        room = Room('test', rounds=2, answer_seconds=None)
+        players = [room.join(name) for name in ('ann', 'bob', 'cy')]
+        with self.assertRaises(ValueError):
+            room.join('bob')
+        
+        question = room.start_round()
+        right = str(question['answer'] + 1)
+        wrong = str((question['answer'] + 1) % len(question['options']) + 1)
+        answers = [(players[0], right, 2.0), (players[1], wrong, 3.0), (players[2], right, 12.0)]
+        for player_id, answer, reaction_time in answers[:2]:
+            self.assertTrue(room.submit(player_id, question['id'], answer, room.question_time + reaction_time))
+        self.assertFalse(room.submit(players[0], question['id'], wrong))  # Only the first answer counts
+        self.assertEqual(room.state, 'question')
+        room.submit(players[2], question['id'], right, room.question_time + 12.0)
+        self.assertEqual(room.state, 'results')  # Closed once everyone answered
+        
+        game = TriviaGame('reference')
+        expected = [game.evaluate_answer(question, answer, reaction_time)[1] for _, answer, reaction_time in answers]
+        self.assertEqual(room.scores.tolist(), expected)
+        
+        events = room.events.read(0)
+        self.assertEqual(len(events), 2)
+        results = json.loads(events[1][1].decode().split('data: ', 1)[1])
+        self.assertEqual(results['correct'], 2)
+        self.assertEqual(results['leaderboard']['changes'],
+                         [{'name': 'ann', 'score': expected[0]}, {'name': 'cy', 'score': expected[2]}])
+        self.assertEqual([(entry['name'], entry['rank']) for entry in room.standings()],
+                         [('ann', 1), ('cy', 2), ('bob', 3)])
+    
+    def test_malformed_answer_scores_as_wrong(self):
+        """Test that an answer int() can't parse counts as wrong without blocking the room."""
+        from engine import parse_answers
+        from rooms import Room
+        self.assertEqual(parse_answers(['\u00b2', '2', 'b', None, 'x']).tolist(), [-1, 1, 1, -1, -1])
+        
+        room = Room('test', rounds=2, answer_seconds=None)
+        players = [room.join(name) for name in ('ann', 'bob')]
+        question = room.start_round()
+        self.assertTrue(room.submit(players[0], question['id'], '\u00b2'))
+        self.assertTrue(room.submit(players[1], question['id'], str(question['answer'] + 1)))
+        self.assertEqual(room.state, 'results')
+        self.assertEqual(room.scores[0], 0)
+        self.assertGreater(room.scores[1], 0)
+        self.assertIsNotNone(room.start_round())
+    
+    def test_unanswered_round_keeps_difficulty(self):
+        """Test that a round nobody answered doesn't move the room's difficulty."""
+        from policies import EloPolicy
+        from rooms import Room
+        room = Room('test', predictor=EloPolicy(), rounds=3, answer_seconds=None)
+        room.join('ann')
+        for _ in range(2):
+            room.start_round()
+            results = room.close_round()
+            self.assertEqual(results['answered'], 0)
+            self.assertEqual(room.game.get_current_difficulty(), 0.5)
+            self.assertEqual(room.policy.rating, 0.5)
+    
+    def test_event_log_wakes_subscribers(self):
+        """Test that one publish reaches every waiting subscriber and lagging readers resync."""
+        import threading
+        from rooms import EventLog
+        log = EventLog(maxlen=2)
+        received = []
+        readers = [threading.Thread(target=lambda: received.append(log.read(0, timeout=5))) for _ in range(5)]
+        for reader in readers:
+            reader.start()
+        message_id = log.publish('question', {'round_number': 1})
+        for reader in readers:
+            reader.join()
+        
+        self.assertEqual(len(received), 5)
+        self.assertTrue(all(messages[0][0] == message_id for messages in received))
+        # One encoding shared by everyone
+        self.assertTrue(all(messages[0][1] is received[0][0][1] for messages in received))
+        
+        log.publish('results', {})
+        log.publish('question', {})
+        self.assertIsNone(log.read(0))
+        self.assertEqual([event_id for event_id, _ in log.read(2)], [3])
+        log.close()
+        self.assertEqual(log.read(3, timeout=5), [])
+    
+    def test_room_api_and_load_generator(self):
+        """Test a room played over HTTP by simulated players."""
+        import app as app_module
+        from room_load import run_load
+        client = app_module.app.test_client()
+        room = client.post('/api/rooms', json={'rounds': 1}).get_json()
+        self.assertEqual(client.post(f"/api/rooms/{room['room_id']}/next", json={}).status_code, 403)
+        self.assertEqual(client.post('/api/rooms/missing/join', json={'player_name': 'x'}).status_code, 404)
+        
+        report = run_load(n_players=20, rounds=2, max_delay=0.05)
+        self.assertEqual(report['errors'], [])
+        self.assertEqual(report['questions_received'], 40)
+        self.assertEqual(report['results_received'], 40)
+        self.assertEqual(report['answers_accepted'], 40)
+        self.assertTrue(report['leaderboards_consistent'])
+
+    def test_room_streams_past_budget_are_refused(self):
+        """Test that event streams past the budget get a 503 and free their slot on close."""
+        import threading
+        import app as app_module
+        client = app_module.app.test_client()
+        room = client.post('/api/rooms', json={'rounds': 1}).get_json()
+        events = f"/api/rooms/{room['room_id']}/events"
+        with patch.object(app_module, 'room_stream_slots', threading.BoundedSemaphore(1)):
+            first = client.get(events)
+            self.assertEqual(first.status_code, 200)
+            refused = client.get(events)
+            self.assertEqual(refused.status_code, 503)
+            self.assertIn('Retry-After', refused.headers)
+            first.close()
+            again = client.get(events)
+            self.assertEqual(again.status_code, 200)
+            again.close()
+
+    @unittest.skipUnless(importlib.util.find_spec('waitress'), "needs waitress")
+    def test_room_load_through_serve(self):
+        """Test a room with more players than request threads on the production server."""
+        from room_load import run_load
+        report = run_load(n_players=30, rounds=2, max_delay=0.05, server='waitress', threads=2, room_streams=30)
+        self.assertEqual(report['errors'], [])
+        self.assertEqual(report['answers_accepted'], 60)
+        self.assertTrue(report['leaderboards_consistent'])
+
 class TestSessionSerialization(unittest.TestCase):
     """Test that objects can be properly serialized for Flask sessions."""
     
@@ -356,6 +1775,258 @@ class TestSessionSerialization(unittest.TestCase):
         self.assertEqual(original, reconstructed)
 
 
+class TestServer(unittest.TestCase):
+    """Test the production server entry point."""
+    
+    def test_create_app_preloads_shared_predictor(self):
+        """Test that create_app loads the predictor once and sessions share it."""
+        import app as app_module
+        flask_app = app_module.create_app()
+        self.assertIs(flask_app, app_module.app)
+        self.assertIsNotNone(app_module.shared_predictor)
+        
+        client = flask_app.test_client()
+        with patch.object(app_module, 'player_store', PlayerStore(':memory:')):
+            client.post('/', data={'player_name': 'Preload'})
+        with client.session_transaction() as sess:
+            session_id = sess['session_id']
+        self.assertIs(app_module.ai_predictors[session_id], app_module.shared_predictor)
+        client.get('/restart')
+    
+    def test_flush_pending_logs(self):
+        """Test that unfinished games are saved on shutdown."""
+        import tempfile
+        import app as app_module
+        handler = DataHandler("FlushPlayer")
+        handler.log_performance(1, 0.5, 1.0, 4.0, 1)
+        app_module.data_handlers['flush-test'] = handler
+        app_module.data_handlers['flush-empty'] = DataHandler("EmptyPlayer")
+        
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                saved = app_module.flush_pending_logs()
+            finally:
+                os.chdir(cwd)
+                del app_module.data_handlers['flush-test']
+                del app_module.data_handlers['flush-empty']
+        
+        self.assertEqual(len(saved), 1)
+        self.assertIn("FlushPlayer", saved[0])
+    
+    def test_build_server_options(self):
+        """Test the gunicorn settings built by serve.py."""
+        from serve import build_server_options
+        options = build_server_options('127.0.0.1', 8080, workers=4, threads=0)
+        self.assertEqual(options['bind'], '127.0.0.1:8080')
+        self.assertEqual(options['workers'], 4)
+        self.assertEqual(options['threads'], 1)
+        self.assertTrue(options['preload_app'])
+        self.assertTrue(callable(options['post_fork']))
+
+class TestRendering(unittest.TestCase):
+    """Test cached page rendering and static assets."""
+    
+    def setUp(self):
+        """Set up a test client."""
+        import app as app_module
+        self.client = app_module.app.test_client()
+    
+    def test_index_etag_not_modified(self):
+        """Test that the home page is served with an ETag and answers 304 when unchanged."""
+        response = self.client.get('/')
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers.get('ETag')
+        self.assertIsNotNone(etag)
+        
+        response = self.client.get('/', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+    
+    def test_styles_served_as_cacheable_assets(self):
+        """Test that pages link fingerprinted stylesheets with long cache lifetimes."""
+        html = self.client.get('/').get_data(as_text=True)
+        self.assertNotIn('<style>', html)
+        self.assertIn('/static/css/index.css?v=', html)
+        
+        response = self.client.get('/static/css/game.css')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('max-age=31536000', response.headers.get('Cache-Control', ''))
+        response.close()
+
+class TestGameApi(unittest.TestCase):
+    """Test the JSON game API."""
+    
+    def setUp(self):
+        """Set up a test client."""
+        import app as app_module
+        self.app_module = app_module
+        self.client = app_module.app.test_client()
+        # Keep finished games out of the real leaderboard database
+        self.saved_leaderboard = app_module.leaderboard
+        app_module.leaderboard = Leaderboard(':memory:')
+        self.saved_player_store = app_module.player_store
+        app_module.player_store = PlayerStore(':memory:')
+    
+    def tearDown(self):
+        """Clean up the game created by the test."""
+        self.client.get('/restart')
+        self.app_module.leaderboard.close()
+        self.app_module.leaderboard = self.saved_leaderboard
+        self.app_module.player_store.close()
+        self.app_module.player_store = self.saved_player_store
+    
+    def test_full_game_one_request_per_answer(self):
+        """Test that each answer returns its feedback and the next question."""
+        response = self.client.post('/api/start', json={'player_name': 'ApiPlayer'})
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        question = data['question']
+        self.assertNotIn('answer', question)
+        self.assertEqual(len(question['options']), 4)
+        
+        answers = 0
+        while True:
+            response = self.client.post('/api/answer', json={'question_id': question['id'], 'answer': '1'})
+            self.assertEqual(response.status_code, 200)
+            data = response.get_json()
+            answers += 1
+            self.assertIn('correct', data['feedback'])
+            self.assertIsInstance(data['feedback']['difficulty_change'], bool)
+            if data['game_over']:
+                break
+            question = data['question']
+            self.assertIsNotNone(question)
+        
+        self.assertEqual(data['results_url'], '/results')
+        self.assertEqual(answers, data['state']['max_rounds'] - 1)
+        with patch.object(DataHandler, 'save_to_csv', return_value='data/api_test.csv'):
+            self.assertEqual(self.client.get('/results').status_code, 200)
+        
+        top = self.client.get('/api/leaderboard').get_json()['entries']
+        self.assertEqual(top[0]['player_name'], 'ApiPlayer')
+        self.assertEqual(top[0]['score'], data['state']['score'])
+        
+        # The next game of the same player starts from where this one ended
+        profile = self.app_module.player_store.get('ApiPlayer')
+        self.assertEqual(profile['games_played'], 1)
+        self.assertEqual(profile['rounds_played'], answers)
+        self.client.post('/api/start', json={'player_name': 'ApiPlayer'})
+        with self.client.session_transaction() as sess:
+            game = self.app_module.games[sess['session_id']]
+        self.assertEqual(game.get_current_difficulty(), profile['last_difficulty'])
+        # Questions of the first game are still marked as seen (plus the new first question)
+        from question_index import QuestionBitset
+        seen_before = QuestionBitset.deserialize(profile['seen_questions'])
+        self.assertGreaterEqual(len(seen_before), answers)
+        self.assertEqual(seen_before.bits & ~game.asked_questions.bits, 0)
+        self.assertEqual(len(game.asked_questions), len(seen_before) + 1)
+    
+    def test_answer_for_wrong_question_rejected(self):
+        """Test that answering a question other than the current one fails."""
+        self.assertEqual(self.client.post('/api/answer', json={'question_id': 1, 'answer': '1'}).status_code, 400)
+        
+        question = self.client.post('/api/start', json={'player_name': 'ApiPlayer'}).get_json()['question']
+        response = self.client.post('/api/answer', json={'question_id': question['id'] + 1000, 'answer': '1'})
+        self.assertEqual(response.status_code, 409)
+        
+        # The pending question is still available
+        current = self.client.get('/api/question').get_json()['question']
+        self.assertEqual(current['id'], question['id'])
+    
+    def test_metrics_window_follows_predictor(self):
+        """Test that a game averages the metrics over the shared predictor's window."""
+        predictor = DifficultyPredictor(backend='rules')
+        predictor.window = 1
+        with patch.object(self.app_module, 'shared_predictor', predictor):
+            self.client.post('/api/start', json={'player_name': 'WindowPlayer'})
+        with self.client.session_transaction() as sess:
+            data_handler = self.app_module.data_handlers[sess['session_id']]
+        self.assertEqual(data_handler.window, 1)
+        for accuracy in (1.0, 0.0):
+            data_handler.log_performance(1, 0.5, accuracy, 5.0, 1)
+        self.assertEqual(data_handler.get_average_metrics(), (0.0, 5.0, 1.0))
+    
+    def test_slow_answer_is_predicted_again(self):
+        """Test that the real reaction time decides the next difficulty, not the prefetch's assumption."""
+        import time
+        from policies import DifficultyPolicy
+        
+        class ReactionTimePolicy(DifficultyPolicy):
+            def predict_difficulty(self, accuracy, reaction_time, attempts):
+                return min(reaction_time, 20) / 20
+        
+        with patch.object(self.app_module, 'shared_predictor', ReactionTimePolicy()):
+            question = self.client.post('/api/start', json={'player_name': 'SlowPlayer'}).get_json()['question']
+            with self.client.session_transaction() as sess:
+                session_id = sess['session_id']
+                # Far slower than the 10 seconds the prefetch assumed for a new player
+                sess['question_time'] = time.time() - 19.0
+            self.client.post('/api/answer', json={'question_id': question['id'], 'answer': '1'})
+        
+        game = self.app_module.games[session_id]
+        self.assertAlmostEqual(game.get_current_difficulty(), 0.95, places=1)
+        self.assertGreater(self.app_module.data_handlers[session_id].rows[0]['reaction_time'], 18.0)
+    
+    def test_prefetch_is_reused_within_a_cache_cell(self):
+        """Test that a prefetch is only predicted again when the real metrics leave its cache cell."""
+        import time
+        predictor = DifficultyPredictor()
+        predictor.enable_cache(resolution=0.1)
+        counts = {'hits': 0, 'misses': 0}
+        with patch.object(self.app_module, 'shared_predictor', predictor), \
+                patch.dict(self.app_module.prefetch_counts, counts):
+            question = self.client.post('/api/start', json={'player_name': 'CellPlayer'}).get_json()['question']
+            # Close to the 10 seconds the prefetch assumed for a new player (same cell), then far from it
+            for elapsed in (10.0, 19.5):
+                with self.client.session_transaction() as sess:
+                    sess['question_time'] = time.time() - elapsed
+                data = self.client.post('/api/answer', json={'question_id': question['id'], 'answer': '1'}).get_json()
+                question = data['question']
+            stats = self.client.get('/api/prefetch').get_json()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        self.assertAlmostEqual(stats['hit_rate'], 0.5)
+    
+    def test_shadow_mode_sees_every_answer(self):
+        """Test that answers are fed to the shadow evaluator and reported by the endpoint."""
+        from shadow import ShadowEvaluator
+        self.assertEqual(self.client.get('/api/shadow').get_json(), {'enabled': False})
+        live = self.app_module.shared_predictor or DifficultyPredictor()
+        evaluator = ShadowEvaluator({'same': live})
+        with patch.object(self.app_module, 'shadow_evaluator', evaluator):
+            question = self.client.post('/api/start', json={'player_name': 'ShadowPlayer'}).get_json()['question']
+            for _ in range(3):
+                data = self.client.post('/api/answer', json={'question_id': question['id'], 'answer': '2'}).get_json()
+                question = data['question']
+            evaluator.join()
+            stats = self.client.get('/api/shadow').get_json()
+        evaluator.close()
+        
+        self.assertTrue(stats['enabled'])
+        self.assertEqual(stats['submitted'], 3)
+        self.assertEqual(stats['candidates']['same']['samples'], 3)
+        # The candidate sees the metrics the live difficulty came from, prefetched or not
+        self.assertAlmostEqual(stats['candidates']['same']['mean_abs_diff'], 0.0)
+        self.assertAlmostEqual(stats['candidates']['same']['max_abs_diff'], 0.0)
+    
+    def test_game_page_keeps_asked_questions_in_game(self):
+        """Test that the game page never rebuilds the asked questions from the session."""
+        self.client.post('/', data={'player_name': 'PagePlayer'})
+        with patch.object(TriviaGame, 'set_asked_questions', side_effect=AssertionError("reloaded")):
+            self.assertEqual(self.client.get('/game').status_code, 200)
+            with self.client.session_transaction() as sess:
+                question = sess['current_question']
+            response = self.client.post('/game', data={'question_id': question['id'], 'answer': '1'})
+            self.assertEqual(response.status_code, 302)
+            self.assertEqual(self.client.get('/game').status_code, 200)
+        
+        with self.client.session_transaction() as sess:
+            game = self.app_module.games[sess['session_id']]
+            self.assertTrue(game.asked_questions)
+            self.assertNotIn('asked_questions', sess)
+            self.assertEqual(sess['questions_asked'], 2)
+
 @unittest.skipIf(not APP_IMPORTED, "App module not imported")
 class TestPublicUrlGeneration(unittest.TestCase):
     """Test the public URL generation functionality."""
@@ -1,6 +1,9 @@
 import time
 import random
 import os
+import selectors
+import sys
+import threading
 
 def clear_screen():
     """Clear the console screen."""
@@ -54,24 +57,119 @@ def print_feedback(text, is_positive=True):
     prefix = "✓" if is_positive else "✗"
     print(f"\n{prefix} {text}\n")
 
-def input_with_timeout(prompt, timeout=10):
+# Held for every write to the console while a countdown is running, and while stdin is
+# non-blocking: a terminal's stdin and stdout share one file status, so a write then could fail
+_console_lock = threading.Lock()
+
+def _countdown(stop_event, deadline, stream):
+    """Keep a live countdown on the line above the answer prompt until stop_event is set."""
+    while not stop_event.is_set():
+        remaining = max(0, int(deadline - time.time() + 0.999))
+        with _console_lock:
+            # Save the cursor, rewrite the line above it, then restore the cursor
+            stream.write(f"\0337\033[1A\r\033[KTime remaining: {remaining}s\0338")
+            stream.flush()
+        # Wake up again when the displayed number of seconds changes
+        until_next_second = (deadline - time.time()) % 1.0
+        stop_event.wait(until_next_second if until_next_second > 0.01 else 1.0)
+
+def _read_available(stream, fileno):
+    """
+    Read what the stream can give without blocking, up to the end of a line.
+
+    Goes through the stream, so text an earlier read already pulled into
+    its buffer comes out first; the fd is only non-blocking for this call,
+    and the countdown doesn't write in the meantime.
+
+    Returns:
+        str: The text read ('' if nothing is available)
+    """
+    with _console_lock:
+        os.set_blocking(fileno, False)
+        try:
+            return stream.readline() or ''
+        except BlockingIOError:
+            return ''
+        finally:
+            os.set_blocking(fileno, True)
+
+def input_with_timeout(prompt, timeout=10, stream=None):
     """
-    Simulate input with a timeout by showing a countdown.
-    Note: This is a simple implementation and doesn't actually cut off input.
-    For a true timeout input, platform-specific solutions would be needed.
+    Read an answer, giving up after timeout seconds.
+    
+    Returns as soon as the player presses Enter, so the caller's timer measures
+    the real reaction time. On POSIX systems stdin is polled with selectors and
+    a background thread shows a live countdown. The stream's own buffer is
+    read before polling, because lines already in it (piped input, or typed
+    ahead of an earlier input()) never make the fd readable. Where stdin
+    can't be polled (e.g. Windows consoles) the answer is read normally and
+    discarded if it came in too late.
+    
+    Args:
+        prompt (str): Text shown before the answer prompt
+        timeout (float): Seconds allowed for answering
+        stream (file): Stream to read from (defaults to sys.stdin)
+        
+    Returns:
+        str: The answer without the trailing newline, or None on timeout
     """
+    stream = stream or sys.stdin
     print(f"{prompt} (You have {timeout} seconds)")
     start = time.time()
+    deadline = start + timeout
     
-    for remaining in range(timeout, 0, -1):
-        print(f"\rTime remaining: {remaining}s ", end="")
-        time.sleep(1)
-        if time.time() - start >= timeout:
-            print("\rTime's up!            ")
+    try:
+        fileno = stream.fileno()
+    except (AttributeError, OSError, ValueError):
+        fileno = None
+    
+    if os.name == 'nt' or fileno is None:
+        user_input = input("Your answer: ")
+        if time.time() - start > timeout:
+            print("Time's up!")
             return None
+        return user_input
+    
+    # Live countdown on its own line, only when a person is watching
+    stop_event = threading.Event()
+    countdown = None
+    if sys.stdout.isatty():
+        print(f"Time remaining: {int(timeout)}s")
+        countdown = threading.Thread(target=_countdown, args=(stop_event, deadline, sys.stdout), daemon=True)
+    with _console_lock:
+        print("Your answer: ", end="", flush=True)
+    if countdown is not None:
+        countdown.start()
+    
+    user_input = ''
+    readable = False
+    selector = selectors.DefaultSelector()
+    try:
+        selector.register(fileno, selectors.EVENT_READ)
+        while True:
+            text = _read_available(stream, fileno)
+            user_input += text
+            if user_input.endswith("\n") or (readable and not text):
+                # A whole line, or end of input (the fd was readable but had nothing)
+                break
+            readable = bool(selector.select(max(0.0, deadline - time.time())))
+            if not readable:
+                break
+    finally:
+        selector.close()
+        stop_event.set()
+        if countdown is not None:
+            countdown.join()
     
-    user_input = input("\nYour answer: ")
-    return user_input
+    if not readable and not user_input.endswith("\n"):
+        with _console_lock:
+            print("\nTime's up!")
+        return None
+    if not user_input:
+        # End of input (e.g. Ctrl+D): treat as no answer
+        print()
+        return None
+    return user_input.rstrip("\n")
 
 def generate_ascii_progress_bar(value, max_value, width=20):
     """Generate an ASCII progress bar."""
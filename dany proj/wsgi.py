@@ -0,0 +1,4 @@
+# WSGI entry point, e.g. `gunicorn -w 1 --threads 8 --preload wsgi:application`
+from app import create_app
+
+application = create_app()